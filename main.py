@@ -1,9 +1,10 @@
-import MetaTrader5 as mt
-mt.initialize()
+from modules.meta.broker import mt5 as mt
 import os
 import time
 import argparse
 import traceback
+from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 import modules.config as config
 import modules.meta.util as util
@@ -18,13 +19,15 @@ from modules.meta.Account import Account
 from modules.meta.Indicators import Indicators
 from modules.meta.wrapper import Wrapper
 from modules.meta.Strategies import Strategies
+from modules.meta.StrategyRegistry import StrategyRegistry, StrategyData
 from modules.common.logme import log_it
 from modules.meta.TradeTracker import TradeTracker
 from modules.meta.DelayedEntry import DelayedEntry
+from modules.common.Profiler import Profiler
+from modules.meta.Scheduler import Scheduler
 
 class Main():
     def __init__(self, **kwargs):
-        self.timer = 15 # In Seconds
         self.stop_ratio = 1.0
         self.exited_by_pnl:bool = False
         self.notify_pnl:bool = True
@@ -110,9 +113,25 @@ class Main():
         self.account = Account()
         self.indicators = Indicators(wrapper=self.wrapper, prices=self.prices)
         self.strategies = Strategies(wrapper=self.wrapper, indicators=self.indicators)
+        # Comma separated strategies are evaluated side by side, in the given order
+        self.strategy_registry = StrategyRegistry(strategies=self.strategies, names=self.strategy.split(","))
         self.orders = Orders(prices=self.prices, risk_manager=self.risk_manager, wrapper=self.wrapper)
         self.trade_tracker = TradeTracker()
         self.delayed_entry = DelayedEntry(indicators=self.indicators, strategies=self.strategies, risk_manager=self.risk_manager)
+
+        # Stage timings of the cycle, only recorded when enabled (e.g scripts/benchmark_main_cycle.py)
+        self.profiler = Profiler()
+
+        # Wakes the loop on the bar closes of the trading and ATR timeframes (strategies), the PnL check interval and the new ticks of the open positions
+        self.scheduler = Scheduler(timeframes=[self.trading_timeframe, self.atr_check_timeframe])
+        self.active_positions = [] # Symbols in position at the end of the previous cycle
+        self.closed_positions = set() # Symbols closed since the strategies last ran
+        self.pending_entries = 0 # Entries which were not filled since the strategies last ran
+        self.strategies_activated = False # Trading was activated when the strategies last checked
+
+        # Number of symbols evaluated in parallel by the strategies, 1 evaluates them one after another
+        self.strategy_workers = kwargs.get("strategy_workers", config.strategy_workers)
+        self.strategy_pool = ThreadPoolExecutor(max_workers=self.strategy_workers, thread_name_prefix="strategy") if self.strategy_workers > 1 else None
         
         # Account information
         self.account_name = self.account.get_account_name()
@@ -126,6 +145,9 @@ class Main():
         # Get the trading symbols
         self.trading_symbols = curr.get_symbols(security=self.security, symbol_selection=self.symbol_selection)
 
+        # Subscribe the trading and the conversion symbols to the tick snapshot, which is reloaded on each cycle
+        self.prices.ticks.register(symbols=self.trading_symbols + curr.support_pairs)
+
         self.rr_change = 0
         self.rr_chage_prior = 0
 
@@ -249,7 +271,7 @@ class Main():
         # print(f"{'Adaptive Re-Entry'.ljust(20)}: {util.cl(self.adaptive_reentry)}")
         print(f"{'Entry with ST & TGT'.ljust(20)}: {util.cl(self.entry_with_st_tgt)}")
         print(f"{'Multiple Position'.ljust(20)}: {self.multiple_positions}")
-        if "ATR_BASED_DIRECTION" == self.strategy:
+        if "ATR_BASED_DIRECTION" in self.strategy.split(","):
             print(f"{'ATR TF'.ljust(20)}: {util.cl(self.atr_check_timeframe)}")
         
         if "_limit" in self.multiple_positions:
@@ -320,10 +342,63 @@ class Main():
                 and (not self.is_market_close) \
                 and self.wrapper.any_remaining_trades(max_trades=self.trades_per_day)
     
+    def get_symbol_signal(self, symbol:str, data:StrategyData) -> Tuple[Directions, str, bool, bool]:
+        """
+        Evaluates the strategies on a symbol (see StrategyRegistry) and checks the validity of the signal, without placing any order.
+        The evaluation only reads from the terminal, so the symbols can be evaluated by parallel workers (see `strategy_workers`).
+
+        Args:
+            symbol (str): Symbol to evaluate
+            data (StrategyData): Data of the cycle prepared for the strategies
+
+        Returns:
+            Tuple[Directions, str, bool, bool]: Trade direction (None without a signal), comment of the entry, is valid signal and is opening trade
+        """
+        is_valid_signal, is_opening_trade = False, False
+
+        def log_error(strategy:str):
+            error_trace = traceback.format_exc()
+            log_it("STRATEGY_SELECTION").info(error_trace)
+
+        trade_direction, comment = self.strategy_registry.get_signal(symbol=symbol, data=data, on_error=log_error)
+
+        if trade_direction:
+            is_valid_signal, is_opening_trade = self.risk_manager.check_signal_validity(symbol=symbol,
+                                                                        timeframe=self.trading_timeframe,
+                                                                        trade_direction=trade_direction,
+                                                                        strategy=self.risk_manager.market_direction,
+                                                                        multiple_positions=self.multiple_positions,
+                                                                        max_trades_per_day_per_symbol=self.max_trades_per_day_per_symbol)
+
+        return trade_direction, comment, is_valid_signal, is_opening_trade
+
+    def get_signals(self, symbols:list, data:StrategyData) -> List[Tuple[str, Directions, str, bool, bool]]:
+        """
+        Evaluates the symbols with `strategy_workers` parallel workers, the terminal round trips of the symbols overlap
+        so the evaluation is bounded by the slowest symbol rather than the sum of them.
+
+        Returns:
+            List[Tuple[str, Directions, str, bool, bool]]: Symbol and its signal (see get_symbol_signal), in the same order as the symbols
+        """
+        if self.strategy_pool is None or len(symbols) < 2:
+            signals = [self.get_symbol_signal(symbol=symbol, data=data) for symbol in symbols]
+        else:
+            signals = list(self.strategy_pool.map(lambda symbol: self.get_symbol_signal(symbol=symbol, data=data), symbols))
+
+        return [(symbol, *signal) for symbol, signal in zip(symbols, signals)]
+
     def main(self):
         while True:
+            self.profiler.start_cycle(stage="ticks")
+            # Single load of the subscribed symbol prices for the cycle
+            self.prices.ticks.refresh()
+            # New snapshot of the positions, orders and deals for the cycle
+            self.wrapper.state.refresh()
+            self.profiler.mark(stage="market_status")
             self.is_market_open, self.is_market_close = util.get_market_status(start_hour=self.start_hour, start_minute=self.start_minute)
+            self.profiler.mark(stage="rr_change")
             self.rr_change, _, _ = self.trade_tracker.get_rr_change()
+            self.profiler.mark(stage="account")
 
             if self.security == "STOCK":
                 self.is_market_open = self.is_market_open and util.is_us_activemarket_peroid()
@@ -355,8 +430,14 @@ class Main():
                     self.is_initial_run = False
                     print(f"\n************* Initial Entry Check: Early Exit by PnL: {self.exited_by_pnl} *************")
 
-            # Cancel all pending orders
-            self.orders.cancel_all_pending_orders()
+            # Cancel all pending orders on the bar closes and the strategy interval, the entries which are not filled are
+            # re-quoted by the strategies below. A new tick of an open position only wakes the PnL and exit checks
+            self.profiler.mark(stage="orders")
+            tick_only = self.scheduler.events == {Scheduler.TICK}
+            strategy_due = self.scheduler.strategy_due()
+            if strategy_due:
+                self.pending_entries = self.orders.cancel_all_pending_orders()
+            self.profiler.mark(stage="pnl_exit")
 
             # Check if the risk-reward ratio (RR) is greater than 1.1 or if the account trailing feature is enabled,
             # and ensure that the trade hasn't been exited by PnL, while notifications for PnL are enabled.
@@ -461,11 +542,13 @@ class Main():
                             # Once the postion is closed, the re entry will be taken care by the adaptive re-entry below
                             self.orders.close_single_position_by_symbol(symbol=symbol)
                 
-                    time.sleep(3)
+                    mt.sleep(3)
 
             # Record PNL even once after the positions are exit based on todays trades
-            # This helps to track the PnL based on the trades taken today
-            if not self.wrapper.get_todays_trades().empty and not self.is_market_close:
+            # This helps to track the PnL based on the trades taken today. It's logged on the strategy interval (and the bar
+            # closes), the cadence of the RR history read by the RR change and the daily summary
+            self.profiler.mark(stage="trades_pnl")
+            if strategy_due and not self.wrapper.get_todays_trades().empty and not self.is_market_close:
                 # The reason added out of the IF condition to calculate the positional PnL for each Symbol
                 self.off_market_pnl, symbol_pnl = self.risk_manager.calculate_trades_based_pnl()
                 if self.exited_by_pnl:
@@ -481,6 +564,7 @@ class Main():
 
 
             # Each position trail stop
+            self.profiler.mark(stage="position_management")
             if self.enable_trail_stop:
                 self.risk_manager.trailing_stop_and_target(stop_multiplier=self.stop_ratio, target_multiplier=self.target_ratio, trading_timeframe=self.trading_timeframe,
                                                            num_cdl_for_stop=self.num_prev_cdl_for_stop, stop_selection=self.primary_stop_selection)
@@ -542,9 +626,10 @@ class Main():
                 self.active_double_entry = False # Reset the double entry
 
             # Enable delayed entry based on the tracked performance
+            self.profiler.mark(stage="delayed_entry")
             if self.enable_delayed_entry:
                 # Record the Pnl Pre for perfect entry
-                if self.trading_activated():
+                if not tick_only and self.trading_activated():
                     self.delayed_entry.symbol_price_recorder(symbols=self.trading_symbols)
                 
                     get_delay_signal = self.delayed_entry.is_max_ranged()
@@ -557,9 +642,24 @@ class Main():
                 self.enter_market_by_delay = True
 
             # Print configs and pnl on console
-            self.verbose()
-
-            if self.trading_activated() and self.enter_market_by_delay:
+            self.profiler.mark(stage="verbose")
+            if not tick_only:
+                self.verbose()
+            self.profiler.mark(stage="strategy")
+
+            # The closed-bar strategies run on the bar close. In between, on the strategy interval, the strategies run as soon
+            # as the trading is activated, to re-quote the entries which were not filled, to re-enter the symbols which are
+            # closed, and to evaluate the strategies which read the forming bar
+            run_strategies = False
+            if strategy_due:
+                trading_activated = self.trading_activated() and self.enter_market_by_delay
+                run_strategies = trading_activated and (self.scheduler.bar_closed() or (not self.strategies_activated) 
+                                                        or self.pending_entries > 0 or len(self.closed_positions) > 0
+                                                        or self.strategy_registry.has_intrabar_strategies())
+                self.strategies_activated = trading_activated
+
+            if run_strategies:
+                self.closed_positions.clear()
 
                 # Enable again once market active
                 self.notify_pnl = True
@@ -568,144 +668,58 @@ class Main():
                 self.is_initial_run = False 
                 current_active_positions = self.wrapper.get_active_positions()
 
-                for symbol in self.trading_symbols:
-                    # Skip the symbol if it's already in active positions
-                    if symbol in current_active_positions:
-                        continue
-
-                    # Reset trade direction for each symbol
-                    trade_direction = None
-                    comment = self.strategy
-                    
-                    try: 
-                        match self.strategy:
-                            case "3CDL_STR":
-                                trade_direction = self.strategies.get_three_candle_strike(symbol=symbol, 
-                                                                                        timeframe=self.trading_timeframe)
-                            case "3CDL_REV":
-                                trade_direction = self.strategies.get_three_candle_reverse(symbol=symbol, 
-                                                                                            timeframe=self.trading_timeframe)                 
-                            case "4CDL_PULLBACK":
-                                trade_direction = self.strategies.get_four_candle_reversal(symbol=symbol, 
-                                                                                        timeframe=self.trading_timeframe)
-                            case "4CDL_PULLBACK_EXT":
-                                trade_direction = self.strategies.get_four_candle_reversal(symbol=symbol, 
-                                                                                        timeframe=self.trading_timeframe,
-                                                                                        extrame=True)
-                            case "DAILY_HL":
-                                min_gap = 2
-                                trade_direction = self.strategies.daily_high_low_breakouts(symbol=symbol, 
-                                                                                        timeframe=self.trading_timeframe,
-                                                                                        min_gap=min_gap)
-                            case "DAILY_HL_DOUBLE_HIT":
-                                min_gap = 4
-                                trade_direction = self.strategies.daily_high_low_breakout_double_high_hit(symbol=symbol, 
-                                                                                                        timeframe=self.trading_timeframe,
-                                                                                                        min_gap=min_gap)
-                            case "WEEKLY_HL":
-                                min_gap = 4
-                                trade_direction = self.strategies.weekly_high_low_breakouts(symbol=symbol, 
-                                                                                        timeframe=self.trading_timeframe,
-                                                                                        min_gap=min_gap)
-                            case "D_TOP_BOTTOM":
-                                trade_direction = self.strategies.get_dtop_dbottom(symbol=symbol, 
-                                                                                timeframe=self.trading_timeframe)
-                            case "HEIKIN_ASHI":
-                                trade_direction = self.strategies.get_heikin_ashi_reversal(symbol=symbol, 
-                                                                                        timeframe=self.trading_timeframe)
-                            case "HEIKIN_ASHI_PRE":
-                                trade_direction = self.strategies.get_heikin_ashi_pre_entry(symbol=symbol, 
-                                                                                        timeframe=self.trading_timeframe)
-                            
-                            case "HEIKIN_ASHI_3CDL_REV":
-                                trade_direction = self.strategies.get_heikin_ashi_3_cdl_reversal(symbol=symbol, 
-                                                                                        timeframe=self.trading_timeframe, start=1)
-
-                            case "U_REVERSAL":
-                                trade_direction, comment = self.strategies.get_u_reversal(symbol=symbol, 
-                                                                                timeframe=self.trading_timeframe)
-                            case "SINGLES":
-                                trade_direction = self.strategies.strike_by_solid_candle(symbol=symbol, 
-                                                                                timeframe=self.trading_timeframe)
-                            case "PREV_DAY_CLOSE_DIR":
-                                trade_direction = self.strategies.previous_day_close(symbol=symbol)
-
-                            case "3CDL_ESCAPE":
-                                trade_direction = self.strategies.get_three_candle_escape(symbol=symbol)
-                                self.risk_manager.market_direction = Directions.REVERSE.name
-                            
-                            case "TODAY_DOMINATION":
-                                trade_direction = self.strategies.today_domination(symbol=symbol)
-                            
-                            case "PREV_DAY_CLOSE_DIR_MKT_DOMINATION":
-                                trade_direction = self.indicators.get_dominant_market_actual_direction()
-                            
-                            case "DAY_CLOSE_SMA":
-                                trade_direction = self.strategies.day_close_sma(symbol=symbol)
-                            
-                            case "PREV_DAY_CLOSE_DIR_PREV_HIGH_LOW":
-                                trade_direction = self.strategies.previous_day_close_prev_high_low(symbol=symbol)
-                            
-                            case "ATR_BASED_DIRECTION":
-                                trade_direction = self.strategies.atr_referenced_previous_close_direction(symbol=symbol, entry_atr_timeframe=self.atr_check_timeframe)
-                            
-                            case "PREV_DAY_CLOSE_DIR_ADVANCED":
-                                trade_direction = self.strategies.previous_day_close_advanced(symbol=symbol)
-                            
-                            case "PREV_DAY_CLOSE_DIR_HEIKIN_ASHI":
-                                trade_direction = self.strategies.previous_day_close_heikin_ashi(symbol=symbol)
-                            
-                            case "SAME_DIRECTION_PREV_HEIKIN":
-                                trade_direction = self.strategies.same_prev_day_direction_with_heikin(symbol=symbol)
-
-                            case "4H_CLOSE_DIR":
-                                trade_direction = self.strategies.four_hour_close(symbol=symbol)
-                            
-                            case "PEAK_REVERSAL":
-                                trade_direction = self.strategies.get_peak_level_revesals(symbol=symbol, timeframe=self.trading_timeframe)
-                            
-                            case "SINGLE_SYMBOL":
-                                print(f"{'Selected Symb'.ljust(20)}: {util.cl(symbol)}")
-                                trade_direction = self.strategies.previous_candle_close(symbol=symbol, timeframe=self.trading_timeframe)
-                    except Exception as e:
-                        error_trace = traceback.format_exc()
-                        log_it("STRATEGY_SELECTION").info(error_trace)
-                    
-                    
-                    if trade_direction:
-                        is_valid_signal, is_opening_trade = self.risk_manager.check_signal_validity(symbol=symbol,
-                                                                                    timeframe=self.trading_timeframe,
-                                                                                    trade_direction=trade_direction,
-                                                                                    strategy=self.risk_manager.market_direction,
-                                                                                    multiple_positions=self.multiple_positions,
-                                                                                    max_trades_per_day_per_symbol=self.max_trades_per_day_per_symbol)
-                        
-                        if self.enable_sec_stop_selection:
-                            # If it's considered as opening trade then choose the primary stop selection else choose secondary
-                            dynamic_stop_selection = self.primary_stop_selection if is_opening_trade else self.secondary_stop_selection
-                        else:
-                            dynamic_stop_selection = self.primary_stop_selection
-                        
-                        # Pending trades basedon waiting signal
-                        if not is_valid_signal:
-                            print(f"{symbol}: {trade_direction}")
-
-                        if self.adaptive_reentry and self.len_position_at_risk > 0:
-                            if self.risk_manager.market_direction == Directions.BREAK.name:
-                                trade_direction = Directions.SHORT if position_dict[symbol] == 0 else Directions.LONG
+                # Load the candles required by the strategies once, the strategies read from the loaded series
+                strategy_data = self.strategy_registry.prepare(timeframe=self.trading_timeframe, atr_timeframe=self.atr_check_timeframe)
+                data_requirements = self.strategy_registry.get_requirements(data=strategy_data)
+                try:
+                    self.wrapper.prefetch_candles(symbols=[symbol for symbol in self.trading_symbols if symbol not in current_active_positions], 
+                                                  requirements=data_requirements, pool=self.strategy_pool)
+
+                    # Evaluate the symbols which are not in active positions, the orders are placed one by one in the symbol order
+                    self.profiler.mark(stage="strategy")
+                    # Strategies which trade on their own market direction (e.g 3CDL_ESCAPE)
+                    if self.strategy_registry.get_market_direction():
+                        self.risk_manager.market_direction = self.strategy_registry.get_market_direction()
+                    signals = self.get_signals(symbols=[symbol for symbol in self.trading_symbols if symbol not in current_active_positions], data=strategy_data)
+
+                    self.profiler.mark(stage="orders")
+                    for symbol, trade_direction, comment, is_valid_signal, is_opening_trade in signals:
+                        if trade_direction:
+                            if self.enable_sec_stop_selection:
+                                # If it's considered as opening trade then choose the primary stop selection else choose secondary
+                                dynamic_stop_selection = self.primary_stop_selection if is_opening_trade else self.secondary_stop_selection
                             else:
-                                # If the strategy is REVERSE then the trade direction will be opposite to the last trade
-                                trade_direction = Directions.LONG if position_dict[symbol] == 0 else Directions.SHORT
-
-                        if is_valid_signal:
-                            self.trade(direction=trade_direction, symbol=symbol, comment=comment, break_level=-1, stop_selection=dynamic_stop_selection, entry_with_st_tgt=self.entry_with_st_tgt)
-
-            time.sleep(self.timer)
+                                dynamic_stop_selection = self.primary_stop_selection
+                        
+                            # Pending trades basedon waiting signal
+                            if not is_valid_signal:
+                                print(f"{symbol}: {trade_direction}")
+
+                            if self.adaptive_reentry and self.len_position_at_risk > 0:
+                                if self.risk_manager.market_direction == Directions.BREAK.name:
+                                    trade_direction = Directions.SHORT if position_dict[symbol] == 0 else Directions.LONG
+                                else:
+                                    # If the strategy is REVERSE then the trade direction will be opposite to the last trade
+                                    trade_direction = Directions.LONG if position_dict[symbol] == 0 else Directions.SHORT
+
+                            if is_valid_signal:
+                                self.trade(direction=trade_direction, symbol=symbol, comment=comment, break_level=-1, stop_selection=dynamic_stop_selection, entry_with_st_tgt=self.entry_with_st_tgt)
+                finally:
+                    # A failing cycle doesn't leave the candles of this cycle to the next one
+                    self.wrapper.clear_prefetch()
+
+            # Symbols closed since the previous cycle (stops, targets or exits), the strategies can re-enter them
+            active_positions = self.wrapper.get_active_positions()
+            self.closed_positions.update([symbol for symbol in self.active_positions if symbol not in active_positions])
+            self.active_positions = active_positions
+
+            self.profiler.end_cycle()
+            self.scheduler.wait(symbols=self.active_positions)
     
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Trader Configuration')
 
-    parser.add_argument('--strategy', type=str, help='Select System 3CDL or HOD, LOD Break')
+    parser.add_argument('--strategy', type=str, help='Select System 3CDL or HOD, LOD Break, comma separated strategies run side by side')
     parser.add_argument('--market_direction', type=str, help='Selected Strategy')
     parser.add_argument('--security', type=str, help='Selected Type - Forex or Stock')
     parser.add_argument('--timeframe', type=int, help='Selected timeframe for trade')
@@ -741,6 +755,7 @@ if __name__ == "__main__":
     parser.add_argument('--adaptive_tolerance', type=float, help='The factor of the each position, that flip based on the pnl')
     parser.add_argument('--enable_delayed_entry', type=str, help='Enable Delayed Entry')
     parser.add_argument('--enable_double_entry', type=str, help='Enable Double Entry on Loose Position')
+    parser.add_argument('--strategy_workers', type=int, default=config.strategy_workers, help='Number of symbols evaluated in parallel')
     
     
     args = parser.parse_args()
@@ -781,6 +796,7 @@ if __name__ == "__main__":
     adaptive_tolerance = float(args.adaptive_tolerance)
     enable_delayed_entry = util.boolean(args.enable_delayed_entry)
     enable_double_entry = util.boolean(args.enable_double_entry)
+    strategy_workers = int(args.strategy_workers)
 
     win = Main(security=security, trading_timeframe=trading_timeframe, account_risk=account_risk, max_account_risk=max_account_risk,
                       each_position_risk=each_position_risk, target_ratio=target_ratio, trades_per_day=trades_per_day,
@@ -793,6 +809,6 @@ if __name__ == "__main__":
                       enable_sec_stop_selection=enable_sec_stop_selection, atr_check_timeframe=atr_check_timeframe, 
                       max_trades_on_same_direction=max_trades_on_same_direction, entry_with_st_tgt=entry_with_st_tgt,
                       stop_expected_move=stop_expected_move, account_trail_enabler=account_trail_enabler, adaptive_reentry=adaptive_reentry, adaptive_tolerance=adaptive_tolerance,
-                      enable_delayed_entry=enable_delayed_entry, enable_double_entry=enable_double_entry)
+                      enable_delayed_entry=enable_delayed_entry, enable_double_entry=enable_double_entry, strategy_workers=strategy_workers)
 
     win.main()
\ No newline at end of file
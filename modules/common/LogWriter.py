@@ -0,0 +1,260 @@
+import io
+import os
+import time
+import queue
+import atexit
+import threading
+import pandas as pd
+from typing import Dict, List
+from modules.meta import util
+from modules.common import files_util
+from modules import config
+
+class LogWriter:
+    def __init__(self, queue_size:int=config.log_queue_size, flush_interval:float=config.log_flush_interval):
+        """
+        Background writer of the CSV logs (trade logs, symbol PnL logs, price tracker history...).
+
+        The trading loop only puts the lines on a bounded queue, a single background thread takes them off the queue,
+        groups them by file and appends each file once per flush interval (or on close), so the loop never waits on the
+        filesystem (e.g a OneDrive synced folder). When the queue is full the lines are dropped rather than blocking the
+        loop, and the dropped count is printed.
+
+        The file path can have a {date} placeholder, which is filled with the server date of the write, so the daily
+        files are rotated by the writer. The header is written when the file is created. The lines which are not yet on
+        the disk are kept by file, so read_csv and exists see the latest lines before the flush. The state files
+        (write_snapshot) are replaced by their latest content on the flush instead of being appended.
+
+        Args:
+            queue_size (int): Maximum number of writes waiting on the queue
+            flush_interval (float): Seconds between the appends of the batched lines
+        """
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock() # Pending lines
+        self.file_lock = threading.Lock() # Appends of the files
+        self.pending:Dict[str, List[str]] = dict()
+        self.headers:Dict[str, str] = dict()
+        self.snapshots:Dict[str, str] = dict() # Latest content of the replaced files (state files), not yet written
+        self.dropped = 0
+        self.written = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="LogWriter", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def get_path(self, file_path:str) -> str:
+        """
+        Absolute file path of today, the {date} placeholder replaced by the server date. The path is resolved when the
+        lines are queued, so a change of the working directory before the flush doesn't move the file
+        """
+        if "{date}" in file_path:
+            file_path = file_path.replace("{date}", util.get_current_time().strftime('%Y-%m-%d'))
+        return os.path.abspath(file_path)
+
+    def write(self, file_path:str, header:str, lines:List[str]) -> str:
+        """
+        Queues the lines to be appended to the file, without waiting on the disk
+
+        Args:
+            file_path (str): Path of the file, with an optional {date} placeholder for the daily files
+            header (str): Column names of the file, written when the file is created
+            lines (List[str]): CSV lines, without the line break
+
+        Returns:
+            str: Path of the file the lines are written to
+        """
+        file_path = self.get_path(file_path=file_path)
+        lines = [f"{line}\n" for line in lines]
+        with self.lock:
+            if self.closed:
+                return file_path
+            try:
+                self.queue.put_nowait((file_path, lines))
+            except queue.Full:
+                self.dropped += len(lines)
+                # Printed on the first drop and every hundred lines, the loop is not flooded while the disk is stuck
+                if self.dropped == len(lines) or (self.dropped - len(lines)) // 100 != self.dropped // 100:
+                    print(f"{'Log Queue Full'.ljust(20)}: lines of {file_path} dropped, {self.dropped} in total")
+                return file_path
+            self.headers[file_path] = f"{header}\n"
+            self.pending.setdefault(file_path, list()).extend(lines)
+        return file_path
+
+    def write_df(self, file_path:str, df:pd.DataFrame) -> str:
+        """
+        Queues the rows of the data frame, the columns are the header of the file
+        """
+        lines = df.to_csv(header=False, index=False).splitlines()
+        return self.write(file_path=file_path, header=",".join(df.columns), lines=lines)
+
+    def write_snapshot(self, file_path:str, content:str) -> str:
+        """
+        Replaces the content of the file (e.g a state file) on the next flush, only the latest content is written
+
+        Args:
+            file_path (str): Path of the file, with an optional {date} placeholder for the daily files
+            content (str): Full content of the file
+
+        Returns:
+            str: Path of the file
+        """
+        file_path = self.get_path(file_path=file_path)
+        with self.lock:
+            if not self.closed:
+                self.snapshots[file_path] = content
+        return file_path
+
+    def read_snapshot(self, file_path:str) -> str:
+        """
+        Latest content of the file, including the content which is not yet written, None when the file doesn't exist
+        """
+        file_path = self.get_path(file_path=file_path)
+        with self.file_lock:
+            with self.lock:
+                if file_path in self.snapshots:
+                    return self.snapshots[file_path]
+            if not files_util.check_file_exists(file_path=file_path):
+                return None
+            with open(file_path, mode="r") as file:
+                return file.read()
+
+    def run(self):
+        batches:Dict[str, List[str]] = dict()
+        last_flush = time.monotonic()
+        while True:
+            timeout = max(0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, tuple):
+                file_path, lines = item
+                batches.setdefault(file_path, list()).extend(lines)
+
+            # Stop or flush request (an event to notify once the batches are on the disk)
+            stop = item == "STOP"
+            if stop or isinstance(item, threading.Event) or (time.monotonic() - last_flush) >= self.flush_interval:
+                batches = self.write_batches(batches=batches)
+                self.write_snapshots()
+                last_flush = time.monotonic()
+                if isinstance(item, threading.Event):
+                    item.set()
+
+            if stop:
+                break
+
+    def write_batches(self, batches:Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """
+        Appends the lines of each file, returns the batches which couldn't be written (retried on the next flush)
+        """
+        failed:Dict[str, List[str]] = dict()
+        for file_path, lines in batches.items():
+            try:
+                with self.file_lock:
+                    directory = os.path.dirname(file_path)
+                    if directory:
+                        files_util.create_directory_if_not_exists(directory_path=directory)
+                    new_file = not files_util.check_file_exists(file_path=file_path)
+                    with open(file_path, mode="a") as file:
+                        file.write((self.headers[file_path] if new_file else "") + "".join(lines))
+
+                    with self.lock:
+                        pending = self.pending.get(file_path, list())
+                        del pending[:len(lines)]
+                        if not pending:
+                            self.pending.pop(file_path, None)
+                self.written += len(lines)
+            except Exception as e:
+                failed[file_path] = lines
+                print(f"{'Log Write Error'.ljust(20)}: {file_path} {e}")
+        return failed
+
+    def write_snapshots(self):
+        """
+        Replaces the snapshot files, through a temporary file so a reader never sees a partial content
+        """
+        with self.lock:
+            snapshots = dict(self.snapshots)
+
+        for file_path, content in snapshots.items():
+            try:
+                with self.file_lock:
+                    directory = os.path.dirname(file_path)
+                    if directory:
+                        files_util.create_directory_if_not_exists(directory_path=directory)
+                    with open(f"{file_path}.tmp", mode="w") as file:
+                        file.write(content)
+                    os.replace(f"{file_path}.tmp", file_path)
+
+                    with self.lock:
+                        # A newer content is written on the next flush
+                        if self.snapshots.get(file_path) is content:
+                            del self.snapshots[file_path]
+            except Exception as e:
+                print(f"{'Log Write Error'.ljust(20)}: {file_path} {e}")
+
+    def flush(self, timeout:float=10):
+        """
+        Writes the queued lines to the disk, waits until they are written (or the timeout)
+        """
+        if self.closed or not self.thread.is_alive():
+            return
+        flushed = threading.Event()
+        self.queue.put(flushed, timeout=timeout)
+        flushed.wait(timeout=timeout)
+
+    def close(self, timeout:float=10):
+        """
+        Writes the queued lines and stops the background thread, called at the exit of the process
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        if self.thread.is_alive():
+            self.queue.put("STOP", timeout=timeout)
+            self.thread.join(timeout=timeout)
+
+    def exists(self, file_path:str) -> bool:
+        """
+        True when the file is on the disk or has lines waiting to be written
+        """
+        file_path = self.get_path(file_path=file_path)
+        with self.lock:
+            if file_path in self.pending:
+                return True
+        return files_util.check_file_exists(file_path=file_path)
+
+    def read_csv(self, file_path:str) -> pd.DataFrame:
+        """
+        Content of the file with the lines which are not yet written, None when the file doesn't exist
+        """
+        file_path = self.get_path(file_path=file_path)
+        with self.file_lock:
+            with self.lock:
+                lines = list(self.pending.get(file_path, list()))
+                header = self.headers.get(file_path)
+
+            if files_util.check_file_exists(file_path=file_path):
+                if not lines:
+                    return pd.read_csv(file_path)
+                with open(file_path, mode="r") as file:
+                    content = file.read()
+            elif header is not None:
+                content = header
+            else:
+                return None
+
+        return pd.read_csv(io.StringIO(content + "".join(lines)))
+
+
+# Single writer shared by the modules of the process
+log_writer = LogWriter()
+
+
+if __name__ == "__main__":
+    log_writer.write(file_path="PnLData/test_logs/{date}.csv", header="Timestamp,Value", lines=[f"{util.get_current_time().strftime('%Y-%m-%d %H:%M:%S')},{i}" for i in range(5)])
+    print(log_writer.read_csv(file_path="PnLData/test_logs/{date}.csv"))
+    log_writer.close()
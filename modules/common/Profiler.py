@@ -0,0 +1,82 @@
+import time
+from functools import wraps
+from typing import Dict, List
+
+class Profiler:
+    # Broker calls which are counted by instrument()
+    broker_calls = ["copy_rates_from_pos", "copy_rates_range", "symbol_info_tick", "symbol_info", "symbol_select", "positions_get",
+                    "orders_get", "history_deals_get", "order_send", "account_info"]
+
+    def __init__(self, enabled:bool=False):
+        """
+        Wall time and broker calls by stage of the trading cycle.
+
+        A cycle is split with `mark(stage)`, which closes the running stage and starts the next one. A stage can be
+        marked many times within a cycle (e.g strategy and orders per symbol), the times and calls are added up.
+        When it's disabled every call returns straight away, so the marks can stay in the trading loop.
+
+        Args:
+            enabled (bool): Record the cycles
+        """
+        self.enabled = enabled
+        self.cycles:List[Dict[str, Dict[str, float]]] = []
+        self.current:Dict[str, Dict[str, float]] = None
+        self.stage:str = None
+        self.stage_start:float = 0
+        self.cycle_start:float = 0
+
+    def instrument(self, backend):
+        """
+        Counts the broker calls of the backend by the running stage, the methods are wrapped on the backend instance
+        """
+        for name in self.broker_calls:
+            method = getattr(backend, name)
+            if getattr(method, "profiled", False):
+                continue
+
+            def counted(*args, __method=method, __name=name, **kwargs):
+                if self.enabled and self.current is not None:
+                    stage = self.current.setdefault(self.stage, {"time": 0.0, "calls": 0})
+                    stage["calls"] += 1
+                    self.current["total"]["calls"] += 1
+                return __method(*args, **kwargs)
+
+            counted.profiled = True
+            setattr(backend, name, wraps(method)(counted))
+
+    def start_cycle(self, stage:str="start"):
+        if not self.enabled:
+            return
+        self.current = {"total": {"time": 0.0, "calls": 0}}
+        self.cycle_start = time.perf_counter()
+        self.stage = stage
+        self.stage_start = self.cycle_start
+
+    def mark(self, stage:str):
+        if not self.enabled or self.current is None:
+            return
+        now = time.perf_counter()
+        running = self.current.setdefault(self.stage, {"time": 0.0, "calls": 0})
+        running["time"] += now - self.stage_start
+        self.stage = stage
+        self.stage_start = now
+
+    def end_cycle(self) -> Dict[str, Dict[str, float]]:
+        """
+        Closes the running stage and stores the cycle
+
+        Returns:
+            Dict[str, Dict[str, float]]: stage -> {"time": seconds, "calls": broker calls}, with the "total" of the cycle
+        """
+        if not self.enabled or self.current is None:
+            return None
+        self.mark(stage=None)
+        self.current["total"]["time"] = time.perf_counter() - self.cycle_start
+        cycle = self.current
+        self.cycles.append(cycle)
+        self.current = None
+        return cycle
+
+    def reset(self):
+        self.cycles.clear()
+        self.current = None
@@ -0,0 +1,52 @@
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Tuple
+
+class RollingWindow:
+    def __init__(self, window:timedelta):
+        """
+        Maximum and minimum of the values pushed over the last `window` of time, e.g the RR of the last 5 minutes.
+
+        Two monotonic deques keep the candidates of the maximum (decreasing values) and of the minimum (increasing
+        values), a pushed value removes the older values it dominates, and the values which are out of the window are
+        dropped from the front. Each value is added and removed once, so the push and the lookup are O(1) amortized,
+        whatever the number of values of the window.
+
+        Args:
+            window (timedelta): Length of the window, the values at or after (now - window) are in the window
+        """
+        self.window = window
+        self.max_values = deque() # (time, value), decreasing values
+        self.min_values = deque() # (time, value), increasing values
+
+    def push(self, time:datetime, value:float):
+        """
+        Adds the value, the times are expected in increasing order
+        """
+        while self.max_values and self.max_values[-1][1] <= value:
+            self.max_values.pop()
+        self.max_values.append((time, value))
+
+        while self.min_values and self.min_values[-1][1] >= value:
+            self.min_values.pop()
+        self.min_values.append((time, value))
+
+    def evict(self, now:datetime):
+        start = now - self.window
+        while self.max_values and self.max_values[0][0] < start:
+            self.max_values.popleft()
+        while self.min_values and self.min_values[0][0] < start:
+            self.min_values.popleft()
+
+    def get_max_min(self, now:datetime) -> Tuple[float, float]:
+        """
+        Maximum and minimum of the window ending at now, (None, None) when there are no values in the window
+        """
+        self.evict(now=now)
+        if not self.max_values:
+            return None, None
+        return self.max_values[0][1], self.min_values[0][1]
+
+    def clear(self):
+        self.max_values.clear()
+        self.min_values.clear()
@@ -1,4 +1,49 @@
 import socket
 buffer_ratio=0.3
 server_timezone=3
-local_ip = socket.gethostbyname(socket.gethostname()).replace(".", "_")
\ No newline at end of file
+candle_cache_size=1024
+tick_max_age=5
+candle_store_dir="data/candles"
+local_ip = socket.gethostbyname(socket.gethostname()).replace(".", "_")
+
+# Broker backend: MT5 (terminal) or SIMULATOR (local replay of the candles in simulator_data_dir)
+broker_backend="MT5"
+simulator_data_dir="data/simulator"
+simulator_start=None # e.g "2024-06-03 10:00", defaults to 5 days after the first candle
+simulator_balance=100000
+simulator_company="FTMO S.R.O."
+
+# Main loop scheduler (seconds), the strategies are woken on the bar closes of the trading and ATR timeframes. In between,
+# the pending entries are re-quoted and the strategies reading the forming bar are evaluated every strategy_check_interval
+pnl_check_interval=5
+strategy_check_interval=15
+tick_check_interval=1
+bar_close_delay=1
+
+# Symbols evaluated in parallel by the strategies of the main loop, the orders are still placed one after another
+strategy_workers=1
+
+# Bulk close of the positions (CloseEngine), retries of requotes/off quotes with an exponential backoff in seconds
+close_workers=20
+close_max_retries=3
+close_backoff=0.05
+close_max_backoff=0.5
+
+# Minimum move of a stop/target, in ticks of the symbol, before the modification is sent (StopModifier)
+sltp_min_ticks=2
+
+# Maximum age in seconds of the positions/orders/deals snapshot before it's loaded again (AccountState)
+account_state_max_age=2
+
+# Number of days before today which are kept in the deal history (DealTracker)
+deal_history_days=4
+
+# CSV logs written in the background (LogWriter), maximum queued writes and seconds between the appends of the files
+log_queue_size=10000
+log_flush_interval=1.0
+
+# Smoothing factor of the exponential average of the symbol PnL (SymbolPnLTracker), None to flag the symbols at risk on the plain mean
+symbol_pnl_ewma_alpha=None
+
+# SQLite database of the end of day summary of the accounts (DailySummary)
+daily_summary_db="PnLData/daily_summary.db"
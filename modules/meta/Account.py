@@ -1,10 +1,10 @@
-import MetaTrader5 as mt
-mt.initialize()
+from modules.meta.broker import mt5 as mt
 from typing import Tuple
+from modules.meta.AccountState import shared_state
 
 class Account:
     def get_account_name(self):
-        info = mt.account_info()
+        info = shared_state.account_info
         balance = round(info.balance/1000)
         return f"{info.name}"
 
@@ -14,14 +14,15 @@ class Account:
 
         This function fetches information such as balance, equity, margin-free funds,
         and profit from the MetaTrader 5 trading account. If the account information is
-        successfully obtained, it returns a Object containing these values.
+        successfully obtained, it returns a Object containing these values. The details are read from the account
+        state of the cycle (see AccountState).
 
         Returns:
             Object: Object of balance, equity, margin_free, profit.
                 Returns None if account information retrieval fails.
         """
         
-        account_info=mt.account_info()
+        account_info=shared_state.account_info
         return account_info
     
     def get_account_id(self):
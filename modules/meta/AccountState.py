@@ -0,0 +1,115 @@
+from modules.meta.broker import mt5
+import time
+import threading
+import pandas as pd
+from modules.meta.DealTracker import DealTracker
+from modules import config
+
+class AccountState:
+    def __init__(self, max_age:float=config.account_state_max_age):
+        """
+        Positions, pending orders, today's deals and account info of the broker, loaded once per cycle.
+
+        The trading cycle reads the same broker state from many places (exit checks, signal validity, remaining trades,
+        PnL etc.), they all read from this snapshot instead of calling the terminal each time. Each part is loaded on its
+        first read after a refresh, so a cycle which doesn't need the deals doesn't load them. The deals are tracked
+        incrementally (see DealTracker), a refresh only fetches the deals since the latest one.
+
+        The snapshot is dropped by `refresh()` at the start of a cycle, and by `invalidate()` right after every order_send
+        and sleep of the backend (it's a state listener of the backend), so an order never acts on the state from before
+        it. A snapshot older than `max_age` seconds is reloaded as well, for the callers outside of the trading loop.
+
+        Args:
+            max_age (float): Maximum age of the snapshot in seconds
+        """
+        self.max_age = max_age
+        self.lock = threading.RLock()
+        self.parts = dict()
+        self.loaded_at = dict()
+        self.loads = 0
+        self.reads = 0
+        self.deals = DealTracker()
+
+    def refresh(self):
+        """
+        Starts a new snapshot, called at the start of each cycle
+        """
+        self.invalidate()
+
+    def invalidate(self):
+        with self.lock:
+            self.parts.clear()
+            self.loaded_at.clear()
+
+    def _get(self, part:str, loader):
+        with self.lock:
+            self.reads += 1
+            if part not in self.parts or (time.monotonic() - self.loaded_at[part]) > self.max_age:
+                self.parts[part] = loader()
+                self.loaded_at[part] = time.monotonic()
+                self.loads += 1
+            return self.parts[part]
+
+    def _load_positions(self) -> tuple:
+        positions = mt5.positions_get()
+        return tuple(positions) if positions is not None else tuple()
+
+    def _load_orders(self) -> tuple:
+        orders = mt5.orders_get()
+        return tuple(orders) if orders is not None else tuple()
+
+    def _load_positions_df(self) -> pd.DataFrame:
+        positions = self.positions
+        if len(positions) > 0:
+            return pd.DataFrame(list(positions), columns=positions[0]._asdict().keys())
+        return pd.DataFrame()
+
+    @property
+    def positions(self) -> tuple:
+        """
+        Open positions, as returned by mt5.positions_get
+        """
+        return self._get("positions", self._load_positions)
+
+    @property
+    def orders(self) -> tuple:
+        """
+        Pending orders, as returned by mt5.orders_get
+        """
+        return self._get("orders", self._load_orders)
+
+    @property
+    def account_info(self):
+        return self._get("account_info", mt5.account_info)
+
+    def get_positions_df(self) -> pd.DataFrame:
+        """
+        Open positions as a DataFrame, a copy which the caller can modify
+        """
+        return self._get("positions_df", self._load_positions_df).copy()
+
+    def get_deals(self) -> DealTracker:
+        """
+        Deal history of the account, only the new deals are fetched once per snapshot
+        """
+        return self._get("deals", self.deals.update)
+
+    def get_todays_deals(self) -> pd.DataFrame:
+        """
+        Today's deals (entries and exits) as a DataFrame, a copy which the caller can modify
+        """
+        return self.get_deals().get_todays_deals().copy()
+
+    def get_symbols(self) -> list:
+        return list(set([position.symbol for position in self.positions]))
+
+
+# Single snapshot shared by the modules of the process, it's dropped after each order and sleep of the broker
+shared_state = AccountState()
+mt5.add_state_listener(shared_state.invalidate)
+
+
+if __name__ == "__main__":
+    print(shared_state.get_positions_df())
+    print(shared_state.get_todays_deals())
+    print(shared_state.account_info)
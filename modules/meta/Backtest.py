@@ -0,0 +1,352 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+from modules import config
+from modules.common.Directions import Directions
+from modules.meta.CandleStore import CandleStore
+from modules.meta import util
+import modules.meta.Currencies as curr
+
+class Backtest:
+    # Strategies of main.py which have a vectorized signal
+    supported_strategies = ["3CDL_STR", "4CDL_PULLBACK", "4CDL_PULLBACK_EXT", "SINGLES", "PREV_DAY_CLOSE_DIR", "4H_CLOSE_DIR", "U_REVERSAL"]
+
+    # Timeframe and number of ATR bars of the ATR based stop selections (RiskManager.get_stop_range)
+    atr_stops = {"ATR5M": (5, 12), "ATR15M": (15, 14), "ATR1H": (60, 14), "ATR2H": (120, 14), "ATR4H": (240, 14), "ATR1D": (1440, 14), "ATR1D_FACTOR": (1440, 14)}
+
+    def __init__(self, store:CandleStore=None, stop_ratio:float=1.0, target_ratio:float=2.0, stop_selection:str="ATR15M",
+                 market_direction:str=Directions.BREAK.name, num_cdl_for_stop:int=2, stop_expected_move:float=0.05,
+                 start_hour:int=10, start_minute:int=0, max_trades_per_day_per_symbol:int=2):
+        """
+        Backtest of the strategies over the stored candles, with array operations across the bars of each symbol.
+
+        The signal of a bar is calculated from the closed bars before it (same as the live strategies which read
+        the candles from start_candle 1) and the trade is taken at the open of the bar. Stops and targets follow
+        RiskManager.get_stop_range and Orders.long_entry/short_entry (stop distance rounded as in get_lot_size,
+        stop = stop_ratio x distance, target = target_ratio x distance). Positions are one at a time per symbol
+        (by_active_single_direction), taken between the start time and 22:00 and closed at 23:15 server time
+        (util.get_market_status). A bar which touches both the stop and the target is counted as a stop.
+
+        The result is in R units (1R is the risk of the position), which doesn't depend on the lot size, so the
+        lots are not simulated. Spread and commission are not included.
+
+        Args:
+            store (CandleStore): Candle source, defaults to the candle store of the config
+            stop_ratio (float): Stop multiplier of the stop distance
+            target_ratio (float): Target multiplier of the stop distance
+            stop_selection (str): Stop selection of RiskManager.get_stop_range (CANDLE, FACTOR, ATR5M, ATR15M, ATR1H, ...)
+            market_direction (str): BREAK trades the signal direction, REVERSE the opposite
+            num_cdl_for_stop (int): Number of previous candles for the CANDLE stop
+            stop_expected_move (float): Expected move in percentage for the FACTOR stop
+            start_hour (int): Server hour from which new trades are taken
+            start_minute (int): Server minute from which new trades are taken
+            max_trades_per_day_per_symbol (int): Maximum number of trades per symbol per day
+        """
+        self.store = store if store is not None else CandleStore()
+        self.stop_ratio = stop_ratio
+        self.target_ratio = target_ratio
+        self.stop_selection = stop_selection
+        self.market_direction = market_direction
+        self.num_cdl_for_stop = num_cdl_for_stop
+        self.stop_expected_move = stop_expected_move
+        self.start_minute_of_day = start_hour * 60 + start_minute
+        self.max_trades_per_day_per_symbol = max_trades_per_day_per_symbol
+
+        if stop_selection not in list(self.atr_stops.keys()) + ["CANDLE", "FACTOR"]:
+            raise Exception(f"Stop selection << {stop_selection} >> is not supported!")
+
+    """
+    Candle helpers
+    """
+    @staticmethod
+    def _aggregate(times:np.ndarray, open:np.ndarray, high:np.ndarray, low:np.ndarray, close:np.ndarray, minutes:int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Bars of a higher timeframe built from the candles
+
+        Returns:
+            Tuple[np.ndarray, Dict[str, np.ndarray]]: index of the higher timeframe bar of each candle, and the open/high/low/close of the bars
+        """
+        bar_time = times - times % (minutes * 60)
+        is_new_bar = np.concatenate(([True], bar_time[1:] != bar_time[:-1]))
+        starts = np.flatnonzero(is_new_bar)
+        ends = np.concatenate((starts[1:], [len(times)])) - 1
+        bars = {"open": open[starts], "high": np.maximum.reduceat(high, starts), "low": np.minimum.reduceat(low, starts), "close": close[ends]}
+        return np.cumsum(is_new_bar) - 1, bars
+
+    @staticmethod
+    def _shift(values:np.ndarray, periods:int, fill=np.nan) -> np.ndarray:
+        shifted = np.full(len(values), fill, dtype=np.float64 if fill is np.nan else values.dtype)
+        if periods < len(values):
+            shifted[periods:] = values[:len(values) - periods]
+        return shifted
+
+    def _three_candle_strike(self, open:np.ndarray, high:np.ndarray, low:np.ndarray, close:np.ndarray) -> np.ndarray:
+        """
+        Strategies.get_three_candle_strike of the three candles ending at each candle, 1 LONG, -1 SHORT, 0 none
+        """
+        higher = (high > self._shift(high, 1)) & (low > self._shift(low, 1))
+        lower = (high < self._shift(high, 1)) & (low < self._shift(low, 1))
+        body = close - open
+        bullish_bodies = (body > 0) & (self._shift(body, 1) > 0) & (self._shift(body, 2) > 0)
+        bearish_bodies = (body < 0) & (self._shift(body, 1) < 0) & (self._shift(body, 2) < 0)
+        is_bullish = bullish_bodies & higher & self._shift(higher, 1, False)
+        is_bearish = bearish_bodies & lower & self._shift(lower, 1, False)
+        return is_bullish.astype(np.int8) - is_bearish.astype(np.int8)
+
+    """
+    Signals, the value at a candle is the direction taken at the open of the candle (1 LONG, -1 SHORT, 0 none)
+    """
+    def get_signals(self, strategy:str, candles:Dict[str, np.ndarray], spread:np.ndarray) -> np.ndarray:
+        open, high, low, close, times = candles["open"], candles["high"], candles["low"], candles["close"], candles["time"]
+
+        match strategy:
+            case "3CDL_STR":
+                # Candles 1, 2 and 3 before the current one
+                return self._shift(self._three_candle_strike(open, high, low, close), 1, np.int8(0))
+
+            case "4CDL_PULLBACK" | "4CDL_PULLBACK_EXT":
+                # Strike of the candles 2, 3 and 4 before, pulled back by the previous candle
+                strike = self._shift(self._three_candle_strike(open, high, low, close), 2, np.int8(0))
+                prev_open, prev_high, prev_low, prev_close = (self._shift(values, 1) for values in (open, high, low, close))
+                prev_to_prev_high, prev_to_prev_low = self._shift(high, 2), self._shift(low, 2)
+                is_solid = util.is_solid_candle(open=prev_open, high=prev_high, low=prev_low, close=prev_close)
+                if strategy == "4CDL_PULLBACK_EXT":
+                    long_break, short_break = prev_low < prev_to_prev_low, prev_high > prev_to_prev_high
+                else:
+                    long_break, short_break = prev_close < prev_to_prev_low, prev_close > prev_to_prev_high
+                is_long = is_solid & (strike == 1) & (prev_close <= prev_open) & long_break
+                is_short = is_solid & (strike == -1) & (prev_close > prev_open) & short_break
+                return is_long.astype(np.int8) - is_short.astype(np.int8)
+
+            case "SINGLES":
+                prev_open, prev_high, prev_low, prev_close = (self._shift(values, 1) for values in (open, high, low, close))
+                is_valid = util.is_solid_candle(open=prev_open, high=prev_high, low=prev_low, close=prev_close) & (np.abs(prev_open - prev_close) > self._shift(spread, 1) * 3)
+                return np.where(is_valid, np.where(prev_close > prev_open, 1, -1), 0).astype(np.int8)
+
+            case "PREV_DAY_CLOSE_DIR" | "4H_CLOSE_DIR":
+                bar_index, bars = self._aggregate(times, open, high, low, close, minutes=1440 if strategy == "PREV_DAY_CLOSE_DIR" else 240)
+                direction = np.where(bars["close"] > bars["open"], 1, -1).astype(np.int8)
+                previous_bar = bar_index - 1
+                return np.where(previous_bar >= 0, direction[np.maximum(previous_bar, 0)], 0).astype(np.int8)
+
+            case "U_REVERSAL":
+                return self._u_reversal_signals(open, high, low, close, times)
+
+        raise Exception(f"Strategy << {strategy} >> is not supported by the backtest, supported: {self.supported_strategies}")
+
+    def _u_reversal_signals(self, open:np.ndarray, high:np.ndarray, low:np.ndarray, close:np.ndarray, times:np.ndarray) -> np.ndarray:
+        """
+        Strategies.get_u_reversal for every candle. The scan over the three candle strikes of the day runs over all
+        the candles at once, one step per strike distance (at most the number of candles in a day).
+        """
+        n_candles = len(times)
+        strike = self._three_candle_strike(open, high, low, close)
+        day = times // 86400
+        # Today's candles up to and including the current one
+        day_start = np.flatnonzero(np.concatenate(([True], day[1:] != day[:-1])))
+        todays_count = np.arange(n_candles) - day_start[np.cumsum(np.concatenate(([True], day[1:] != day[:-1]))) - 1] + 1
+
+        prev_open, prev_close = self._shift(open, 1), self._shift(close, 1)
+        signals = np.zeros(n_candles, dtype=np.int8)
+        found = np.zeros(n_candles, dtype=bool)
+        mid_high = np.full(n_candles, np.nan)
+        mid_low = np.full(n_candles, np.nan)
+
+        for distance in range(2, int(todays_count.max()) - 1 if n_candles else 0):
+            if distance > 2:
+                # Candles between the strike and the previous candle (distance 2 to distance - 1)
+                mid_high = np.fmax(mid_high, self._shift(high, distance - 1))
+                mid_low = np.fmin(mid_low, self._shift(low, distance - 1))
+
+            active = ~found & (distance < todays_count - 1)
+            if not active.any():
+                continue
+
+            strike_at = self._shift(strike, distance, np.int8(0))
+            break_low, break_high = self._shift(low, distance), self._shift(high, distance)
+            long_overrided = (mid_low < break_low) & (break_low < mid_high)
+            short_overrided = (mid_low < break_high) & (break_high < mid_high)
+
+            is_long = active & (strike_at == 1) & (prev_close < break_low) & (prev_open > break_low) & ~long_overrided
+            is_short = active & (strike_at == -1) & (prev_close > break_high) & (prev_open < break_high) & ~short_overrided
+            signals[is_long] = 1
+            signals[is_short] = -1
+            # The nearest strike with a valid break is returned
+            found |= is_long | is_short
+
+        return signals
+
+    """
+    Stops
+    """
+    def _round(self, symbol:str, prices:np.ndarray) -> np.ndarray:
+        # Decimals of Prices.round
+        return np.round(prices, util.get_round_factor(symbol=symbol))
+
+    def _atr(self, candles:Dict[str, np.ndarray], minutes:int, n_atr:int, start_candle:int) -> np.ndarray:
+        """
+        Indicators.get_atr at the open of each candle (the mean true range of the n_atr - 1 closed bars before start_candle)
+        """
+        bar_index, bars = self._aggregate(candles["time"], candles["open"], candles["high"], candles["low"], candles["close"], minutes=minutes)
+        true_range = np.maximum(bars["high"] - bars["low"], np.abs(bars["high"] - bars["close"]))
+        tr_sum = np.concatenate(([0.0], np.cumsum(true_range)))
+        # Position 1 is the latest closed bar, the forming bar is bar_index
+        end = np.maximum(bar_index - start_candle, 0)
+        begin = np.maximum(bar_index - start_candle - (n_atr - 1), 0)
+        count = end - begin
+        with np.errstate(divide="ignore", invalid="ignore"):
+            atr = np.where(count > 0, (tr_sum[end] - tr_sum[begin]) / np.maximum(count, 1), 0.0)
+        return np.round(atr, 5)
+
+    def get_stop_distance(self, symbol:str, candles:Dict[str, np.ndarray], timeframe:int) -> np.ndarray:
+        """
+        RiskManager.get_stop_range optimal distance at the open of each candle, the mid price is the open
+        """
+        mid_price = candles["open"]
+        if self.stop_selection in self.atr_stops:
+            minutes, n_atr = self.atr_stops[self.stop_selection]
+            if minutes < timeframe:
+                raise Exception(f"Stop selection << {self.stop_selection} >> needs candles of {minutes} minutes or lower, the backtest runs on {timeframe}")
+            distance = self._atr(candles=candles, minutes=minutes, n_atr=n_atr, start_candle=1)
+            return distance / 14 if self.stop_selection == "ATR1D_FACTOR" else distance
+
+        if self.stop_selection == "FACTOR":
+            return mid_price * self.stop_expected_move / 100
+
+        # CANDLE: high/low of the previous candles and the current one (only the open is known at the entry)
+        higher_stop, lower_stop = mid_price.copy(), mid_price.copy()
+        for i in range(1, self.num_cdl_for_stop + 1):
+            higher_stop = np.fmax(higher_stop, self._shift(candles["high"], i))
+            lower_stop = np.fmin(lower_stop, self._shift(candles["low"], i))
+        atr = self._atr(candles=candles, minutes=timeframe, n_atr=14, start_candle=0)
+        optimal_distance = np.maximum(atr, np.maximum(np.abs(higher_stop - mid_price), np.abs(lower_stop - mid_price)))
+        return optimal_distance + optimal_distance * config.buffer_ratio
+
+    """
+    Simulation
+    """
+    def _exit_candles(self, times:np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Index of the candle where a position opened at each candle is closed by the market close, and whether it's
+        closed at the open of that candle (23:15 reached) or at its close (last candle of the day)
+        """
+        day = times // 86400
+        minute_of_day = (times % 86400) // 60
+        is_last_of_day = np.concatenate((day[1:] != day[:-1], [True]))
+        is_close_time = minute_of_day >= 23 * 60 + 15
+        exit_marks = np.flatnonzero(is_last_of_day | is_close_time)
+        exit_index = exit_marks[np.searchsorted(exit_marks, np.arange(len(times)), side="left")]
+        return exit_index, is_close_time[exit_index]
+
+    def simulate_symbol(self, symbol:str, strategy:str, timeframe:int, start_epoch:int=None, end_epoch:int=None) -> pd.DataFrame:
+        """
+        Trades of a symbol over the stored candles
+
+        Returns:
+            pd.DataFrame: One row per trade, empty if there are no candles or trades
+        """
+        columns = ["symbol", "direction", "entry_time", "exit_time", "entry_price", "stop_price", "target_price", "exit_price", "exit_reason", "rr"]
+        candles = {column: np.asarray(values, dtype=np.float64 if column != "time" else np.int64)
+                   for column, values in self.store.read(symbol=symbol, timeframe=timeframe, start_epoch=start_epoch, end_epoch=end_epoch).items()}
+        times = candles["time"]
+        if len(times) < 5:
+            return pd.DataFrame(columns=columns)
+
+        point = 10.0 ** -util.get_round_factor(symbol=symbol)
+        signals = self.get_signals(strategy=strategy, candles=candles, spread=candles["spread"] * point)
+        if self.market_direction == Directions.REVERSE.name:
+            signals = -signals
+
+        minute_of_day = (times % 86400) // 60
+        weekday = ((times // 86400) + 3) % 7  # 0 is Monday
+        in_session = (minute_of_day >= self.start_minute_of_day) & (minute_of_day < 22 * 60) & (weekday < 5)
+
+        entry_price = self._round(symbol=symbol, prices=candles["open"])
+        distance = self.get_stop_distance(symbol=symbol, candles=candles, timeframe=timeframe)
+        long_stop = self._round(symbol=symbol, prices=entry_price - distance)
+        short_stop = self._round(symbol=symbol, prices=entry_price + distance)
+        points_in_stop = np.where(signals > 0, entry_price - long_stop, short_stop - entry_price)
+        if symbol in curr.currencies:
+            points_in_stop = np.round(points_in_stop, 5)
+
+        direction = signals.astype(np.float64)
+        stop_price = self._round(symbol=symbol, prices=entry_price - direction * self.stop_ratio * points_in_stop)
+        target_price = self._round(symbol=symbol, prices=entry_price + direction * self.target_ratio * points_in_stop)
+
+        candidates = np.flatnonzero((signals != 0) & in_session & (points_in_stop > 0))
+        exit_index, exit_at_open = self._exit_candles(times=times)
+        day = times // 86400
+        high, low = candles["high"], candles["low"]
+
+        trades = []
+        trades_of_day = dict()
+        next_free = 0
+        position = np.searchsorted(candidates, next_free)
+        while position < len(candidates):
+            i = candidates[position]
+            if trades_of_day.get(day[i], 0) >= self.max_trades_per_day_per_symbol:
+                # Skip to the next day
+                position = np.searchsorted(candidates, np.searchsorted(day, day[i] + 1), side="left")
+                continue
+
+            last = exit_index[i]
+            # The candle of the market close is not traded when the position is closed at its open
+            window = slice(i, last if exit_at_open[i] else last + 1)
+            if direction[i] > 0:
+                stop_hit, target_hit = low[window] <= stop_price[i], high[window] >= target_price[i]
+            else:
+                stop_hit, target_hit = high[window] >= stop_price[i], low[window] <= target_price[i]
+
+            stop_at = np.argmax(stop_hit) if stop_hit.any() else len(stop_hit)
+            target_at = np.argmax(target_hit) if target_hit.any() else len(target_hit)
+
+            if stop_at < len(stop_hit) and stop_at <= target_at:
+                exit_bar, exit_price, exit_reason = i + stop_at, stop_price[i], "STOP"
+            elif target_at < len(target_hit):
+                exit_bar, exit_price, exit_reason = i + target_at, target_price[i], "TARGET"
+            else:
+                exit_bar, exit_reason = last, "MARKET_CLOSE"
+                exit_price = candles["open"][last] if exit_at_open[i] else candles["close"][last]
+
+            rr = (exit_price - entry_price[i]) * direction[i] / (self.stop_ratio * points_in_stop[i])
+            trades.append((symbol, Directions.LONG.name if direction[i] > 0 else Directions.SHORT.name, times[i], times[exit_bar],
+                           entry_price[i], stop_price[i], target_price[i], exit_price, exit_reason, round(rr, 2)))
+            trades_of_day[day[i]] = trades_of_day.get(day[i], 0) + 1
+
+            # Next trade once the position is closed, from the next candle
+            next_free = exit_bar + 1
+            position = np.searchsorted(candidates, next_free)
+
+        trades = pd.DataFrame(trades, columns=columns)
+        trades["entry_time"] = pd.to_datetime(trades["entry_time"], unit="s")
+        trades["exit_time"] = pd.to_datetime(trades["exit_time"], unit="s")
+        return trades
+
+    def run(self, strategy:str, symbols:List[str], timeframe:int, start_epoch:int=None, end_epoch:int=None) -> pd.DataFrame:
+        """
+        Trades of all the symbols, sorted by the entry time (server time)
+        """
+        if strategy not in self.supported_strategies:
+            raise Exception(f"Strategy << {strategy} >> is not supported by the backtest, supported: {self.supported_strategies}")
+
+        trades = [self.simulate_symbol(symbol=symbol, strategy=strategy, timeframe=timeframe, start_epoch=start_epoch, end_epoch=end_epoch) for symbol in symbols]
+        trades = [symbol_trades for symbol_trades in trades if not symbol_trades.empty]
+        if not trades:
+            return pd.DataFrame(columns=["symbol", "direction", "entry_time", "exit_time", "entry_price", "stop_price", "target_price", "exit_price", "exit_reason", "rr"])
+        return pd.concat(trades, ignore_index=True).sort_values("entry_time").reset_index(drop=True)
+
+    @staticmethod
+    def daily_rr(trades:pd.DataFrame) -> pd.DataFrame:
+        """
+        Daily result in R units, by the server date of the entry
+
+        Returns:
+            pd.DataFrame: date, trades, wins, rr (sum of the day) and cumulative_rr
+        """
+        if trades.empty:
+            return pd.DataFrame(columns=["date", "trades", "wins", "rr", "cumulative_rr"])
+
+        daily = trades.assign(date=trades["entry_time"].dt.date, win=trades["rr"] > 0).groupby("date").agg(trades=("rr", "size"), wins=("win", "sum"), rr=("rr", "sum")).reset_index()
+        daily["rr"] = daily["rr"].round(2)
+        daily["cumulative_rr"] = daily["rr"].cumsum().round(2)
+        return daily
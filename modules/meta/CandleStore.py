@@ -0,0 +1,219 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+from modules import config
+from modules.meta import util
+from modules.meta.wrapper import Wrapper
+
+class CandleStore:
+    # Same columns and types as the rates returned by the terminal
+    dtypes = {"time": np.dtype("<i8"), "open": np.dtype("<f8"), "high": np.dtype("<f8"), "low": np.dtype("<f8"),
+              "close": np.dtype("<f8"), "tick_volume": np.dtype("<u8"), "spread": np.dtype("<i4"), "real_volume": np.dtype("<u8")}
+
+    def __init__(self, root_dir:str=config.candle_store_dir):
+        """
+        On-disk candle store, one directory per symbol and timeframe with one .npy file per column:
+
+            <root_dir>/<symbol>/<timeframe>/time.npy, open.npy, high.npy ...
+
+        Only closed bars are stored, ordered by time. New bars are appended in place (the existing bytes are never
+        rewritten, only the shape in the .npy header is updated), so keeping years of candles up to date costs the
+        size of the new bars. Readers get memory-mapped arrays, a time range is a zero-copy slice of the files.
+
+        The time column is written last, its length is the number of committed bars. A partially written append
+        (e.g the process is killed) is ignored by the readers and overwritten by the next append.
+
+        Args:
+            root_dir (str): Directory of the store
+        """
+        self.root_dir = root_dir
+
+    def _series_dir(self, symbol:str, timeframe:int) -> str:
+        return os.path.join(self.root_dir, symbol, str(timeframe))
+
+    def _column_path(self, symbol:str, timeframe:int, column:str) -> str:
+        return os.path.join(self._series_dir(symbol=symbol, timeframe=timeframe), f"{column}.npy")
+
+    def list_series(self) -> List[Tuple[str, int]]:
+        """
+        (symbol, timeframe) of all the stored series
+        """
+        series = []
+        if not os.path.isdir(self.root_dir):
+            return series
+        for symbol in sorted(os.listdir(self.root_dir)):
+            symbol_dir = os.path.join(self.root_dir, symbol)
+            if not os.path.isdir(symbol_dir):
+                continue
+            for timeframe in sorted(os.listdir(symbol_dir)):
+                if timeframe.isdigit() and os.path.exists(self._column_path(symbol=symbol, timeframe=int(timeframe), column="time")):
+                    series.append((symbol, int(timeframe)))
+        return series
+
+    def __len__(self) -> int:
+        return len(self.list_series())
+
+    def count(self, symbol:str, timeframe:int) -> int:
+        """
+        Number of stored bars, 0 if the series doesn't exist
+        """
+        path = self._column_path(symbol=symbol, timeframe=timeframe, column="time")
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as file:
+            shape, _, _, _ = self._read_header(file=file)
+        return shape[0]
+
+    def last_epoch(self, symbol:str, timeframe:int) -> int:
+        """
+        Open time of the most recent stored bar, None if the series is empty
+        """
+        n_bars = self.count(symbol=symbol, timeframe=timeframe)
+        if n_bars == 0:
+            return None
+        times = np.load(self._column_path(symbol=symbol, timeframe=timeframe, column="time"), mmap_mode="r")
+        return int(times[n_bars - 1])
+
+    @staticmethod
+    def _read_header(file) -> Tuple[Tuple[int], np.dtype, int, int]:
+        """
+        Shape, dtype, offset of the data and length of the header of an opened .npy file
+        """
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(file)
+        data_offset = file.tell()
+        # magic string (6) + version (2) + header length field (2 for 1.0, 4 for later versions)
+        header_length = data_offset - (10 if version == (1, 0) else 12)
+        return shape, dtype, data_offset, header_length
+
+    def _append_column(self, path:str, values:np.ndarray, n_committed:int):
+        """
+        Writes the values after the first `n_committed` elements of the column file and updates the shape in the header.
+        Falls back to rewriting the file when the new header doesn't fit in the existing one.
+        """
+        if not os.path.exists(path):
+            np.save(path, values)
+            return
+
+        with open(path, "r+b") as file:
+            shape, dtype, data_offset, header_length = self._read_header(file=file)
+            n_committed = min(n_committed, shape[0])
+            header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (np.lib.format.dtype_to_descr(dtype), n_committed + len(values))
+
+            if len(header) + 1 > header_length:
+                existing = np.fromfile(file, dtype=dtype, count=n_committed, offset=0)
+            else:
+                file.seek(data_offset + n_committed * dtype.itemsize)
+                file.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+                file.truncate()
+                file.seek(data_offset - header_length)
+                file.write((header.ljust(header_length - 1) + "\n").encode("latin1"))
+                return
+
+        np.save(path, np.concatenate((existing, values.astype(dtype))))
+
+    def append(self, symbol:str, timeframe:int, candles) -> int:
+        """
+        Appends the bars which are newer than the last stored bar.
+
+        Args:
+            symbol (str): Symbol of the candles
+            timeframe (int): Timeframe of the candles in minutes
+            candles (pd.DataFrame | np.ndarray): Closed bars with at least the time (epoch) and the price columns,
+                e.g the output of Wrapper.get_last_n_candles or copy_rates_from_pos
+
+        Returns:
+            int: Number of appended bars
+        """
+        if isinstance(candles, np.ndarray):
+            candles = pd.DataFrame(candles)
+        if candles.empty:
+            return 0
+
+        n_committed = self.count(symbol=symbol, timeframe=timeframe)
+        last_epoch = self.last_epoch(symbol=symbol, timeframe=timeframe)
+        times = candles["time"].to_numpy(dtype=np.int64)
+
+        new_bars = np.ones(len(times), dtype=bool) if last_epoch is None else times > last_epoch
+        if not new_bars.any():
+            return 0
+
+        # Sorted and unique by time, in case the input overlaps
+        new_candles = candles[new_bars].sort_values("time").drop_duplicates(subset="time", keep="last")
+        os.makedirs(self._series_dir(symbol=symbol, timeframe=timeframe), exist_ok=True)
+
+        # The time column commits the bars, so it's written after all the other columns
+        for column in [column for column in self.dtypes if column != "time"] + ["time"]:
+            if column in new_candles.columns:
+                values = new_candles[column].to_numpy().astype(self.dtypes[column])
+            else:
+                values = np.zeros(len(new_candles), dtype=self.dtypes[column])
+            self._append_column(path=self._column_path(symbol=symbol, timeframe=timeframe, column=column),
+                                values=values, n_committed=n_committed)
+
+        return len(new_candles)
+
+    def update(self, wrapper:Wrapper, symbol:str, timeframe:int, max_candles:int=28000) -> int:
+        """
+        Downloads the closed bars since the last stored bar (all `max_candles` for a new series) and appends them.
+
+        Returns:
+            int: Number of appended bars
+        """
+        last_epoch = self.last_epoch(symbol=symbol, timeframe=timeframe)
+        if last_epoch is None:
+            n_candles = max_candles
+        else:
+            # Number of bars which could have been closed since, gaps (e.g weekends) only make it larger
+            n_candles = min(max_candles, (util.get_bar_open_epoch(timeframe=timeframe) - last_epoch) // (timeframe * 60) - 1)
+
+        if n_candles < 1:
+            return 0
+
+        candles = wrapper.get_last_n_candles(symbol=symbol, timeframe=timeframe, start_candle=1, n_candles=n_candles)
+        return self.append(symbol=symbol, timeframe=timeframe, candles=candles)
+
+    def read(self, symbol:str, timeframe:int, start_epoch:int=None, end_epoch:int=None, columns:List[str]=None) -> Dict[str, np.ndarray]:
+        """
+        Memory-mapped, read only views of the stored columns, optionally limited to a time range (inclusive).
+
+        Returns:
+            Dict[str, np.ndarray]: column -> array, empty arrays if the series doesn't exist
+        """
+        columns = list(self.dtypes.keys()) if columns is None else columns
+        n_bars = self.count(symbol=symbol, timeframe=timeframe)
+        if n_bars == 0:
+            return {column: np.zeros(0, dtype=self.dtypes[column]) for column in columns}
+
+        times = np.load(self._column_path(symbol=symbol, timeframe=timeframe, column="time"), mmap_mode="r")[:n_bars]
+        begin = 0 if start_epoch is None else int(np.searchsorted(times, start_epoch, side="left"))
+        end = n_bars if end_epoch is None else int(np.searchsorted(times, end_epoch, side="right"))
+
+        data = dict()
+        for column in columns:
+            if column == "time":
+                data[column] = times[begin:end]
+            else:
+                data[column] = np.load(self._column_path(symbol=symbol, timeframe=timeframe, column=column), mmap_mode="r")[begin:end]
+        return data
+
+    def read_dataframe(self, symbol:str, timeframe:int, start_epoch:int=None, end_epoch:int=None, columns:List[str]=None) -> pd.DataFrame:
+        """
+        Stored candles as a DataFrame (copied into memory), same columns as Wrapper.get_last_n_candles
+        """
+        data = self.read(symbol=symbol, timeframe=timeframe, start_epoch=start_epoch, end_epoch=end_epoch, columns=columns)
+        return pd.DataFrame({column: np.array(values) for column, values in data.items()})
+
+    def read_rates(self, symbol:str, timeframe:int, start_epoch:int=None, end_epoch:int=None) -> np.ndarray:
+        """
+        Stored candles as a structured array, same layout as copy_rates_from_pos
+        """
+        data = self.read(symbol=symbol, timeframe=timeframe, start_epoch=start_epoch, end_epoch=end_epoch)
+        rates = np.zeros(len(data["time"]), dtype=list(self.dtypes.items()))
+        for column, values in data.items():
+            rates[column] = values
+        return rates
@@ -0,0 +1,134 @@
+from modules.meta.broker import mt5
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+from modules import config
+
+class CloseEngine:
+    def __init__(self, max_workers:int=config.close_workers, max_retries:int=config.close_max_retries,
+                 backoff:float=config.close_backoff, max_backoff:float=config.close_max_backoff):
+        """
+        Sends the close (and cancel) requests of many positions at once.
+
+        Every request runs on its own worker, so the last position is closed about as soon as the first one. A requote,
+        off quote or changed price is retried with a fresh price after an exponential backoff (bounded by `max_backoff`),
+        which only holds the worker of that ticket. The backoff is on the wall clock, it's for the terminal to settle.
+
+        Args:
+            max_workers (int): Maximum number of requests in flight
+            max_retries (int): Retries of a request after the first attempt
+            backoff (float): Seconds before the first retry, doubled on each retry
+            max_backoff (float): Maximum seconds between two attempts
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="close")
+
+        # Temporary rejections, which are worth to retry with a new price
+        self.retry_codes = [getattr(mt5, name) for name in ["TRADE_RETCODE_REQUOTE", "TRADE_RETCODE_PRICE_CHANGED", "TRADE_RETCODE_PRICE_OFF",
+                                                            "TRADE_RETCODE_TIMEOUT", "TRADE_RETCODE_CONNECTION"] if hasattr(mt5, name)]
+
+    def get_close_request(self, position) -> dict:
+        """
+        Market request which closes the position, priced with the latest tick
+        """
+        tick = mt5.symbol_info_tick(position.symbol)
+        return {
+            "action": mt5.TRADE_ACTION_DEAL,
+            "symbol": position.symbol,
+            "volume": position.volume,
+            "type": mt5.ORDER_TYPE_BUY if position.type == 1 else mt5.ORDER_TYPE_SELL,
+            "position": position.ticket,
+            "price": tick.bid if position.type == 1 else tick.ask,
+            "deviation": 20,
+            "magic": 234000,
+            "comment": 'close_trail_version',
+            "type_time": mt5.ORDER_TIME_GTC,
+            "type_filling": mt5.ORDER_FILLING_IOC, # also tried with ORDER_FILLING_RETURN
+        }
+
+    def get_cancel_request(self, order) -> dict:
+        return {
+            "action": mt5.TRADE_ACTION_REMOVE,
+            "order": order.ticket,
+        }
+
+    def send(self, ticket:int, symbol:str, build_request:Callable[[], dict]) -> Dict:
+        """
+        Sends the request until it's done, rejected for good or out of retries. The request is built again on each
+        attempt, so the retries go with the latest price.
+
+        Returns:
+            Dict: Outcome of the ticket (ticket, symbol, status, retcode, comment, attempts, latency_ms)
+        """
+        start = time.perf_counter()
+        attempts, retcode, comment = 0, None, ""
+
+        while True:
+            attempts += 1
+            try:
+                result = mt5.order_send(build_request())
+            except Exception as e:
+                result, comment = None, str(e)
+
+            if result is not None:
+                retcode, comment = result.retcode, result.comment
+                if retcode == mt5.TRADE_RETCODE_DONE:
+                    status = "DONE"
+                    break
+
+            # No result means the terminal did not answer, which is worth another try as well
+            if (result is not None and retcode not in self.retry_codes) or attempts > self.max_retries:
+                status = "FAILED"
+                break
+
+            time.sleep(min(self.backoff * 2 ** (attempts - 1), self.max_backoff))
+
+        return {"ticket": ticket, "symbol": symbol, "status": status, "retcode": retcode, "comment": comment,
+                "attempts": attempts, "latency_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+    def execute(self, jobs:List[tuple]) -> pd.DataFrame:
+        """
+        Sends the (ticket, symbol, build_request) jobs concurrently
+
+        Returns:
+            pd.DataFrame: Outcome by ticket, in the same order as the jobs
+        """
+        columns = ["ticket", "symbol", "status", "retcode", "comment", "attempts", "latency_ms"]
+        if not jobs:
+            return pd.DataFrame(columns=columns)
+
+        if len(jobs) == 1:
+            outcomes = [self.send(*jobs[0])]
+        else:
+            outcomes = list(self.pool.map(lambda job: self.send(*job), jobs))
+
+        return pd.DataFrame(outcomes, columns=columns)
+
+    def close_positions(self, positions:list) -> pd.DataFrame:
+        """
+        Closes the positions concurrently
+
+        Args:
+            positions (list): Positions as returned by mt5.positions_get
+
+        Returns:
+            pd.DataFrame: Outcome and latency by position ticket
+        """
+        jobs = [(position.ticket, position.symbol, lambda position=position: self.get_close_request(position=position)) for position in positions]
+        return self.execute(jobs=jobs)
+
+    def cancel_orders(self, orders:list) -> pd.DataFrame:
+        """
+        Cancels the pending orders concurrently
+
+        Args:
+            orders (list): Orders as returned by mt5.orders_get
+
+        Returns:
+            pd.DataFrame: Outcome and latency by order ticket
+        """
+        jobs = [(order.ticket, order.symbol, lambda order=order: self.get_cancel_request(order=order)) for order in orders]
+        return self.execute(jobs=jobs)
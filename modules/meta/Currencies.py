@@ -1,5 +1,4 @@
-import MetaTrader5 as mt
-mt.initialize()
+from modules.meta.broker import mt5 as mt
 from modules.meta import util
 import numpy as np
 
@@ -0,0 +1,218 @@
+from collections import deque
+import time
+import numpy as np
+from typing import Dict, List, Tuple
+import modules.meta.Currencies as curr
+from modules.meta.TickSnapshot import TickSnapshot, shared_ticks
+
+# Dollar value of a symbol: coefficient, [(pair, exponent)] multiplied (exponent 1) or divided (exponent -1) in order,
+# and the rounding digits (None for no rounding)
+Rule = Tuple[float, List[Tuple[str, int]], int]
+
+def get_broker_rules(company:str) -> Tuple[str, Dict[str, Rule]]:
+    """
+    Symbol suffix of the broker, and the dollar values which are not derived from the currency pair (indexes, gold,
+    adjusted pairs)
+    """
+    def indexes(suffix:str, sp500:List[str], uk100:str=None, hk50:str=None, jp225:str=None, aus200:str=None) -> Dict[str, Rule]:
+        rules = {symbol: (1.0, [], None) for symbol in sp500}
+        if uk100:
+            rules[uk100] = (1.0, [(f"GBPUSD{suffix}", 1)], None)
+        if hk50:
+            rules[hk50] = (1.0, [(f"USDHKD{suffix}", -1)], 4)
+        if jp225:
+            rules[jp225] = (1.0, [(f"USDJPY{suffix}", -1)], 4)
+        if aus200:
+            rules[aus200] = (1.0, [(f"AUDUSD{suffix}", 1)], None)
+
+        # TODO, This fix number 1.6 has to be changed!
+        rules[f"AUDUSD{suffix}"] = (1.6, [(f"AUDUSD{suffix}", 1)], None)
+        rules[f"NZDUSD{suffix}"] = (1.6, [(f"NZDUSD{suffix}", 1)], None)
+        return rules
+
+    if "FTMO" in company or company == "FundedNext Ltd":
+        rules = indexes(suffix="", sp500=["US500.cash"] + curr.master_stocks, uk100="UK100.cash", hk50="HK50.cash", jp225="JP225.cash", aus200="AUS200.cash")
+        rules["XAUUSD"] = (1.0, [("XAUUSD", 1)], None)
+        return "", rules
+    elif company == "Black Bull Group Limited":
+        rules = indexes(suffix="", sp500=["SPX500"], uk100="FTSE100", jp225="JP225")
+        rules["XAUUSD"] = (2.0, [("XAUUSD", -1)], None)
+        return "", rules
+    elif company == "AXSE Brokerage Ltd.":
+        rules = indexes(suffix="_raw", sp500=["SP_raw"], uk100="FTSE_raw", hk50="HK50_raw", jp225="NIKKEI_raw", aus200="ASX_raw")
+        rules["XAUUSD_raw"] = (2.0, [("XAUUSD_raw", -1)], None)
+        return "_raw", rules
+    elif company == "TF Global Markets (Aust) Pty Ltd":
+        rules = indexes(suffix="x", sp500=["SPX500x"], uk100="UK100x", hk50="HK50.cash", jp225="JPN225X", aus200="AUS200.cash")
+        rules["XAUUSDx"] = (2.0, [("XAUUSDx", -1)], None)
+        return "x", rules
+    elif company == "GrowthNext - F.Z.C":
+        rules = indexes(suffix="", sp500=["SPX500"], uk100="UK100", hk50="HK50", jp225="JP225", aus200="AUS200")
+        rules["XAUUSD"] = (2.0, [("XAUUSD", -1)], None)
+        return "", rules
+    else:
+        raise Exception(f"The << {company} >> Trading platform not found")
+
+
+class CurrencyConverter:
+    def __init__(self, ticks:TickSnapshot=shared_ticks, company:str=curr.company, pairs:List[str]=None):
+        """
+        Dollar value of the tradable symbols (see Prices.get_dollar_value), resolved once per tick snapshot.
+
+        The currency pairs of the broker form a graph (currency -> currency through a pair), which gives the conversion
+        of any base currency to USD: the direct pair when it exists (e.g EURUSD), or the inverse of the USD led pair
+        (e.g 1/USDCAD). The rule of each symbol (pairs and coefficients) is built once, on the first lookup of the symbol.
+        The values of all the looked up symbols are then calculated in a single pass over the tick snapshot whenever it
+        has new prices, and the lookups are served from an array indexed by symbol.
+
+        Args:
+            ticks (TickSnapshot): Tick table the prices are read from
+            company (str): Broker company of the account
+            pairs (List[str], optional): Currency pairs of the graph, the currencies and support pairs of the broker by default
+        """
+        self.ticks = ticks
+        self.suffix, self.broker_rules = get_broker_rules(company=company)
+
+        # Currency graph, currency -> {currency: (pair, exponent)}
+        self.graph:Dict[str, Dict[str, Tuple[str, int]]] = dict()
+        pairs = list(curr.currencies) + list(curr.support_pairs) if pairs is None else pairs
+        for pair in pairs:
+            base, quote = self.split_pair(symbol=pair)
+            if base is None:
+                continue
+            self.graph.setdefault(base, dict())[quote] = (pair, 1)
+            self.graph.setdefault(quote, dict())[base] = (pair, -1)
+
+        self.symbol_index:Dict[str, int] = dict()
+        self.rules:List[Rule] = list()
+        self.dollar_values = np.zeros(0, dtype=np.float64)
+        self.resolved_version = -1
+        self.resolved_at = -np.inf
+        self.resolves = 0
+
+    def split_pair(self, symbol:str) -> Tuple[str, str]:
+        """
+        Base and quote currency of a currency pair of the broker, (None, None) for the other symbols
+        """
+        if len(symbol) == 6 + len(self.suffix) and symbol.endswith(self.suffix) and symbol[0:6].isalpha() and symbol[0:6].isupper():
+            return symbol[0:3], symbol[3:6]
+        return None, None
+
+    def get_usd_path(self, currency:str) -> List[Tuple[str, int]]:
+        """
+        Pairs which convert the currency to USD, the shortest path of the currency graph
+        """
+        previous = {currency: None}
+        queue = deque([currency])
+        while queue:
+            node = queue.popleft()
+            if node == "USD":
+                break
+            for neighbour, edge in self.graph.get(node, dict()).items():
+                if neighbour not in previous:
+                    previous[neighbour] = (node, edge)
+                    queue.append(neighbour)
+
+        if "USD" not in previous:
+            raise Exception(f"No conversion of << {currency} >> to USD")
+
+        path = []
+        node = "USD"
+        while previous[node] is not None:
+            node, edge = previous[node]
+            path.append(edge)
+        return path[::-1]
+
+    def get_rule(self, symbol:str) -> Rule:
+        if symbol in self.broker_rules:
+            return self.broker_rules[symbol]
+
+        base, quote = self.split_pair(symbol=symbol)
+        if base is None:
+            raise Exception(f"Dollar value of << {symbol} >> is not defined")
+
+        if base == "USD":
+            # When USD is a BASE Currency, e.g USDJPY, USDCAD, USDCHF, we just calculate the inverse of the exchange
+            return 1.0, [(symbol, -1)], None
+        elif quote == "USD":
+            # When USD is a QUOTE Currency, e.g GBPUSD, EURUSD, we just calculate the exchange
+            return 1.0, [(symbol, 1)], None
+
+        # None of the currency lead by USD, e.g AUDNZD, AUDJPY, CADJPY, the base currency is converted to USD
+        return 1.0, [(symbol, -1)] + [(pair, exponent) for pair, exponent in self.get_usd_path(currency=base)], None
+
+    def register(self, symbols:List[str]):
+        new_symbols = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self.symbol_index]
+        for symbol in new_symbols:
+            self.rules.append(self.get_rule(symbol=symbol))
+            self.symbol_index[symbol] = len(self.symbol_index)
+
+        if new_symbols:
+            # Values of the new symbols are calculated on the next lookup
+            self.resolved_version = -1
+
+    def resolve(self):
+        """
+        Calculates the dollar value of every registered symbol from the exchange prices of the tick snapshot
+        """
+        exchange_prices:Dict[str, float] = dict()
+        for _, terms, _ in self.rules:
+            for pair, _ in terms:
+                if pair not in exchange_prices:
+                    try:
+                        bid_price, ask_price = self.ticks.get_bid_ask(symbol=pair)
+                        exchange_prices[pair] = round((bid_price + ask_price)/2, 4)
+                    except Exception:
+                        exchange_prices[pair] = np.nan
+
+        dollar_values = np.zeros(len(self.rules), dtype=np.float64)
+        for index, (coefficient, terms, digits) in enumerate(self.rules):
+            value = coefficient
+            for pair, exponent in terms:
+                value = value * exchange_prices[pair] if exponent == 1 else value / exchange_prices[pair]
+            dollar_values[index] = round(value, digits) if digits is not None else value
+
+        self.dollar_values = dollar_values
+        self.resolved_version = self.ticks.version
+        self.resolved_at = time.monotonic()
+        self.resolves += 1
+
+    def refresh(self):
+        """
+        Calculates the values again when the tick snapshot has new prices (or it's older than the tick staleness limit)
+        """
+        if self.resolved_version != self.ticks.version or (time.monotonic() - self.resolved_at) > self.ticks.max_age:
+            self.resolve()
+
+    def get_dollar_values(self, symbols:List[str]) -> np.ndarray:
+        """
+        Dollar value of the symbols, in the same order as the symbols
+        """
+        self.register(symbols=symbols)
+        self.refresh()
+
+        values = self.dollar_values[[self.symbol_index[symbol] for symbol in symbols]]
+        if np.isnan(values).any():
+            missing = [symbol for symbol, value in zip(symbols, values) if np.isnan(value)]
+            raise Exception(f"Tick not available for the dollar value of {missing}")
+        return values
+
+    def get_dollar_value(self, symbol:str) -> float:
+        if symbol not in self.symbol_index:
+            self.register(symbols=[symbol])
+        self.refresh()
+
+        value = self.dollar_values[self.symbol_index[symbol]]
+        if np.isnan(value):
+            raise Exception(f"Tick not available for the dollar value of {symbol}")
+        return float(value)
+
+
+# Single converter shared by the Prices objects of the process
+shared_converter = CurrencyConverter()
+
+
+if __name__ == "__main__":
+    converter = CurrencyConverter()
+    for symbol in curr.currencies:
+        print(symbol, converter.get_rule(symbol=symbol), converter.get_dollar_value(symbol=symbol))
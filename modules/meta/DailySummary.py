@@ -0,0 +1,190 @@
+import os
+import sqlite3
+import threading
+from glob import glob
+from typing import Dict, List, Tuple
+from modules.common.LogWriter import log_writer
+from modules.common import files_util
+from modules import config
+
+class DailySummary:
+    def __init__(self, db_path:str=config.daily_summary_db):
+        """
+        End of day summary of the accounts, one row per account and day in a SQLite database: the max, min and max
+        absolute RR of the day (from the trade logs), and the close of the day (PnL, RR, equity, risk percentages,
+        system and market direction, as in the pnl_trades file).
+
+        The RR range of the current day is tracked in memory as the RR is logged, and saved when the day closes (or when
+        the next day starts). The lookups of the previous days (dynamic RR, dynamic risk, market direction) are queries on
+        the primary key (account_id, date), so they don't depend on the size of the history. The days which are only in
+        the log files (older sessions) are added once, when the summary of the account is first synced.
+
+        Args:
+            db_path (str): Path of the SQLite database
+        """
+        self.db_path = os.path.abspath(db_path)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            files_util.create_directory_if_not_exists(directory_path=directory)
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS daily_summary (
+                                           account_id INTEGER NOT NULL,
+                                           date TEXT NOT NULL,
+                                           max_rr REAL,
+                                           min_rr REAL,
+                                           max_abs_rr REAL,
+                                           pnl REAL,
+                                           rr REAL,
+                                           equity REAL,
+                                           account_risk_perc REAL,
+                                           position_risk_perc REAL,
+                                           system TEXT,
+                                           direction TEXT,
+                                           PRIMARY KEY (account_id, date))""")
+
+        self.rr_ranges:Dict[Tuple[int, str], List[float]] = dict() # (account_id, date) -> [max_rr, min_rr, max_abs_rr]
+        self.synced = set() # Accounts which log files are in the summary
+
+    def track_rr(self, account_id:int, date:str, rr:float):
+        """
+        Adds the logged RR to the range of the day, the range of the previous day is saved when a new day starts
+        """
+        rr = float(rr)
+        with self.lock:
+            for key in [key for key in self.rr_ranges if key[0] == account_id and key[1] != date]:
+                self.save_rr_range(account_id=key[0], date=key[1])
+
+            rr_range = self.rr_ranges.get((account_id, date))
+            if rr_range is None:
+                self.rr_ranges[(account_id, date)] = [rr, rr, abs(rr)]
+            else:
+                rr_range[0] = max(rr_range[0], rr)
+                rr_range[1] = min(rr_range[1], rr)
+                rr_range[2] = max(rr_range[2], abs(rr))
+
+    def save_rr_range(self, account_id:int, date:str):
+        """
+        Writes the tracked RR range of the day (and stops tracking it), the lock is held by the caller
+        """
+        rr_range = self.rr_ranges.pop((account_id, date), None)
+        if rr_range is not None:
+            self.upsert_rr_range(account_id=account_id, date=date, max_rr=rr_range[0], min_rr=rr_range[1], max_abs_rr=rr_range[2])
+
+    def upsert_rr_range(self, account_id:int, date:str, max_rr:float, min_rr:float, max_abs_rr:float):
+        with self.connection:
+            self.connection.execute("""INSERT INTO daily_summary (account_id, date, max_rr, min_rr, max_abs_rr) VALUES (?, ?, ?, ?, ?)
+                                       ON CONFLICT (account_id, date) DO UPDATE SET max_rr=excluded.max_rr, min_rr=excluded.min_rr,
+                                       max_abs_rr=excluded.max_abs_rr""", (account_id, date, max_rr, min_rr, max_abs_rr))
+
+    def upsert_close(self, account_id:int, date:str, pnl:float, rr:float, equity:float, account_risk_perc:float,
+                     position_risk_perc:float, system:str, direction:str):
+        with self.connection:
+            self.connection.execute("""INSERT INTO daily_summary (account_id, date, pnl, rr, equity, account_risk_perc, position_risk_perc, system, direction)
+                                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                       ON CONFLICT (account_id, date) DO UPDATE SET pnl=excluded.pnl, rr=excluded.rr, equity=excluded.equity,
+                                       account_risk_perc=excluded.account_risk_perc, position_risk_perc=excluded.position_risk_perc,
+                                       system=excluded.system, direction=excluded.direction""",
+                                    (account_id, date, pnl, rr, equity, account_risk_perc, position_risk_perc, system, direction))
+
+    def close_day(self, account_id:int, date:str, pnl:float, rr:float, equity:float, account_risk_perc:float,
+                  position_risk_perc:float, system:str, direction:str):
+        """
+        Saves the close of the day with the RR range tracked so far, a second close of the same day replaces the first one
+
+        Args:
+            account_id (int): Account of the summary
+            date (str): Day of the close, '%Y-%m-%d'
+            pnl (float): PnL of the day
+            rr (float): RR of the day
+            equity (float): Equity of the account at the close
+            account_risk_perc (float): Account risk percentage of the day
+            position_risk_perc (float): Position risk percentage of the day
+            system (str): Strategy of the day
+            direction (str): Market direction of the day (BREAK, REVERSE)
+        """
+        with self.lock:
+            self.upsert_close(account_id=account_id, date=date, pnl=pnl, rr=rr, equity=equity, account_risk_perc=account_risk_perc,
+                              position_risk_perc=position_risk_perc, system=system, direction=direction)
+            rr_range = self.rr_ranges.get((account_id, date))
+            if rr_range is not None:
+                # The day keeps being tracked, the RR logged after the close is saved with the next day
+                self.upsert_rr_range(account_id=account_id, date=date, max_rr=rr_range[0], min_rr=rr_range[1], max_abs_rr=rr_range[2])
+
+    def sync(self, account_id:int, today:str, trade_logs:str, pnl_trades:str):
+        """
+        Adds the days of the log files which are not in the summary yet, once per account and process: the RR range of
+        the trade logs before today (the last summarized day is read again, it may have RR logged after its close) and the
+        closes of the pnl_trades file when the summary has no close of the account
+
+        Args:
+            account_id (int): Account of the summary
+            today (str): Current day, '%Y-%m-%d', its range is tracked from the logged RR
+            trade_logs (str): Glob pattern of the daily trade logs of the account, named <account_id>_<date>.csv
+            pnl_trades (str): Path of the pnl_trades file of the account
+        """
+        with self.lock:
+            if account_id in self.synced:
+                return
+            self.synced.add(account_id)
+
+            last_day = self.connection.execute("SELECT MAX(date) FROM daily_summary WHERE account_id = ? AND max_abs_rr IS NOT NULL AND date < ?",
+                                               (account_id, today)).fetchone()[0]
+            summarized = {row[0] for row in self.connection.execute("SELECT date FROM daily_summary WHERE account_id = ? AND max_abs_rr IS NOT NULL",
+                                                                    (account_id,))}
+            for file_name in glob(trade_logs):
+                date = os.path.basename(file_name).split("_")[-1].split(".")[0]
+                if date >= today or (date in summarized and date != last_day):
+                    continue
+                df = log_writer.read_csv(file_path=file_name)
+                if df is not None and not df.empty:
+                    self.upsert_rr_range(account_id=account_id, date=date, max_rr=float(df["RR"].max()), min_rr=float(df["RR"].min()),
+                                         max_abs_rr=float(df["RR"].abs().max()))
+
+            has_closes = self.connection.execute("SELECT 1 FROM daily_summary WHERE account_id = ? AND pnl IS NOT NULL LIMIT 1",
+                                                 (account_id,)).fetchone()
+            if has_closes is None:
+                df = log_writer.read_csv(file_path=pnl_trades)
+                if df is not None:
+                    # Rows in the order of the file, the latest close of a day is kept
+                    for row in df.itertuples():
+                        self.upsert_close(account_id=account_id, date=str(row.Date), pnl=float(row.Pnl), rr=float(row.RR), equity=float(row.Equity),
+                                          account_risk_perc=float(row.AccountRiskPerc), position_risk_perc=float(row.PositionRiskPerc),
+                                          system=str(row.System), direction=str(row.Strategy))
+
+    def get_max_abs_rrs(self, account_id:int, before:str, limit:int) -> List[float]:
+        """
+        Max absolute RR of the latest days before the given day, latest day first
+        """
+        with self.lock:
+            # Days which are still tracked (RR logged after the close, no RR logged yet on the next day) are saved first
+            for key in [key for key in self.rr_ranges if key[0] == account_id and key[1] < before]:
+                self.save_rr_range(account_id=key[0], date=key[1])
+
+            rows = self.connection.execute("""SELECT max_abs_rr FROM daily_summary WHERE account_id = ? AND date < ? AND max_abs_rr IS NOT NULL
+                                              ORDER BY date DESC LIMIT ?""", (account_id, before, limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def get_closes(self, account_id:int, limit:int) -> List[Dict]:
+        """
+        Latest closes of the account, latest day first, with the columns of the summary
+        """
+        with self.lock:
+            cursor = self.connection.execute("""SELECT date, pnl, rr, equity, account_risk_perc, position_risk_perc, system, direction FROM daily_summary
+                                                WHERE account_id = ? AND pnl IS NOT NULL ORDER BY date DESC LIMIT ?""", (account_id, limit))
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+# One summary per database, shared by the trade trackers of the process
+summaries:Dict[str, DailySummary] = dict()
+summaries_lock = threading.Lock()
+
+def get_daily_summary(db_path:str=config.daily_summary_db) -> DailySummary:
+    with summaries_lock:
+        db_path = os.path.abspath(db_path)
+        if db_path not in summaries:
+            summaries[db_path] = DailySummary(db_path=db_path)
+        return summaries[db_path]
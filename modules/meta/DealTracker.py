@@ -0,0 +1,183 @@
+from modules.meta.broker import mt5
+import pytz
+import threading
+import pandas as pd
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+from typing import Dict, Set
+from modules.meta import util
+from modules import config
+
+class DealTracker:
+    # Pre-aggregated totals of a day or a symbol
+    TOTALS = ["profit", "commission", "total", "entries", "exits", "losses"]
+
+    def __init__(self, history_days:int=config.deal_history_days):
+        """
+        Deal history of the account, loaded incrementally.
+
+        The first update loads the deals of the last `history_days` days, the following updates only fetch the deals
+        from the time of the last seen deal, so a busy day (e.g 100 trades) doesn't load the whole day again on every
+        cycle. The deals are kept in an append-only table with the derived columns (date, is_entry, is_exit, net), and the
+        totals by day and by symbol are updated as the deals arrive, so the closed PnL and the trade counts are read
+        without going through the table.
+
+        Args:
+            history_days (int): Number of days before today to keep in the history
+        """
+        self.history_days = history_days
+        self.lock = threading.RLock()
+        self.last_time:int = None # Server epoch of the latest deal
+        self.seen_tickets:Set[int] = set() # Tickets of the deals at the latest time, they are fetched again
+        self.chunks = list()
+        self.table = pd.DataFrame()
+        self.table_version = 0
+        self.today_table = pd.DataFrame()
+        self.today_version = (None, -1)
+        self.day_totals:Dict[date, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(self.TOTALS, 0))
+        self.symbol_totals:Dict[date, Dict[str, Dict[str, float]]] = defaultdict(lambda: defaultdict(lambda: dict.fromkeys(self.TOTALS, 0)))
+        self.fetched_deals = 0
+
+    def get_today(self) -> date:
+        return util.get_current_time().date()
+
+    def get_day_start(self, day:date) -> datetime:
+        """
+        Start of the server day, as passed to history_deals_get
+        """
+        return datetime(day.year, day.month, day.day, hour=0, minute=0, tzinfo=pytz.timezone('Etc/GMT'))
+
+    def fetch(self) -> list:
+        """
+        Deals since the latest seen deal (or the start of the history), without the ones which are already tracked
+        """
+        if self.last_time is None:
+            start_time = self.get_day_start(self.get_today()) - timedelta(days=self.history_days)
+        else:
+            # The latest second is fetched again, a deal at the same second could have arrived after the last fetch
+            start_time = datetime.fromtimestamp(self.last_time, tz=pytz.timezone('Etc/GMT'))
+
+        tm_zone = pytz.timezone('Etc/GMT')
+        end_time = mt5.now(tm_zone) + timedelta(hours=config.server_timezone)
+
+        deals = mt5.history_deals_get(start_time, end_time)
+        if deals is None:
+            return []
+
+        return [deal for deal in deals if deal.ticket not in self.seen_tickets and deal.comment != "Initial account balance"]
+
+    def update(self):
+        """
+        Adds the new deals of the account to the table and the totals
+
+        Returns:
+            DealTracker: self, for chaining
+        """
+        with self.lock:
+            new_deals = sorted(self.fetch(), key=lambda deal: (deal.time, deal.ticket))
+            if not new_deals:
+                return self
+
+            self.fetched_deals += len(new_deals)
+            chunk = pd.DataFrame(new_deals, columns=new_deals[0]._asdict().keys())
+            chunk["date"] = pd.to_datetime(chunk["time"], unit="s").dt.date
+            chunk["is_entry"] = chunk["entry"] == 0
+            chunk["is_exit"] = chunk["entry"] == 1
+            chunk["net"] = chunk["profit"] + chunk["commission"]
+
+            for deal in chunk.itertuples():
+                for totals in [self.day_totals[deal.date], self.symbol_totals[deal.date][deal.symbol]]:
+                    totals["profit"] += deal.profit
+                    totals["commission"] += deal.commission
+                    totals["total"] += deal.net
+                    totals["entries"] += int(deal.is_entry)
+                    totals["exits"] += int(deal.is_exit)
+                    totals["losses"] += int(deal.is_exit and deal.profit < 0)
+
+            latest_time = int(chunk["time"].max())
+            if latest_time != self.last_time:
+                self.seen_tickets = set()
+            self.last_time = latest_time
+            self.seen_tickets.update(chunk.loc[chunk["time"] == latest_time, "ticket"])
+
+            self.chunks.append(chunk)
+            self.table_version += 1
+            self.prune()
+
+        return self
+
+    def prune(self):
+        """
+        Drops the days which are out of the history
+        """
+        first_day = self.get_today() - timedelta(days=self.history_days)
+        for day in [day for day in self.day_totals if day < first_day]:
+            del self.day_totals[day]
+            self.symbol_totals.pop(day, None)
+
+        if self.chunks and self.chunks[0]["date"].min() < first_day:
+            self.chunks = [chunk[chunk["date"] >= first_day] for chunk in self.chunks]
+            self.chunks = [chunk for chunk in self.chunks if not chunk.empty]
+
+    def get_table(self) -> pd.DataFrame:
+        """
+        All the tracked deals with the derived columns, the table is only built again when new deals arrived
+        """
+        with self.lock:
+            if len(self.chunks) > 1:
+                self.chunks = [pd.concat(self.chunks, ignore_index=True)]
+            self.table = self.chunks[0] if self.chunks else pd.DataFrame()
+            return self.table
+
+    def get_todays_deals(self) -> pd.DataFrame:
+        """
+        Today's deals (entries and exits) with the columns of mt5.history_deals_get
+        """
+        with self.lock:
+            today = self.get_today()
+            if self.today_version != (today, self.table_version):
+                table = self.get_table()
+                if table.empty:
+                    self.today_table = pd.DataFrame()
+                else:
+                    today_deals = table[table["date"] == today]
+                    self.today_table = today_deals.drop(columns=["date", "is_entry", "is_exit", "net"]).reset_index(drop=True) if not today_deals.empty else pd.DataFrame()
+                self.today_version = (today, self.table_version)
+            return self.today_table
+
+    def get_day_totals(self, day:date=None) -> Dict[str, float]:
+        """
+        Totals of the day (today by default): profit, commission, total (profit + commission), entries, exits and losses
+        (exits with negative profit)
+        """
+        with self.lock:
+            day = self.get_today() if day is None else day
+            return dict(self.day_totals[day]) if day in self.day_totals else dict.fromkeys(self.TOTALS, 0)
+
+    def get_symbol_totals(self, day:date=None) -> pd.DataFrame:
+        """
+        Totals by symbol of the day (today by default)
+        """
+        with self.lock:
+            day = self.get_today() if day is None else day
+            symbols = self.symbol_totals.get(day, dict())
+            return pd.DataFrame([{"symbol": symbol, **totals} for symbol, totals in symbols.items()], columns=["symbol"] + self.TOTALS)
+
+    def get_daily_pnls(self) -> pd.DataFrame:
+        """
+        Profit, commission and total by day of the history, latest day first
+        """
+        with self.lock:
+            if not self.day_totals:
+                return pd.DataFrame()
+            df = pd.DataFrame([[day, totals["profit"], totals["commission"], totals["total"]] for day, totals in self.day_totals.items()],
+                              columns=["date", "profit", "commission", "total"])
+            return df.sort_values("date", ascending=False).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    tracker = DealTracker().update()
+    print(tracker.get_todays_deals())
+    print(tracker.get_day_totals())
+    print(tracker.get_symbol_totals())
+    print(tracker.get_daily_pnls())
@@ -1,5 +1,5 @@
 from modules.meta import util
-from modules.common import files_util
+from modules.common.LogWriter import log_writer
 from modules.common.Directions import Directions
 import modules.meta.Currencies as curr
 from modules.meta.Indicators import Indicators
@@ -7,6 +7,7 @@ from modules.meta.Strategies import Strategies
 from modules.meta.Account import Account
 import pandas as pd
 from modules.meta.RiskManager import RiskManager
+from modules.meta.RRRangeTracker import RRRangeTracker
 
 
 class DelayedEntry:
@@ -17,6 +18,10 @@ class DelayedEntry:
         self.risk_manager = risk_manager
         self.account_id = self.account.get_account_id()
 
+        # Range of the tracked RR over the day, fed by record_pnl_logs (see is_max_ranged)
+        self.rr_range = RRRangeTracker(state_path=f"PnLData/price_tracker_state/{self.account_id}_{{date}}.json")
+        self.rr_range.load(history_path=f"PnLData/price_tracker_history/{self.account_id}_{{date}}_hist.csv")
+
     def symbol_price_recorder(self, symbols:list):
         """
         Records the price of symbols based on the given strategy.
@@ -30,13 +35,11 @@ class DelayedEntry:
             - Entry Price: The entry price of the symbol.
         If the strategy is "UNKNOWN", it prints a message indicating that the strategy is unknown.
         """
-        current_date = util.get_current_time().strftime('%Y-%m-%d')
-        file_path = f"PnLData/price_tracker/{self.account_id}_{current_date}.csv"
-        if not files_util.check_file_exists(file_path=file_path):
+        file_path = f"PnLData/price_tracker/{self.account_id}_{{date}}.csv"
+        if not log_writer.exists(file_path=file_path):
             strategy = self.indicators.get_dominant_direction()
             if strategy != "UNKNOWN":
-                with open(file_path, mode="w") as file:
-                    file.write("symbol,direction,entry_price,volume\n")
+                lines = []
                 
                 # Validate all the symbols entries in the file
                 counter = 0
@@ -59,8 +62,10 @@ class DelayedEntry:
                             else:
                                 trade_direction = "LONG" if symbol_direction.name == "SHORT" else "SHORT"
                             
-                            with open(file_path, mode="a") as file:
-                                file.write(f"{symbol},{trade_direction},{entry_price},{lots}\n")
+                            lines.append(f"{symbol},{trade_direction},{entry_price},{lots}")
+
+                # The file is created (with the header) even without lines, it marks the prices of the day as recorded
+                log_writer.write(file_path=file_path, header="symbol,direction,entry_price,volume", lines=lines)
             else:
                 print("Strategy is UNKNOWN")
 
@@ -109,10 +114,8 @@ class DelayedEntry:
         Returns:
             float: The calculated risk-reward ratio (RR) rounded to two decimal places.
         """
-        current_date = util.get_current_time().strftime('%Y-%m-%d')
-        file_path = f"PnLData/price_tracker/{self.account_id}_{current_date}.csv"
-        if files_util.check_file_exists(file_path=file_path):
-            data = pd.read_csv(file_path)
+        data = log_writer.read_csv(file_path=f"PnLData/price_tracker/{self.account_id}_{{date}}.csv")
+        if data is not None:
             data["current_price"] = data.apply(lambda x: self.price_by_direction(symbol=x["symbol"], direction=x["direction"]) , axis=1)
             data["change"] =  data.apply(lambda x: self.directional_pnl(entry=x["entry_price"], current=x["current_price"], direction=x["direction"]) , axis=1)
             data["pnl"] = data.apply(lambda x: self.risk_manager.get_pnl_of_position(symbol=x["symbol"], lots=x["volume"], points_in_stop=x["change"]), axis=1)
@@ -126,38 +129,32 @@ class DelayedEntry:
 
     def is_max_ranged(self):
         """
-        Checks if the range of the 'RR' column in the historical price tracker file exceeds 1.
-        This method constructs a file path based on the current date and the account ID, 
-        and checks if the file exists. If the file exists, it reads the file into a pandas 
-        DataFrame, calculates the minimum and maximum values of the 'RR' column, and 
-        determines if the difference between the maximum and minimum values is greater than 1.
+        Checks if the range of the RR tracked over the day (price tracker history) exceeds 1.
+        The maximum, minimum and latest RR with their timestamps are kept by a running range tracker, fed by
+        record_pnl_logs, so the history file is not read again. The RR should have moved 1R below the high,
+        either down to the minimum of the day (reached after the high) or down to the latest RR.
         Returns:
             bool: True if the range of the 'RR' column exceeds 1, False otherwise.
         """
-        current_date = util.get_current_time().strftime('%Y-%m-%d')
-        file_path = f"PnLData/price_tracker_history/{self.account_id}_{current_date}_hist.csv"
-        if files_util.check_file_exists(file_path=file_path):
-            data = pd.read_csv(file_path)
-            min_index = data.iloc[data["RR"].idxmin()]
-            max_index = data.iloc[data["RR"].idxmax()]
-            latest_index = data.iloc[-1]
-            print(f"{'Ranged RR Changed'.ljust(20)}: {round(max_index['RR'] - min_index['RR'], 2)}, Latest: {round(max_index['RR'] - latest_index['RR'], 2)}")
+        rr_range = self.rr_range
+        if not rr_range.is_empty():
+            print(f"{'Ranged RR Changed'.ljust(20)}: {round(rr_range.max_rr - rr_range.min_rr, 2)}, Latest: {round(rr_range.max_rr - rr_range.latest_rr, 2)}")
 
             # Only when the RR is below -0.5
-            if latest_index["RR"] < -0.5:
+            if rr_range.latest_rr < -0.5:
                 # The RR between min and max should be greater than 1, Saying that It should have moved 1R below from the high.
-                if (max_index["RR"] - min_index["RR"] > 1.0):
+                if (rr_range.max_rr - rr_range.min_rr > 1.0):
                     # The timestamp which has the minimum should be the latest
-                    if min_index["Timestamp"] >  max_index["Timestamp"]:
-                        print(f"{'RR Max'.ljust(20)}: {max_index['RR']}")
-                        print(f"{'RR Min'.ljust(20)}: {min_index['RR']}")
+                    if rr_range.min_time >  rr_range.max_time:
+                        print(f"{'RR Max'.ljust(20)}: {rr_range.max_rr}")
+                        print(f"{'RR Min'.ljust(20)}: {rr_range.min_rr}")
                         return True
                 # The RR between max and latest should be greater than 1, Saying that It should have moved 1R below from the high.
-                if (max_index["RR"] - latest_index["RR"] > 1.0):
+                if (rr_range.max_rr - rr_range.latest_rr > 1.0):
                     # The timestamp which has the minimum should be the latest
-                    if latest_index["Timestamp"] >  max_index["Timestamp"]:
-                        print(f"{'RR Max'.ljust(20)}: {max_index['RR']}")
-                        print(f"{'RR Latest'.ljust(20)}: {latest_index['RR']}")
+                    if rr_range.latest_time >  rr_range.max_time:
+                        print(f"{'RR Max'.ljust(20)}: {rr_range.max_rr}")
+                        print(f"{'RR Latest'.ljust(20)}: {rr_range.latest_rr}")
                         return True
             
         return False
@@ -165,23 +162,17 @@ class DelayedEntry:
     def record_pnl_logs(self, rr):
         """
         Records profit and loss (PnL) logs along with risk-reward (RR) ratio to a CSV file.
-        This method creates a new CSV file for each day if it does not already exist, 
-        and appends the PnL and RR data with a timestamp to the file.
+        The line is queued on the log writer, which appends it to the file of the day (created with the header
+        on the first line of the day) in the background, the RR is added to the running range of is_max_ranged.
         Args:
-            pnl (float): The profit and loss value to be recorded.
             rr (float): The risk-reward ratio to be recorded.
         Returns:
             None
         """
-        current_date = util.get_current_time().strftime('%Y-%m-%d')
-        file_path = f"PnLData/price_tracker_history/{self.account_id}_{current_date}_hist.csv"
-
-        if not files_util.check_file_exists(file_path=file_path):
-            with open(file_path, mode="w") as file:
-                file.write("Timestamp,RR\n")
-
-        with open(file_path, mode="a") as file:
-            file.write(f"{util.get_current_time().strftime('%Y-%m-%d %H:%M:%S')},{round(rr, 2)}\n")
+        timestamp = util.get_current_time().strftime('%Y-%m-%d %H:%M:%S')
+        self.rr_range.push(timestamp=timestamp, rr=round(rr, 2))
+        log_writer.write(file_path=f"PnLData/price_tracker_history/{self.account_id}_{{date}}_hist.csv", header="Timestamp,RR",
+                         lines=[f"{timestamp},{round(rr, 2)}"])
     
 
 if __name__ == "__main__":
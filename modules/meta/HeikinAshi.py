@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+
+class HeikinAshi:
+    def __init__(self, decimals:int=5):
+        """
+        Heikin-Ashi calculator which keeps the open prices of the closed bars per (symbol, timeframe).
+
+        The HA close, high and low are computed with array operations over all the bars. The HA open is recursive and
+        rounded on every step, so it can't be expressed as a closed form without changing the rounding. It's computed
+        in a scalar loop which only covers the bars that are not already known, a new bar costs O(1).
+
+        Rounding follows numpy (same as the pandas/np.float64 rounding of the previous implementation), so the
+        results are identical to the bar by bar calculation.
+
+        Args:
+            decimals (int): Number of decimals the HA prices are rounded to
+        """
+        self.decimals = decimals
+        self.scale = float(10 ** decimals)
+        # (symbol, timeframe) -> (bar times, HA open) of the closed bars
+        self.state:Dict[Tuple[str, int], Tuple[np.ndarray, np.ndarray]] = dict()
+
+    def _round(self, value:float) -> float:
+        # Same result as np.round(value, decimals), without the overhead of a numpy call per bar
+        return round(value * self.scale) / self.scale
+
+    def compute(self, candles:pd.DataFrame, symbol:str=None, timeframe:int=None, closed_bars:int=None) -> pd.DataFrame:
+        """
+        Calculate the Heikin-Ashi candles of the given candles.
+
+        Args:
+            candles (pd.DataFrame): Candles with time, open, high, low and close columns (oldest first)
+            symbol (str, optional): Symbol of the candles, the state is only kept when the symbol and timeframe are given
+            timeframe (int, optional): Timeframe of the candles
+            closed_bars (int, optional): Number of leading candles which are closed bars, only those are kept in the state.
+                Defaults to all the candles.
+
+        Returns:
+            pd.DataFrame: Heikin-Ashi candles with columns ["time", "open", "high", "low", "close"] and the same index as the candles
+        """
+        heikin_ashi_df = pd.DataFrame(index=candles.index, columns=["time", "open", "high", "low", "close"])
+        if candles.empty:
+            return heikin_ashi_df
+
+        open = candles["open"].to_numpy(dtype=np.float64)
+        high = candles["high"].to_numpy(dtype=np.float64)
+        low = candles["low"].to_numpy(dtype=np.float64)
+        close = candles["close"].to_numpy(dtype=np.float64)
+        times = candles["time"].to_numpy()
+        n_bars = len(candles)
+        closed_bars = n_bars if closed_bars is None else min(closed_bars, n_bars)
+
+        ha_close = np.round((open + high + low + close) / 4, self.decimals)
+        ha_open = np.empty(n_bars, dtype=np.float64)
+
+        # Reuse the open of the bars which are already known, the series have to start from the same bar
+        known = 0
+        key = (symbol, timeframe)
+        if symbol is not None and key in self.state:
+            known_times, known_open = self.state[key]
+            known = min(len(known_times), n_bars)
+            if known > 0 and times[0] == known_times[0] and times[known - 1] == known_times[known - 1]:
+                ha_open[:known] = known_open[:known]
+            else:
+                known = 0
+
+        if known == 0:
+            ha_open[0] = np.round(open[0], self.decimals)
+            known = 1
+
+        prev_open = float(ha_open[known - 1])
+        ha_close_list = ha_close.tolist()
+        for i in range(known, n_bars):
+            prev_open = self._round((prev_open + ha_close_list[i - 1]) / 2)
+            ha_open[i] = prev_open
+
+        if symbol is not None and closed_bars > 0:
+            known_times = self.state.get(key, (np.array([]), None))[0]
+            if closed_bars >= len(known_times) or len(known_times) == 0 or known_times[0] != times[0]:
+                self.state[key] = (times[:closed_bars].copy(), ha_open[:closed_bars].copy())
+
+        heikin_ashi_df["time"] = candles["time"]
+        heikin_ashi_df["open"] = ha_open
+        heikin_ashi_df["high"] = np.round(np.maximum(np.maximum(high, ha_open), ha_close), self.decimals)
+        heikin_ashi_df["low"] = np.round(np.minimum(np.minimum(low, ha_open), ha_close), self.decimals)
+        heikin_ashi_df["close"] = ha_close
+
+        return heikin_ashi_df
+
+    def reset(self, symbol:str=None):
+        """
+        Drops the kept state, for all the symbols when the symbol is not given
+        """
+        if symbol is None:
+            self.state.clear()
+        else:
+            for key in [key for key in self.state if key[0] == symbol]:
+                del self.state[key]
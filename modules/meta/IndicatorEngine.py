@@ -0,0 +1,164 @@
+import time
+import numpy as np
+from typing import Dict, List, Tuple
+from modules import config
+from modules.meta import util
+from modules.meta.wrapper import Wrapper
+
+class IndicatorEngine:
+    def __init__(self, wrapper:Wrapper, retry_seconds:float=config.tick_max_age):
+        """
+        Stateful ATR, SMA and Bollinger Bands calculator.
+
+        The closed bars of each (symbol, timeframe) are kept in memory with prefix sums of the true range, the close and
+        the squared close. The series are only refreshed when a new bar opens (only the new bars are fetched), so any
+        indicator window is answered with a couple of array lookups instead of fetching and recomputing N+3 candles.
+
+        Args:
+            wrapper (Wrapper): Candle source
+            retry_seconds (float): When the terminal is yet to open the new bar (or market is closed), wait this long before checking again.
+        """
+        self.wrapper = wrapper
+        self.retry_seconds = retry_seconds
+        # (symbol, timeframe) -> arrays of the closed bars (oldest first) and their prefix sums
+        self.series:Dict[Tuple[str, int], Dict[str, np.ndarray]] = dict()
+        # (symbol, timeframe) -> (bar open time by the clock, time of the latest bar in the terminal, local time of the sync)
+        self.synced:Dict[Tuple[str, int], Tuple[int, int, float]] = dict()
+        # (symbol, timeframe) -> number of closed bars to keep
+        self.capacity:Dict[Tuple[str, int], int] = dict()
+
+    def _sync(self, symbol:str, timeframe:int, closed_bars:int) -> Dict[str, np.ndarray]:
+        """
+        Makes sure at least `closed_bars` closed bars are loaded and up to date, returns the series (None when there are no candles)
+        """
+        key = (symbol, timeframe)
+        bar_open_time = util.get_bar_open_epoch(timeframe=timeframe)
+        series = self.series.get(key)
+
+        if series is not None and closed_bars <= self.capacity[key]:
+            synced_bar_time, latest_time, synced_at = self.synced[key]
+            if synced_bar_time == bar_open_time and (latest_time == bar_open_time or (time.monotonic() - synced_at) < self.retry_seconds):
+                return series
+            capacity = self.capacity[key]
+            # Number of bars which could have been closed since the sync, gaps (e.g weekends) only make it larger
+            n_candles = min(capacity, max(1, (bar_open_time - latest_time) // (timeframe * 60))) + 1
+        else:
+            series = None
+            capacity = max(closed_bars, self.capacity.get(key, 0))
+            n_candles = capacity + 1
+
+        rates = self.wrapper.get_last_n_candles(symbol=symbol, timeframe=timeframe, start_candle=0, n_candles=n_candles)
+        if rates.empty:
+            return self.series.get(key)
+
+        latest_time = int(rates["time"].iloc[-1])
+        # The last candle is the forming bar, which is not kept
+        closed = rates.iloc[:-1]
+        times = closed["time"].to_numpy(dtype=np.int64)
+        high = closed["high"].to_numpy(dtype=np.float64)
+        low = closed["low"].to_numpy(dtype=np.float64)
+        close = closed["close"].to_numpy(dtype=np.float64)
+
+        if series is not None:
+            new_bars = times > series["time"][-1]
+            times = np.concatenate((series["time"], times[new_bars]))[-capacity:]
+            high = np.concatenate((series["high"], high[new_bars]))[-capacity:]
+            low = np.concatenate((series["low"], low[new_bars]))[-capacity:]
+            close = np.concatenate((series["close"], close[new_bars]))[-capacity:]
+
+        # Prices are shifted by a reference before squaring to keep the precision of the variance
+        reference = close[0] if len(close) > 0 else 0.0
+        true_range = np.maximum(high - low, np.abs(high - close))
+        series = {"time": times, "high": high, "low": low, "close": close, "reference": reference,
+                  "tr_sum": np.concatenate(([0.0], np.cumsum(true_range))),
+                  "close_sum": np.concatenate(([0.0], np.cumsum(close - reference))),
+                  "close_sq_sum": np.concatenate(([0.0], np.cumsum((close - reference) ** 2)))}
+
+        self.series[key] = series
+        self.capacity[key] = capacity
+        self.synced[key] = (bar_open_time, latest_time, time.monotonic())
+        return series
+
+    def _window_sum(self, prefix_sum:np.ndarray, first_position:int, last_position:int) -> Tuple[float, int]:
+        """
+        Sum over the closed bars between the positions (inclusive, 1 is the latest closed bar), clipped to the available bars
+        """
+        n_bars = len(prefix_sum) - 1
+        end = n_bars - first_position + 1
+        begin = max(0, n_bars - last_position)
+        if end <= begin:
+            return 0.0, 0
+        return prefix_sum[end] - prefix_sum[begin], end - begin
+
+    def atr(self, symbol:str, timeframe:int, start_candle:int=0, n_atr:int=14) -> float:
+        """
+        Average true range as calculated by Indicators.get_atr, which is the mean true range of the
+        `n_atr - 1` closed bars before `start_candle` (the bar at `start_candle` itself is not included).
+
+        Returns:
+            float: ATR rounded to 5 decimals, 0 if there are no candles
+        """
+        series = self._sync(symbol=symbol, timeframe=timeframe, closed_bars=start_candle + n_atr - 1)
+        if series is None:
+            return 0
+
+        tr_sum, count = self._window_sum(series["tr_sum"], first_position=start_candle + 1, last_position=start_candle + n_atr - 1)
+        if count == 0:
+            return 0
+
+        return round(np.float64(tr_sum / count), 5)
+
+    def _closes_with_forming_bar(self, symbol:str, timeframe:int, window_size:int) -> Tuple[float, float, int, float]:
+        """
+        Shifted sum and squared sum of the last `window_size` closes including the forming bar
+
+        Returns:
+            Tuple[float, float, int, float]: sum, squared sum, number of closes, reference price of the shift
+        """
+        series = self._sync(symbol=symbol, timeframe=timeframe, closed_bars=window_size - 1)
+        forming_close = float(self.wrapper.get_current_candle(symbol=symbol, timeframe=timeframe)["close"])
+        if series is None:
+            return 0.0, 0.0, 1, forming_close
+
+        reference = series["reference"]
+        close_sum, count = self._window_sum(series["close_sum"], first_position=1, last_position=window_size - 1)
+        close_sq_sum, _ = self._window_sum(series["close_sq_sum"], first_position=1, last_position=window_size - 1)
+        close_sum += forming_close - reference
+        close_sq_sum += (forming_close - reference) ** 2
+        return close_sum, close_sq_sum, count + 1, reference
+
+    def sma(self, symbol:str, timeframe:int, n_moving_average:int=10) -> float:
+        """
+        Simple moving average of the last `n_moving_average` closes, including the forming bar
+        """
+        close_sum, _, count, reference = self._closes_with_forming_bar(symbol=symbol, timeframe=timeframe, window_size=n_moving_average)
+        return np.float64(reference + close_sum / count)
+
+    def bollinger_bands(self, symbol:str, timeframe:int, window_size:int=20, num_std_dev:int=2) -> Tuple[float, float]:
+        """
+        Upper and lower Bollinger Bands of the last `window_size` closes including the forming bar (population standard deviation)
+        """
+        close_sum, close_sq_sum, count, reference = self._closes_with_forming_bar(symbol=symbol, timeframe=timeframe, window_size=window_size)
+        shifted_mean = close_sum / count
+        std_dev = np.sqrt(max(close_sq_sum / count - shifted_mean ** 2, 0.0))
+        middle_band = reference + shifted_mean
+        return middle_band + num_std_dev * std_dev, middle_band - num_std_dev * std_dev
+
+    def atr_batch(self, symbols:List[str], timeframe:int, start_candle:int=0, n_atr:int=14) -> np.ndarray:
+        """
+        ATR of each symbol, in the same order as the symbols
+        """
+        return np.array([self.atr(symbol=symbol, timeframe=timeframe, start_candle=start_candle, n_atr=n_atr) for symbol in symbols], dtype=np.float64)
+
+    def sma_batch(self, symbols:List[str], timeframe:int, n_moving_average:int=10) -> np.ndarray:
+        """
+        SMA of each symbol, in the same order as the symbols
+        """
+        return np.array([self.sma(symbol=symbol, timeframe=timeframe, n_moving_average=n_moving_average) for symbol in symbols], dtype=np.float64)
+
+    def bollinger_bands_batch(self, symbols:List[str], timeframe:int, window_size:int=20, num_std_dev:int=2) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Upper and lower bands of each symbol, in the same order as the symbols
+        """
+        bands = np.array([self.bollinger_bands(symbol=symbol, timeframe=timeframe, window_size=window_size, num_std_dev=num_std_dev) for symbol in symbols], dtype=np.float64).reshape(-1, 2)
+        return bands[:, 0], bands[:, 1]
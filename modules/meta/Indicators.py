@@ -1,6 +1,5 @@
 import numpy as np
-import MetaTrader5 as mt5
-mt5.initialize()
+from modules.meta.broker import mt5
 import modules.meta.util as util
 from datetime import datetime,  timedelta
 import pytz
@@ -12,6 +11,7 @@ from typing import Tuple, List, Dict
 from modules.common import logme
 from modules.meta.wrapper import Wrapper
 from modules.meta.Prices import Prices
+from modules.meta.IndicatorEngine import IndicatorEngine
 from modules.common.Directions import Directions
 import modules.meta.Currencies as curr
 from modules.common import files_util
@@ -21,21 +21,17 @@ class Indicators:
     def __init__(self, wrapper: Wrapper, prices:Prices) -> None:
         self.wrapper = wrapper
         self.prices = prices
+        self.engine = IndicatorEngine(wrapper=wrapper)
     
     def get_atr(self, symbol:str, timeframe:int, start_candle:int=0, n_atr:int=14) -> float:
-        rates = self.wrapper.get_last_n_candles(symbol=symbol, timeframe=timeframe, start_candle=start_candle, n_candles=n_atr + 3)
-        
-        if rates.empty:
-            return 0
-
-        high = rates['high']
-        low = rates['low']
-        close = rates['close']
-
-        true_range = np.maximum(high[1:] - low[1:], np.abs(high[1:] - close[:-1]), np.abs(low[1:] - close[:-1]))
-        atr = np.mean(true_range[-n_atr:])
+        """
+        Average true range of the closed bars before `start_candle`, served by the indicator engine.
 
-        return round(atr, 5)
+        Note: The previous implementation (max of high-low and high-close aligned on the same bar, averaged over the last
+        `n_atr` rows of `n_atr + 3` candles while skipping the edges) resolves to the mean of the `n_atr - 1` bars before
+        `start_candle`, the engine keeps the same definition.
+        """
+        return self.engine.atr(symbol=symbol, timeframe=timeframe, start_candle=start_candle, n_atr=n_atr)
     
     def simple_moving_average(self, symbol:str, timeframe:int, n_moving_average:int=10) -> float:
         """
@@ -64,8 +60,7 @@ class Indicators:
 
         Notes:
         ------
-        This method assumes the existence of a `wrapper.get_last_n_candles` method that retrieves the candle data. The 
-        returned candle data is expected to be a dictionary with a 'close' key containing the closing prices.
+        The closed bars are kept by the indicator engine (updated once per bar), only the forming bar is fetched on each call.
 
         Example:
         -------
@@ -73,9 +68,7 @@ class Indicators:
         >>> print(sma)
         43500.25
         """
-        last_n_candles = self.wrapper.get_last_n_candles(symbol=symbol, timeframe=timeframe, start_candle=0, n_candles=n_moving_average)
-        close_prices = last_n_candles["close"]
-        return close_prices.mean()
+        return self.engine.sma(symbol=symbol, timeframe=timeframe, n_moving_average=n_moving_average)
     
     def bollinger_bands(self, symbol:str, timeframe:int, window_size=20, num_std_dev=2) -> Tuple[float, float]:
         """
@@ -86,17 +79,10 @@ class Indicators:
             num_std_dev (int): The number of standard deviations for the bands.
 
         Returns:
-            upper_band (numpy.array): The upper Bollinger Band.
-            lower_band (numpy.array): The lower Bollinger Band.
+            upper_band (float): The upper Bollinger Band.
+            lower_band (float): The lower Bollinger Band.
         """
-        last_n_candles = self.wrapper.get_last_n_candles(symbol=symbol, timeframe=timeframe, start_candle=0, n_candles=window_size)
-        close_prices = last_n_candles["close"]
-        close_prices = np.array(close_prices)
-        middle_band = np.convolve(close_prices, np.ones(window_size) / window_size, mode='valid')
-        std_dev = np.std(close_prices[:window_size])  # Standard deviation of the initial window
-        upper_band = middle_band + num_std_dev * std_dev
-        lower_band = middle_band - num_std_dev * std_dev
-        return upper_band[-1], lower_band[-1]
+        return self.engine.bollinger_bands(symbol=symbol, timeframe=timeframe, window_size=window_size, num_std_dev=num_std_dev)
 
 
     def sma_direction(self, symbol:str, timeframe:int, short_ma:int=10, long_ma:int=20, reverse=False) -> Directions:
@@ -288,10 +274,7 @@ class Indicators:
             is_solid = is_solid_candle("BTCUSD", timeframe=30, index=5, ratio=0.7)
         """
         candle = self.wrapper.get_candle_i(symbol=symbol, timeframe=timeframe, i=index)
-        body = abs(candle["close"] - candle["open"])
-        total_length = candle["high"] - candle["low"]
-        lenth_body_ratio = round(body/total_length, 1)
-        if lenth_body_ratio >= ratio:
+        if util.is_solid_candle(open=candle["open"], high=candle["high"], low=candle["low"], close=candle["close"], ratio=ratio):
             return True
     
 
@@ -312,10 +295,7 @@ class Indicators:
             is_solid = is_solid_candle("BTCUSD", timeframe=30, index=5, ratio=0.7)
         """
         candle = self.wrapper.get_candle_i(symbol=symbol, timeframe=timeframe, i=index)
-        body = abs(candle["close"] - candle["open"])
-        total_length = candle["high"] - candle["low"]
-        lenth_body_ratio = round(body/total_length, 1)
-        if lenth_body_ratio >= ratio:
+        if util.is_solid_candle(open=candle["open"], high=candle["high"], low=candle["low"], close=candle["close"], ratio=ratio):
             if candle["close"] > candle["open"]:
                 return Directions.LONG
             else:
@@ -403,7 +383,7 @@ class Indicators:
         return False
 
     def get_off_market_levels(self, symbol) -> Tuple[Signal, Signal]:
-        current_us_time = datetime.now(pytz.timezone('US/Eastern'))
+        current_us_time = mt5.now(pytz.timezone('US/Eastern'))
         today_year = int(current_us_time.year)
         today_month = int(current_us_time.month)
         today_date = int(current_us_time.day)
@@ -420,7 +400,7 @@ class Indicators:
 
             # Current GMT time
             tm_zone = pytz.timezone(f'Etc/GMT-{config.server_timezone}')
-            current_gmt_time = datetime.now(tm_zone)
+            current_gmt_time = mt5.now(tm_zone)
 
             # Generate off market hours high and lows
             start_time = datetime(int(current_gmt_time.year), int(current_gmt_time.month), int(current_gmt_time.day), 
@@ -752,11 +732,11 @@ class Indicators:
                 if week_day in [5, 6]:
                     print("Weekend Wait 1 Hour")
                     # Wait for 1 hour on weekends
-                    time.sleep(60 * 60)
+                    mt5.sleep(60 * 60)
                     return "UNKNOWN"
 
                 # On weekdays get the most update data
-                time.sleep(10)
+                mt5.sleep(10)
                 return self.get_dominant_market_actual_direction(lookback=lookback)
             
             prev_candle = self.wrapper.get_candle_i(symbol=symbol, timeframe=1440, i=lookback)
@@ -862,11 +842,11 @@ class Indicators:
                 if week_day in [5, 6]:
                     print("Weekend Wait 1 Hour")
                     # Wait for 1 hour on weekends
-                    time.sleep(60 * 60)
+                    mt5.sleep(60 * 60)
                     return "UNKNOWN"
 
                 # On weekdays get the most update data
-                time.sleep(10)
+                mt5.sleep(10)
                 return self.get_dominant_direction(lookback=lookback)
             
             prev_candle = self.wrapper.get_candle_i(symbol=symbol, timeframe=timeframe, i=lookback)
@@ -1,11 +1,12 @@
-import MetaTrader5 as mt5
-mt5.initialize()
+from modules.meta.broker import mt5
 from modules.meta.RiskManager import RiskManager
 from modules.common.Directions import Directions
 import modules.meta.util as util
 from modules.meta.Prices import Prices
 from modules.meta.wrapper import Wrapper
 from modules.common.logme import log_it
+from modules.meta.CloseEngine import CloseEngine
+import pandas as pd
 import time
 
 class Orders:
@@ -13,8 +14,22 @@ class Orders:
         self.prices = prices
         self.risk_manager=risk_manager
         self.wrapper = wrapper
+        # Concurrent close and cancel requests with retries
+        self.close_engine = CloseEngine()
 
-    def close_single_position_by_symbol(self, symbol:str):
+    def report_close(self, report:pd.DataFrame, reference:str="CLOSE") -> pd.DataFrame:
+        """
+        Prints the failed tickets of a close (or cancel) report and logs the latencies of a bulk request
+        """
+        for _, row in report[report["status"] != "DONE"].iterrows():
+            print("Close Order "+row["symbol"]+" failed!!...comment Code: "+str(row["comment"]))
+
+        if len(report) > 1:
+            log_it(reference).info(f"{len(report)} tickets, {(report['status'] == 'DONE').sum()} done, max latency {report['latency_ms'].max()} ms, "
+                                   f"retries {(report['attempts'] - 1).sum()}")
+        return report
+
+    def close_single_position_by_symbol(self, symbol:str) -> pd.DataFrame:
         """
         Closes a single position based on the symbol.
 
@@ -22,35 +37,19 @@ class Orders:
             symbol (str): The symbol of the position to be closed.
 
         Returns:
-            None
+            pd.DataFrame: Outcome and latency by ticket (see CloseEngine)
         """
-        positions = mt5.positions_get()
-        for obj in positions: 
-            if obj.symbol == symbol:
-                self.close_single_position(obj=obj)
-
-    def close_single_position(self, obj):
-        order_type = mt5.ORDER_TYPE_BUY if obj.type == 1 else mt5.ORDER_TYPE_SELL
-        exist_price = mt5.symbol_info_tick(obj.symbol).bid if obj.type == 1 else mt5.symbol_info_tick(obj.symbol).ask
-        
-        close_request = {
-            "action": mt5.TRADE_ACTION_DEAL,
-            "symbol": obj.symbol,
-            "volume": obj.volume,
-            "type": order_type,
-            "position": obj.ticket,
-            "price": exist_price,
-            "deviation": 20,
-            "magic": 234000,
-            "comment": 'close_trail_version',
-            "type_time": mt5.ORDER_TIME_GTC,
-            "type_filling": mt5.ORDER_FILLING_IOC, # also tried with ORDER_FILLING_RETURN
-        }
-        
-        result = mt5.order_send(close_request) # send order to close a position
-        
-        if result.retcode != mt5.TRADE_RETCODE_DONE:
-            print("Close Order "+obj.symbol+" failed!!...comment Code: "+str(result.comment))
+        positions = [obj for obj in self.wrapper.state.positions if obj.symbol == symbol]
+        return self.report_close(report=self.close_engine.close_positions(positions=positions))
+
+    def close_single_position(self, obj) -> pd.DataFrame:
+        """
+        Closes the position with a market order, requotes are retried with the latest price
+
+        Returns:
+            pd.DataFrame: Outcome and latency of the ticket (see CloseEngine)
+        """
+        return self.report_close(report=self.close_engine.close_positions(positions=[obj]))
     
 
     def close_all_positions(self):
@@ -73,13 +72,12 @@ class Orders:
 
         Note:
         -----
-        This method assumes that the `close_single_position` method is implemented and 
-        properly handles the logic for closing individual positions.
+        The close requests are sent concurrently by the close engine, so the positions are closed at about the
+        same time. The outcome and latency of each ticket is returned.
 
         """
-        positions = mt5.positions_get()
-        for obj in positions: 
-            self.close_single_position(obj=obj)
+        positions = self.wrapper.state.positions
+        return self.report_close(report=self.close_engine.close_positions(positions=list(positions)), reference="CLOSE_ALL")
     
     def close_all_selected_position(self, symbol_list:list):
         """
@@ -107,14 +105,12 @@ class Orders:
 
         Note:
         -----
-        This method assumes that the `close_single_position` method is implemented and 
-        properly handles the logic of closing individual positions.
+        The close requests are sent concurrently by the close engine, the outcome and latency of each ticket is returned.
 
         """
-        positions = mt5.positions_get()
-        for obj in positions:
-            if obj.symbol in symbol_list:
-                self.close_single_position(obj=obj)
+        positions = self.wrapper.state.positions
+        positions = [obj for obj in positions if obj.symbol in symbol_list]
+        return self.report_close(report=self.close_engine.close_positions(positions=positions), reference="CLOSE_SELECTED")
 
 
     def cancel_single_pending_order(self, active_order):
@@ -122,8 +118,8 @@ class Orders:
         Cancels a single pending order in MetaTrader 5 (MT5).
 
         This method sends a request to cancel the specified pending order using MT5's trading API.
-        If the cancellation request fails, the method will print an error message and wait for 3 seconds
-        before potentially retrying or reloading existing trades.
+        A temporary rejection is retried by the close engine with a backoff, if the cancellation still fails
+        the method prints an error message.
 
         Args:
             active_order (Order): An instance of the Order class representing the pending order to be canceled.
@@ -139,26 +135,21 @@ class Orders:
             - The method uses `mt5.TRADE_ACTION_REMOVE` to specify that the action is to remove the order.
             - The `order_send` function is called to execute the cancellation request.
             - The method checks the return code to determine if the cancellation was successful. If not, an error message is printed.
-            - There is a 3-second delay if the cancellation fails, which may help in scenarios where the trading platform needs time to process the request.
+            - The retries only hold this request (see CloseEngine), rather than a fixed 3-second delay of the whole loop.
 
         Example:
             order = Order(ticket=123456)
             cancel_single_pending_order(order)
         """
-        request = {
-                "action": mt5.TRADE_ACTION_REMOVE,
-                "order": active_order.ticket,
-            }
-
-        result = mt5.order_send(request)
+        self.report_cancel(report=self.close_engine.cancel_orders(orders=[active_order]))
 
-        if result.retcode != mt5.TRADE_RETCODE_DONE:
-            print(f"{active_order.symbol.ljust(12)}: Failed to cancel order {active_order.ticket}, reason: {result.comment}")
-            # If the cancle fails, Give some time to reload existing trades.
-            time.sleep(3)
+    def report_cancel(self, report:pd.DataFrame) -> pd.DataFrame:
+        for _, row in report[report["status"] != "DONE"].iterrows():
+            print(f"{row['symbol'].ljust(12)}: Failed to cancel order {row['ticket']}, reason: {row['comment']}")
+        return report
 
 
-    def cancel_all_pending_orders(self):
+    def cancel_all_pending_orders(self) -> int:
         """
         Cancels all pending orders on the MetaTrader 5 platform.
 
@@ -167,7 +158,7 @@ class Orders:
         of whether the account is in trial or real mode.
 
         Returns:
-            None
+            int: Number of pending orders found (i.e entries which were not filled)
 
         Raises:
             None
@@ -178,11 +169,13 @@ class Orders:
             - The function does not raise exceptions or return a status, so the 
             user needs to monitor the printed output for any issues.
         """
-        active_orders = mt5.orders_get()
+        active_orders = self.wrapper.state.orders
+
+        # Cancell all pending orders regadless of trial or real, the requests are sent concurrently
+        if len(active_orders) > 0:
+            self.report_cancel(report=self.close_engine.cancel_orders(orders=list(active_orders)))
 
-        # Cancell all pending orders regadless of trial or real
-        for active_order in active_orders:
-            self.cancel_single_pending_order(active_order=active_order)
+        return len(active_orders)
     
 
     def long_entry(self, symbol:str, reference:str, break_level:float, trading_timeframe:int, num_cdl_for_stop:int=2, multiplier:float=1, market_entry:bool=False, stop_selection:str="CANDLE", entry_with_st_tgt:bool=True) -> bool:
@@ -0,0 +1,92 @@
+import json
+import threading
+from datetime import date
+from modules.meta import util
+from modules.common.LogWriter import log_writer
+
+class RRRangeTracker:
+    def __init__(self, state_path:str):
+        """
+        Running range of the RR samples of the day (see DelayedEntry.is_max_ranged): the maximum, the minimum and the
+        latest RR with their timestamps.
+
+        The samples update the extremes as they arrive (the first occurrence is kept on ties, same as idxmax/idxmin of
+        the history), so the range is read in O(1) instead of loading the price tracker history again. The state is a
+        compact JSON checkpoint of the day, loaded at the start without scanning the history.
+
+        Args:
+            state_path (str): Path of the checkpoint, with the {date} placeholder of the day
+        """
+        self.state_path = state_path
+        self.lock = threading.Lock()
+        self.day:date = None
+        self.reset()
+
+    def reset(self):
+        self.max_rr, self.max_time = None, None
+        self.min_rr, self.min_time = None, None
+        self.latest_rr, self.latest_time = None, None
+        self.samples = 0
+
+    def roll(self):
+        # The range is daily, same as the price tracker history
+        today = util.get_current_time().date()
+        if today != self.day:
+            self.day = today
+            self.reset()
+
+    def push(self, timestamp:str, rr:float, save:bool=True):
+        """
+        Adds the RR sample, the timestamps are expected in increasing order ('%Y-%m-%d %H:%M:%S')
+        """
+        with self.lock:
+            self.roll()
+            rr = float(rr)
+            if self.max_rr is None or rr > self.max_rr:
+                self.max_rr, self.max_time = rr, timestamp
+            if self.min_rr is None or rr < self.min_rr:
+                self.min_rr, self.min_time = rr, timestamp
+            self.latest_rr, self.latest_time = rr, timestamp
+            self.samples += 1
+
+            if save:
+                self.save()
+
+    def save(self):
+        state = {"date": str(self.day), "samples": self.samples, "max": [self.max_rr, self.max_time],
+                 "min": [self.min_rr, self.min_time], "latest": [self.latest_rr, self.latest_time]}
+        log_writer.write_snapshot(file_path=self.state_path, content=json.dumps(state))
+
+    def load(self, history_path:str=None):
+        """
+        Loads the checkpoint of the day, or rebuilds it from the price tracker history of the day when there is no
+        checkpoint yet (e.g the history was written by an older session)
+
+        Args:
+            history_path (str, optional): Path of the price tracker history, with the {date} placeholder of the day
+        """
+        with self.lock:
+            self.roll()
+            content = log_writer.read_snapshot(file_path=self.state_path)
+            if content:
+                state = json.loads(content)
+                if state["date"] == str(self.day):
+                    self.samples = state["samples"]
+                    self.max_rr, self.max_time = state["max"]
+                    self.min_rr, self.min_time = state["min"]
+                    self.latest_rr, self.latest_time = state["latest"]
+                    return self
+
+        if history_path is not None:
+            data = log_writer.read_csv(file_path=history_path)
+            if data is not None and not data.empty:
+                for timestamp, rr in zip(data["Timestamp"], data["RR"]):
+                    self.push(timestamp=timestamp, rr=rr, save=False)
+                with self.lock:
+                    self.save()
+        return self
+
+    def is_empty(self) -> bool:
+        with self.lock:
+            self.roll()
+            return self.samples == 0
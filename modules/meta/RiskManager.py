@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta, time
 import modules.config as config
-import MetaTrader5 as mt5
+from modules.meta.broker import mt5
 import pytz
+import numpy as np
+import pandas as pd
 from modules.common.slack_msg import Slack
 import modules.meta.util as util
 from modules.meta.Prices import Prices
@@ -15,8 +17,9 @@ from modules.common.Directions import Directions
 from modules.common import files_util
 from modules.common.logme import log_it
 from modules.meta.TradeTracker import TradeTracker
+from modules.meta.StopModifier import StopModifier
+from modules.meta.SymbolRegistry import SymbolRegistry, shared_symbols
 
-mt5.initialize()
 
 class RiskManager:
     def __init__(self, stop_ratio=1, target_ratio=5, account_risk:float=1.0, max_account_risk:float=1.0, position_risk:float=0.1, enable_dynamic_direction:bool=False, **kwargs) -> None:
@@ -56,9 +59,12 @@ class RiskManager:
         self.account = Account()
         self.wrapper = Wrapper()
         self.prices = Prices()
+        self.symbols:SymbolRegistry = shared_symbols
         self.indicators = Indicators(wrapper=self.wrapper, prices=self.prices)
         self.alert = Slack()
         self.trade_tracker = TradeTracker()
+        # Stop and target modifications, only the changed levels are sent
+        self.stop_modifier = StopModifier()
         self.account_size = self.account.get_liquid_balance() - self.wrapper.get_closed_pnl()
         # self.position_risk_percentage, self.strategy = files_util.get_most_risk_percentage(file_name=util.get_server_ip(), strategy=kwargs["strategy"]) if dynamic_postional_risk else (position_risk, kwargs["strategy"])
         self.market_direction = kwargs["market_direction"]
@@ -157,65 +163,63 @@ class RiskManager:
         This method retrieves today's trades, calculates the directional PnL for each trade, and computes the net PnL 
         by considering the commission. It returns the total PnL for all trades and a DataFrame containing the net PnL 
         for each symbol.
+
+        The current price and the dollar value are resolved once per symbol, the price change and the PnL of the
+        trades are calculated on the whole columns (same result as the row by row reference of
+        scripts/check_trades_pnl_parity.py).
             tuple: A tuple containing:
                 - total_pnl (float): The total PnL for today's trades, rounded to 2 decimal places.
                 - DataFrame: A DataFrame with columns "symbol" and "net_pnl" representing the net PnL for each symbol.
         """
-        def directional_pnl(entry, current, direction):
-            """
-            Calculate the profit and loss (PnL) based on the entry price, current price, and trade direction.
-
-            Args:
-                entry (float): The entry price of the trade.
-                current (float): The current price of the trade.
-                direction (int): The direction of the trade. 
-                         0 for long (buy) position, 1 for short (sell) position.
-
-            Returns:
-                float: The calculated PnL. Positive value indicates profit, negative value indicates loss.
-            """
-            if direction == 0:
-                return current - entry
-            elif direction == 1:
-                return entry - current
-        
         todays_trades = self.wrapper.get_todays_trades()
+        if todays_trades.empty:
+            return 0.0, pd.DataFrame(columns=["symbol", "net_pnl", "Mark"])
+
         todays_trades = todays_trades.sort_values(by="time", ascending=True)
         todays_trades = todays_trades[["time", "symbol", "entry", "type", "price", "commission", "volume", "profit", "ticket"]].copy()
-        
-        individual_symbol_df = todays_trades[todays_trades["entry"] == 0].copy()
-        individual_symbol_df['entry_type'] = individual_symbol_df.groupby(['symbol']).cumcount().apply(lambda x: 'first' if x == 0 else 'reentry')
 
+        entry_trades = todays_trades[todays_trades["entry"] == 0].copy()
         # Mark entries as 'first' or 'reentry'
-        individual_symbol_df["Mark"] = individual_symbol_df.duplicated(subset="symbol", keep="first").map({False: "first", True: "reentry"})
-        
-        # Get the last trade for the day, Calculate PnL based on the latest entry
-        latest_closed_trades = todays_trades[todays_trades["entry"] == 0].copy()
-        latest_closed_trades = latest_closed_trades.drop_duplicates(subset=["symbol"], keep="last")
+        entry_trades["Mark"] = np.where(entry_trades.duplicated(subset="symbol", keep="first"), "reentry", "first")
 
         # Generate pnL for the early closed adaptive positions ** This is not the final PnL, This will be added to the final PnL
-        early_close_trades = todays_trades[todays_trades["entry"] == 1].copy()
-        adaptive_closed_trades = early_close_trades.drop_duplicates(subset=["symbol"], keep="last")
-        adapted_positions = early_close_trades[~early_close_trades.index.isin(adaptive_closed_trades.index)]
+        early_close_trades = todays_trades[todays_trades["entry"] == 1]
+        adapted_positions = early_close_trades[early_close_trades.duplicated(subset=["symbol"], keep="last")]
         adapted_closed_positions_pnl = adapted_positions["profit"].sum() + adapted_positions["commission"].sum()
-        
-        # Calculate the PnL for each positions with ticket as unique value
-        individual_symbol_df["current_price"] = individual_symbol_df["symbol"].apply(lambda x: self.prices.get_exchange_price(symbol=x))
-        individual_symbol_df["change"] =  individual_symbol_df.apply(lambda x: directional_pnl(entry=x["price"], current=x["current_price"], direction=x["type"]) , axis=1)
-        individual_symbol_df["pnl"] = individual_symbol_df.apply(lambda x: self.get_pnl_of_position(symbol=x["symbol"], lots=x["volume"], points_in_stop=x["change"]), axis=1)
-        individual_symbol_df["net_pnl"] = individual_symbol_df["pnl"] + individual_symbol_df["commission"]
-        individual_symbol_df["net_pnl"] = individual_symbol_df["net_pnl"].round(2)
 
+        # Calculate the PnL for each positions with ticket as unique value
+        entry_trades["pnl"] = self.get_pnl_of_positions(symbols=entry_trades["symbol"].to_numpy(), lots=entry_trades["volume"].to_numpy(),
+                                                        types=entry_trades["type"].to_numpy(), entry_prices=entry_trades["price"].to_numpy())
+        entry_trades["net_pnl"] = (entry_trades["pnl"] + entry_trades["commission"]).round(2)
 
         # the total pnl is based on the last exiting positions
-        latest_closed_trades["current_price"] = latest_closed_trades["symbol"].apply(lambda x: self.prices.get_exchange_price(symbol=x))
-        latest_closed_trades["change"] =  latest_closed_trades.apply(lambda x: directional_pnl(entry=x["price"], current=x["current_price"], direction=x["type"]) , axis=1)
-        latest_closed_trades["pnl"] = latest_closed_trades.apply(lambda x: self.get_pnl_of_position(symbol=x["symbol"], lots=x["volume"], points_in_stop=x["change"]), axis=1)
-        latest_closed_trades["net_pnl"] = latest_closed_trades["pnl"] + latest_closed_trades["commission"]
-        latest_closed_trades["net_pnl"] = latest_closed_trades["net_pnl"].round(2)
-        total_pnl = round(latest_closed_trades["net_pnl"].sum() + adapted_closed_positions_pnl, 2)
-        return total_pnl, individual_symbol_df[["symbol", "net_pnl", "Mark"]]
-    
+        latest_trades = entry_trades.drop_duplicates(subset=["symbol"], keep="last")
+        total_pnl = round(latest_trades["net_pnl"].sum() + adapted_closed_positions_pnl, 2)
+        return total_pnl, entry_trades[["symbol", "net_pnl", "Mark"]]
+
+    def get_pnl_of_positions(self, symbols:np.ndarray, lots:np.ndarray, types:np.ndarray, entry_prices:np.ndarray) -> np.ndarray:
+        """
+        Dollar PnL of many positions at the current prices, vectorized version of get_pnl_of_position.
+
+        Args:
+            symbols (np.ndarray): Symbol of each position
+            lots (np.ndarray): Lots of each position
+            types (np.ndarray): Direction of each position, 0 for long and 1 for short
+            entry_prices (np.ndarray): Entry price of each position
+
+        Returns:
+            np.ndarray: PnL of each position in dollars
+        """
+        unique_symbols, symbol_index = np.unique(symbols.astype(str), return_inverse=True)
+        current_prices = np.array([self.prices.get_exchange_price(symbol=symbol) for symbol in unique_symbols], dtype=np.float64)[symbol_index]
+        dollar_values = self.prices.get_dollar_values(symbols=unique_symbols)[symbol_index]
+
+        entry_prices = entry_prices.astype(np.float64)
+        change = np.where(types == 0, current_prices - entry_prices, np.where(types == 1, entry_prices - current_prices, np.nan))
+
+        scaled_lots = lots.astype(np.float64) * self.symbols.get_lot_multipliers(symbols=unique_symbols)[symbol_index]
+        return scaled_lots * dollar_values * change
+
     def close_positions_by_solid_candle(self, timeframe:int, wait_factor:int=1, close_check_candle:int=1, double_candle_check=False, candle_solid_ratio=0.6):
         """
         Evaluates and identifies active trading positions to close based on the presence of a solid candle in the given timeframe.
@@ -455,7 +459,7 @@ class RiskManager:
         """
         Get list of positions that are not breakeven of in the profit
         """
-        existing_positions = mt5.positions_get()
+        existing_positions = self.wrapper.state.positions
         symbol_list = []
         for position in existing_positions:
             symbol = position.symbol
@@ -490,7 +494,7 @@ class RiskManager:
 
     def close_on_candle_close(self, timeframe) -> list:
         list_of_positions = []
-        existing_positions = mt5.positions_get()
+        existing_positions = self.wrapper.state.positions
         factor = 2
         for position in existing_positions:
             traded_time = util.get_traded_time(epoch=position.time)
@@ -540,7 +544,7 @@ class RiskManager:
         """
         symbol_list = []
         if is_market_open:
-            existing_positions = mt5.positions_get()
+            existing_positions = self.wrapper.state.positions
             for position in existing_positions:
                 symbol = position.symbol
                 pnl = position.profit
@@ -556,28 +560,14 @@ class RiskManager:
     
 
     def disable_stop(self):
-        existing_positions = mt5.positions_get()
-        for position in existing_positions:
-            target_price = position.tp
-            modify_request = {
-                        "action": mt5.TRADE_ACTION_SLTP,
-                        "symbol": position.symbol,
-                        "volume": position.volume,
-                        "type": position.type,
-                        "position": position.ticket,
-                        "tp": target_price,
-                        "comment": position.comment,
-                        "magic": position.magic,
-                        "type_time": mt5.ORDER_TIME_GTC,
-                        "type_filling": mt5.ORDER_FILLING_FOK,
-                        "ENUM_ORDER_STATE": mt5.ORDER_FILLING_RETURN,
-                    }
-                    
-            result = mt5.order_send(modify_request)
-            
-            if result.retcode != mt5.TRADE_RETCODE_DONE:
-                if result.comment != "No changes":
-                    print("Re-enabling STOP for " + position.symbol + " failed!!...Error: "+str(result.comment))
+        """
+        Removes the stop of the positions (the target is kept), through the stop modifier so its acknowledged levels follow
+        """
+        table = self.stop_modifier.get_positions_table()
+        if table.empty:
+            return
+
+        self.stop_modifier.modify(table=table, sl=np.zeros(len(table)), tp=table["tp"].to_numpy(dtype=np.float64), reference="Disabling STOP")
 
 
     def trailing_stop_and_target(self, stop_multiplier:float, target_multiplier:float, trading_timeframe:int, num_cdl_for_stop:int, stop_selection:str):
@@ -605,77 +595,32 @@ class RiskManager:
             # Disable the stop when the spread is huge, Specially when the position is not close from previous day
             self.disable_stop()
         else:
-            existing_positions = mt5.positions_get()
-            for position in existing_positions:
-                symbol = position.symbol
-                stop_price = position.sl
-                target_price = position.tp
-                open_price = position.price_open
-                pnl = position.profit
+            table = self.stop_modifier.get_positions_table()
+            if table.empty:
+                return
 
-                # Move the stop to breakeven once the price moved to R
-                is_stop_updated=False
-                # if pnl > self.risk_of_a_position:
-                #     match position.type:
-                #         case 0:
-                #             # Long Position
-                #             if stop_price < open_price:
-                #                 is_stop_updated = True
-                #         case 1:
-                #             # Short Position
-                #             if stop_price > open_price:
-                #                 is_stop_updated = True
-                
-                # Increase the range of the spread to eliminate the sudden stopouts
+            # Increase the range of the spread to eliminate the sudden stopouts, the range is calculated once per symbol
+            long_stops, short_stops = dict(), dict()
+            for symbol in table["symbol"].unique():
                 stp_shield_obj = self.get_stop_range(symbol=symbol, timeframe=trading_timeframe, multiplier=stop_multiplier, num_cdl_for_stop=num_cdl_for_stop, stop_selection=stop_selection)
-                tgt_shield_obj = self.get_stop_range(symbol=symbol, timeframe=trading_timeframe, multiplier=target_multiplier, num_cdl_for_stop=num_cdl_for_stop, stop_selection=stop_selection)
-                
-                match position.type:
-                    case 0:
-                        # Long Position
-                        trail_stop = max(stop_price, stp_shield_obj.get_long_stop)
-                        trail_target = min(target_price, tgt_shield_obj.get_short_stop)
-                        stop_enabler = stp_shield_obj.get_long_stop
-                    case 1:
-                        # Short Position
-                        trail_stop = min(stop_price, stp_shield_obj.get_short_stop)
-                        trail_target = max(target_price, tgt_shield_obj.get_long_stop)
-                        stop_enabler = stp_shield_obj.get_short_stop
-                
-                # if (trail_stop != stop_price) or (target_price != trail_target) or is_stop_updated or (stop_price == 0):
-                if (trail_stop != stop_price) or is_stop_updated or (stop_price == 0):
-                    
-                    # If the position don't have the stop, then it will be reactivated
-                    if stop_price == 0:
-                        trail_stop = stop_enabler
-
-                    # When the price move above 1R then move the stop to breakeven
-                    if is_stop_updated:
-                        trail_stop = open_price
-                        print(f"BREAKEVEN : {symbol} to {open_price}")
-
-                    print(f"STP Updated: {position.symbol}, PRE STP: {round(stop_price, 5)}, CURR STP: {trail_stop}, PRE TGT: {target_price}, CURR TGT: {trail_target}")
-
-                    modify_request = {
-                        "action": mt5.TRADE_ACTION_SLTP,
-                        "symbol": position.symbol,
-                        "volume": position.volume,
-                        "type": position.type,
-                        "position": position.ticket,
-                        "sl": trail_stop,
-                        "tp": target_price, # trail_target
-                        "comment": position.comment,
-                        "magic": position.magic,
-                        "type_time": mt5.ORDER_TIME_GTC,
-                        "type_filling": mt5.ORDER_FILLING_FOK,
-                        "ENUM_ORDER_STATE": mt5.ORDER_FILLING_RETURN,
-                    }
-                    
-                    result = mt5.order_send(modify_request)
-                    
-                    if result.retcode != mt5.TRADE_RETCODE_DONE:
-                        if result.comment != "No changes":
-                            print("Trailing STOP for " + position.symbol + " failed!!...Error: "+str(result.comment))
+                long_stops[symbol] = stp_shield_obj.get_long_stop
+                short_stops[symbol] = stp_shield_obj.get_short_stop
+
+            long_stop = table["symbol"].map(long_stops).to_numpy(dtype=np.float64)
+            short_stop = table["symbol"].map(short_stops).to_numpy(dtype=np.float64)
+            stop_price = table["sl"].to_numpy(dtype=np.float64)
+            is_long = table["type"].to_numpy() == 0
+
+            # The stop only moves in the direction of the position
+            trail_stop = np.where(is_long, np.maximum(stop_price, long_stop), np.minimum(stop_price, short_stop))
+
+            # If the position don't have the stop, then it will be reactivated
+            trail_stop = np.where(stop_price == 0, np.where(is_long, long_stop, short_stop), trail_stop)
+
+            # The target is kept as it is
+            changes = self.stop_modifier.modify(table=table, sl=trail_stop, tp=table["tp"].to_numpy(dtype=np.float64), reference="Trailing STOP")
+            for row in changes.itertuples():
+                print(f"STP Updated: {row.symbol}, PRE STP: {round(row.sl, 5)}, CURR STP: {row.new_sl}, TGT: {row.tp}")
 
 
     def breakeven(self, profit_factor:int):
@@ -704,54 +649,22 @@ class RiskManager:
             None: The function handles errors internally by printing messages if the stop-loss modification fails.
 
         """
-        existing_positions = mt5.positions_get()
-        for position in existing_positions:
-            symbol = position.symbol
-            stop_price = position.sl
-            target_price = position.tp
-            open_price = position.price_open
-            pnl = position.profit
-
-            # Move the stop to breakeven once the price moved to R
-            is_stop_updated=False
-            if pnl > (profit_factor * self.risk_of_a_position):
-                match position.type:
-                    case 0:
-                        # Long Position
-                        if stop_price < open_price:
-                            is_stop_updated = True
-                    case 1:
-                        # Short Position
-                        if stop_price > open_price:
-                            is_stop_updated = True
-            
-            if is_stop_updated:
-                # When the price move above 1R then move the stop to breakeven
-                if is_stop_updated:
-                    trail_stop = open_price
-                    trail_target = target_price
-                    print(f"BREAKEVEN : {symbol} to {open_price}")
-
-                    modify_request = {
-                        "action": mt5.TRADE_ACTION_SLTP,
-                        "symbol": position.symbol,
-                        "volume": position.volume,
-                        "type": position.type,
-                        "position": position.ticket,
-                        "sl": trail_stop,
-                        "tp": trail_target,
-                        "comment": position.comment,
-                        "magic": position.magic,
-                        "type_time": mt5.ORDER_TIME_GTC,
-                        "type_filling": mt5.ORDER_FILLING_FOK,
-                        "ENUM_ORDER_STATE": mt5.ORDER_FILLING_RETURN,
-                    }
-                    
-                    result = mt5.order_send(modify_request)
-                    
-                    if result.retcode != mt5.TRADE_RETCODE_DONE:
-                        if result.comment != "No changes":
-                            print("Trailing STOP for " + position.symbol + " failed!!...Error: "+str(result.comment))
+        table = self.stop_modifier.get_positions_table()
+        if table.empty:
+            return
+
+        stop_price = table["sl"].to_numpy(dtype=np.float64)
+        open_price = table["price_open"].to_numpy(dtype=np.float64)
+        is_long = table["type"].to_numpy() == 0
+
+        # Move the stop to breakeven once the price moved to R, when the stop is still below (long) or above (short) the entry
+        is_stop_updated = (table["profit"].to_numpy() > (profit_factor * self.risk_of_a_position)) \
+                            & np.where(is_long, stop_price < open_price, stop_price > open_price)
+        trail_stop = np.where(is_stop_updated, open_price, stop_price)
+
+        changes = self.stop_modifier.modify(table=table, sl=trail_stop, tp=table["tp"].to_numpy(dtype=np.float64), reference="Trailing STOP")
+        for row in changes.itertuples():
+            print(f"BREAKEVEN : {row.symbol} to {row.new_sl}")
     
     def get_stop_range(self, symbol, timeframe, buffer_ratio=config.buffer_ratio, multiplier=1, num_cdl_for_stop=0, stop_selection:str="CANDLE") -> Shield:
         """
@@ -841,31 +754,17 @@ class RiskManager:
 
     
     def get_pnl_of_position(self, symbol, lots, points_in_stop):
-         # This change made of fundedEngineer account!
-
-        if symbol in curr.currencies:
-            lots = lots*10**5
-    
-        if symbol in ['ASX_raw', 'FTSE_raw', 'FTSE100']:
-            lots = lots*10
-        
-        if symbol in ['SP_raw', "SPX500"]:
-            lots = lots*40
-        
-        if symbol in ['HK50_raw']:
-            lots = lots*100
-        
-        if symbol in ['NIKKEI_raw']:
-            lots = lots*1000
-
-        if symbol in ["XAUUSD"]:
-            # Some reason the amount is comes as 4 times. So divide by 4
-            lots = lots*4/100
-        
+        lots = self.scale_lots(symbol=symbol, lots=lots)
         dollor_value = self.prices.get_dollar_value(symbol)
         position_dollor_value = lots * dollor_value * points_in_stop
         return position_dollor_value
 
+    def scale_lots(self, symbol, lots):
+        """
+        Lots of the symbol in units of the dollar value, works on a single lot size or an array of them
+        """
+        return lots * self.symbols.get(symbol=symbol).lot_multiplier
+
     def get_lot_size(self, symbol, entry_price, stop_price) -> Tuple[float, float]:
         """
         Calculates the lot size for a given trading position based on the entry price,
@@ -884,40 +783,43 @@ class RiskManager:
 
         Notes:
             - The method uses the dollar value of the symbol to compute the lot size.
-            - Adjustments are made for various symbols, including currency pairs, stock indices,
-            and commodities, based on predefined scaling factors.
-            - The resulting lot size is rounded to two decimal places, and a minimum lot size
-            of 0.01 is enforced.
+            - The scaling factor (contract size of the currency pairs, and the adjustments of the stock indices
+            and commodities) and the lot rounding are read from the symbol contract (see SymbolRegistry).
+            - The resulting lot size is rounded to the volume step of the symbol (two decimal places for 0.01).
         """
+        contract = self.symbols.get(symbol=symbol)
         dollor_value = self.prices.get_dollar_value(symbol)
         points_in_stop = abs(entry_price-stop_price)
         lots = self.risk_of_a_position/(points_in_stop * dollor_value)
         
-        if symbol in curr.currencies:
+        if contract.is_currency:
             points_in_stop = round(points_in_stop, 5)
-            lots = lots/10**5
-        
-        # This change made of fundedEngineer account!
-        if symbol in ['ASX_raw', 'FTSE_raw', 'FTSE100']:
-            lots = lots/10
-        
-        if symbol in ['SP_raw', "SPX500"]:
-            lots = lots/40
-        
-        if symbol in ['HK50_raw']:
-            lots = lots/100
-        
-        if symbol in ['NIKKEI_raw']:
-            lots = lots/1000
 
-        if symbol in ["XAUUSD"]:
-            # Some reason the amount is comes as 4 times. So divide by 4
-            lots = lots*100/4
-        
-        # if lots <= 0.01:
-        #     lots = 0.01
+        lots = round(lots/contract.lot_multiplier, contract.volume_digits)
+
+        return points_in_stop, lots
+
+    def get_lot_sizes(self, symbols:np.ndarray, entry_prices:np.ndarray, stop_prices:np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized version of get_lot_size, for many symbols at once
+
+        Args:
+            symbols (np.ndarray): Trading symbols
+            entry_prices (np.ndarray): Entry price of each trade
+            stop_prices (np.ndarray): Stop price of each trade
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Number of points in the stop and lot size of each trade
+        """
+        symbols = list(symbols)
+        is_currency = np.array([self.symbols.get(symbol=symbol).is_currency for symbol in symbols], dtype=bool)
+        dollar_values = self.prices.get_dollar_values(symbols=symbols)
+        points_in_stop = np.abs(np.asarray(entry_prices, dtype=np.float64) - np.asarray(stop_prices, dtype=np.float64))
+        lots = self.risk_of_a_position/(points_in_stop * dollar_values)/self.symbols.get_lot_multipliers(symbols=symbols)
 
-        lots = round(lots, 2)
+        points_in_stop = np.where(is_currency, np.round(points_in_stop, 5), points_in_stop)
+        volume_digits = self.symbols.get_volume_digits(symbols=symbols)
+        lots = np.array([round(lot, digits) for lot, digits in zip(lots, volume_digits)], dtype=np.float64)
 
         return points_in_stop, lots
     
@@ -943,7 +845,7 @@ class RiskManager:
             - symbol: The symbol for the position.
             - trade_bar_direction: The direction of the latest candle (LONG or SHORT).
         """
-        existing_positions = mt5.positions_get()
+        existing_positions = self.wrapper.state.positions
         neutral_positions = []
         current_hour = int(util.get_current_time().strftime("%H"))
 
@@ -1019,7 +921,7 @@ class RiskManager:
             neutral_positions = self.neutralizer(enable_ratio=0.6)
         """
         neutral_positions = []
-        existing_positions = mt5.positions_get()
+        existing_positions = self.wrapper.state.positions
         for position in existing_positions:
             symbol = position.symbol
             stop_price = position.sl
@@ -1048,9 +950,9 @@ class RiskManager:
         If you already have made some money. Then don't entry this for another time peroid based on last entered timeframe
         """
         tm_zone = pytz.timezone(f'Etc/GMT-{config.server_timezone}')
-        start_time = datetime.combine(datetime.now(tm_zone).date(), time()).replace(tzinfo=tm_zone) - timedelta(hours=2)
-        end_time = datetime.now(tm_zone) + timedelta(hours=4)
-        today_date = datetime.now(tm_zone).date()
+        start_time = datetime.combine(mt5.now(tm_zone).date(), time()).replace(tzinfo=tm_zone) - timedelta(hours=2)
+        end_time = mt5.now(tm_zone) + timedelta(hours=4)
+        today_date = mt5.now(tm_zone).date()
 
         exit_traded_position = [i for i in mt5.history_deals_get(start_time,  end_time) if i.symbol== symbol and i.entry==1]
 
@@ -1070,7 +972,7 @@ class RiskManager:
                 previous_timeframe = int(entry_traded_object[-1].magic)  # in minutes, This was my input to the process
                 # timeframe = max(timeframe, current_trade_timeframe) # Pick the max timeframe based on previous and current suggested trade timeframe
 
-                current_time = (datetime.now(tm_zone) + timedelta(hours=2))
+                current_time = (mt5.now(tm_zone) + timedelta(hours=2))
                 current_time_epoch = current_time.timestamp()
 
                 # Minutes from last traded time.
@@ -1163,4 +1065,4 @@ if __name__ == "__main__":
             for i in range(100):
                 print(obj.calculate_initial_trades_based_pnl())
                 import time
-                time.sleep(1)
\ No newline at end of file
+                mt5.sleep(1)
\ No newline at end of file
@@ -0,0 +1,157 @@
+from modules.meta.broker import mt5
+import math
+import pytz
+from typing import Dict, List, Set, Tuple
+from modules import config
+
+class Scheduler:
+    # Events returned by wait()
+    BAR = "BAR" # A bar of one of the timeframes is closed
+    PNL = "PNL" # PnL and exit check interval
+    STRATEGY = "STRATEGY" # Re-quote of the pending entries and intrabar strategies interval
+    TICK = "TICK" # New tick on a symbol with an open position
+
+    def __init__(self, timeframes:List[int], pnl_interval:float=config.pnl_check_interval, strategy_interval:float=config.strategy_check_interval,
+                 tick_interval:float=config.tick_check_interval, bar_close_delay:float=config.bar_close_delay):
+        """
+        Wakes the trading loop on the events it has to react to, instead of a fixed sleep.
+
+        The closed-bar work (strategies) only has to run once the bar of the trading or ATR timeframe is closed, so it's
+        woken on the bar boundaries (server time). Between the bar closes, the pending entries are re-quoted and the
+        strategies which read the forming bar are evaluated on their own interval. The PnL and exit checks are cheap and
+        run on a faster interval, and the symbols with open positions are polled every `tick_interval` so a new tick wakes
+        the loop straight away.
+        The first wait returns right away with a BAR event, so the first cycle runs everything.
+
+        Args:
+            timeframes (List[int]): Timeframes in minutes, whose bar closes wake the closed-bar work
+            pnl_interval (float): Seconds between the PnL and exit checks
+            strategy_interval (float): Seconds between the re-quotes of the pending entries (and the intrabar strategies)
+            tick_interval (float): Seconds between the tick polls of the symbols with open positions
+            bar_close_delay (float): Seconds after the bar boundary before waking, so the new bar is available on the terminal
+        """
+        self.timeframes = sorted(set(timeframes))
+        self.pnl_interval = pnl_interval
+        self.strategy_interval = strategy_interval
+        self.tick_interval = tick_interval
+        self.bar_close_delay = bar_close_delay
+
+        now = self.server_epoch()
+        self.next_bar_close:Dict[int, float] = {timeframe: self.get_next_bar_close(timeframe=timeframe, epoch=now) for timeframe in self.timeframes}
+        self.next_pnl_check:float = now + self.pnl_interval
+        self.next_strategy_check:float = now + self.strategy_interval
+        self.last_ticks:Dict[str, Tuple[float, float]] = dict()
+
+        self.events:Set[str] = {self.BAR}
+        self.closed_timeframes:Set[int] = set(self.timeframes)
+
+    def server_epoch(self) -> float:
+        """
+        Current server time as epoch seconds, the same reference as the candle times
+        """
+        return mt5.now(pytz.utc).timestamp() + config.server_timezone * 3600
+
+    def get_next_bar_close(self, timeframe:int, epoch:float) -> float:
+        """
+        Server epoch at which the bar running at `epoch` is closed (plus the bar close delay)
+        """
+        bar_seconds = timeframe * 60
+        return (epoch // bar_seconds + 1) * bar_seconds + self.bar_close_delay
+
+    def bar_closed(self, timeframe:int=None) -> bool:
+        """
+        Whether the last wait was woken by a bar close, of the given timeframe or any of them
+        """
+        if timeframe is None:
+            return len(self.closed_timeframes) > 0
+        return timeframe in self.closed_timeframes
+
+    def strategy_due(self) -> bool:
+        """
+        Whether the last wait was woken by a bar close or the strategy interval, the wakes on which the pending entries
+        are cancelled and the strategies can run
+        """
+        return self.BAR in self.events or self.STRATEGY in self.events
+
+    def ticks_changed(self, symbols:List[str]) -> bool:
+        """
+        Polls the latest tick of the symbols, True when the bid or ask of any of them has changed since the previous poll.
+        A symbol seen for the first time is only recorded.
+        """
+        changed = False
+        for symbol in symbols:
+            tick = mt5.symbol_info_tick(symbol)
+            if tick is None:
+                continue
+            current = (tick.bid, tick.ask)
+            previous = self.last_ticks.get(symbol)
+            if previous is not None and previous != current:
+                changed = True
+            self.last_ticks[symbol] = current
+
+        # Forget the symbols which are no longer in a position
+        for symbol in [symbol for symbol in self.last_ticks if symbol not in symbols]:
+            del self.last_ticks[symbol]
+
+        return changed
+
+    def wait(self, symbols:List[str]=None) -> Set[str]:
+        """
+        Sleeps until the next event.
+
+        Args:
+            symbols (List[str]): Symbols with open positions, a new tick on them wakes the loop
+
+        Returns:
+            Set[str]: Events of the wake up (BAR, PNL, STRATEGY, TICK), the closed timeframes are in `closed_timeframes`
+        """
+        symbols = list(symbols) if symbols is not None else list()
+        if symbols:
+            # Reference ticks at the end of the cycle, so a tick which arrived during the cycle is not missed
+            self.ticks_changed(symbols=symbols)
+
+        while True:
+            now = self.server_epoch()
+            events = set()
+
+            closed_timeframes = set()
+            for timeframe, bar_close in self.next_bar_close.items():
+                if now >= bar_close:
+                    closed_timeframes.add(timeframe)
+                    self.next_bar_close[timeframe] = self.get_next_bar_close(timeframe=timeframe, epoch=now - self.bar_close_delay)
+            if closed_timeframes:
+                events.add(self.BAR)
+
+            if now >= self.next_pnl_check:
+                events.add(self.PNL)
+                self.next_pnl_check = now + self.pnl_interval
+
+            if closed_timeframes or now >= self.next_strategy_check:
+                # A bar close also restarts the strategy interval, the strategies have just run
+                if not closed_timeframes:
+                    events.add(self.STRATEGY)
+                self.next_strategy_check = now + self.strategy_interval
+
+            if symbols and self.ticks_changed(symbols=symbols):
+                events.add(self.TICK)
+
+            if events:
+                self.events = events
+                self.closed_timeframes = closed_timeframes
+                return events
+
+            wake_up = min(list(self.next_bar_close.values()) + [self.next_pnl_check, self.next_strategy_check])
+            seconds = wake_up - now
+            if symbols:
+                seconds = min(seconds, self.tick_interval)
+
+            # Whole seconds, the simulated clock only moves by seconds
+            mt5.sleep(max(math.ceil(seconds), 1))
+
+
+if __name__ == "__main__":
+    scheduler = Scheduler(timeframes=[15, 60])
+    print(scheduler.next_bar_close)
+    for _ in range(3):
+        events = scheduler.wait()
+        print(scheduler.server_epoch(), events, scheduler.closed_timeframes)
@@ -0,0 +1,524 @@
+import os
+import time
+import threading
+import numpy as np
+import pandas as pd
+from glob import glob
+from datetime import datetime, timezone
+from collections import namedtuple
+from typing import Dict, List, Tuple
+from modules import config
+from modules.meta.broker import BrokerBackend
+
+Tick = namedtuple("Tick", ["time", "bid", "ask", "last", "volume", "time_msc", "flags", "volume_real"])
+
+SymbolInfo = namedtuple("SymbolInfo", ["name", "digits", "point", "spread", "trade_contract_size", "volume_min", "volume_max",
+                                       "volume_step", "bid", "ask", "price_change", "session_open", "session_close"])
+
+TradePosition = namedtuple("TradePosition", ["ticket", "time", "time_msc", "time_update", "time_update_msc", "type", "magic",
+                                             "identifier", "reason", "volume", "price_open", "sl", "tp", "price_current",
+                                             "swap", "profit", "symbol", "comment", "external_id"])
+
+TradeOrder = namedtuple("TradeOrder", ["ticket", "time_setup", "time_setup_msc", "time_done", "time_done_msc", "time_expiration",
+                                       "type", "type_time", "type_filling", "state", "magic", "position_id", "position_by_id",
+                                       "reason", "volume_initial", "volume_current", "price_open", "sl", "tp", "price_current",
+                                       "price_stoplimit", "symbol", "comment", "external_id"])
+
+TradeDeal = namedtuple("TradeDeal", ["ticket", "order", "time", "time_msc", "type", "entry", "magic", "position_id", "reason",
+                                     "volume", "price", "commission", "swap", "profit", "fee", "symbol", "comment", "external_id"])
+
+AccountInfo = namedtuple("AccountInfo", ["login", "trade_mode", "leverage", "limit_orders", "margin_so_mode", "trade_allowed",
+                                         "trade_expert", "margin_mode", "currency_digits", "fifo_close", "balance", "credit",
+                                         "profit", "equity", "margin", "margin_free", "margin_level", "margin_so_call",
+                                         "margin_so_so", "margin_initial", "margin_maintenance", "assets", "liabilities",
+                                         "commission_blocked", "name", "server", "currency", "company"])
+
+OrderSendResult = namedtuple("OrderSendResult", ["retcode", "deal", "order", "volume", "price", "bid", "ask", "comment",
+                                                 "request_id", "retcode_external", "request"])
+
+rates_dtype = np.dtype([("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+                        ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8")])
+
+
+class SimulationFinished(Exception):
+    """
+    Raised when the clock goes beyond the stored candles
+    """
+
+
+class Simulator(BrokerBackend):
+    # Same values as the MetaTrader5 package
+    TIMEFRAME_M1, TIMEFRAME_M5, TIMEFRAME_M15, TIMEFRAME_M30 = 1, 5, 15, 30
+    TIMEFRAME_H1, TIMEFRAME_H2, TIMEFRAME_H3, TIMEFRAME_H4, TIMEFRAME_H8 = 16385, 16386, 16387, 16388, 16392
+    TIMEFRAME_D1 = 16408
+    ORDER_TYPE_BUY, ORDER_TYPE_SELL, ORDER_TYPE_BUY_LIMIT, ORDER_TYPE_SELL_LIMIT, ORDER_TYPE_BUY_STOP, ORDER_TYPE_SELL_STOP = 0, 1, 2, 3, 4, 5
+    POSITION_TYPE_BUY, POSITION_TYPE_SELL = 0, 1
+    TRADE_ACTION_DEAL, TRADE_ACTION_PENDING, TRADE_ACTION_SLTP, TRADE_ACTION_MODIFY, TRADE_ACTION_REMOVE = 1, 5, 6, 7, 8
+    ORDER_FILLING_FOK, ORDER_FILLING_IOC, ORDER_FILLING_RETURN = 0, 1, 2
+    ORDER_TIME_GTC = 0
+    DEAL_TYPE_BUY, DEAL_TYPE_SELL, DEAL_TYPE_BALANCE = 0, 1, 2
+    DEAL_ENTRY_IN, DEAL_ENTRY_OUT = 0, 1
+    TRADE_RETCODE_REQUOTE, TRADE_RETCODE_REJECT, TRADE_RETCODE_DONE, TRADE_RETCODE_INVALID = 10004, 10006, 10009, 10013
+    TRADE_RETCODE_INVALID_VOLUME, TRADE_RETCODE_INVALID_PRICE, TRADE_RETCODE_INVALID_STOPS = 10014, 10015, 10016
+    TRADE_RETCODE_TIMEOUT, TRADE_RETCODE_PRICE_CHANGED, TRADE_RETCODE_PRICE_OFF, TRADE_RETCODE_NO_CHANGES = 10012, 10020, 10021, 10025
+    TRADE_RETCODE_CONNECTION = 10031
+
+    timeframe_minutes = {1: 1, 5: 5, 15: 15, 30: 30, 16385: 60, 16386: 120, 16387: 180, 16388: 240, 16392: 480, 16408: 1440}
+
+    def __init__(self, data_dir:str="data/simulator", start_time:str=None, balance:float=100000, company:str="FTMO S.R.O.",
+                 commission_per_lot:float=0.0, warmup_days:int=5):
+        """
+        Local stand-in for the MetaTrader5 terminal which replays stored candles.
+
+        Candles are read from `<data_dir>/<symbol>_<timeframe>.csv` (columns time, open, high, low, close and optionally
+        tick_volume, spread, real_volume) or from a candle store directory (modules/meta/CandleStore.py). The time can
+        be an epoch in server time or a datetime string, e.g the files written by notebooks/scripts/download_candle_data.py.
+        The smallest timeframe of each symbol is the base, higher timeframes are aggregated from it (including the
+        forming bar) unless they have their own file.
+
+        The clock is the server time. It only moves with `sleep`/`advance`, and each base bar becomes visible (and is
+        the current price) once the clock reaches its open time. Pending limit orders, stops and targets are filled by
+        walking the base bars the clock moves over, so a run is deterministic for the same data and the same calls.
+
+        Optional `<data_dir>/symbols.csv` (symbol, digits, contract_size) overrides the symbol specification, otherwise
+        the digits are guessed from the price level.
+
+        Args:
+            data_dir (str): Directory of the candle files
+            start_time (str, optional): Server time to start from, defaults to `warmup_days` after the first candle
+            balance (float): Initial account balance
+            company (str): Broker company name returned by account_info (selects the symbol set in Currencies)
+            commission_per_lot (float): Commission charged per lot for each deal
+            warmup_days (int): Days of history available before the default start time
+        """
+        super().__init__()
+        self.data_dir = data_dir
+        self.balance = balance
+        self.company = company
+        self.commission_per_lot = commission_per_lot
+        self.base:Dict[str, np.ndarray] = dict()
+        self.base_minutes:Dict[str, int] = dict()
+        self.files:Dict[Tuple[str, int], np.ndarray] = dict()
+        self.aggregated:Dict[Tuple[str, int], Dict[str, np.ndarray]] = dict()
+        self.specs:Dict[str, Tuple[int, float]] = dict()
+        self.positions:Dict[int, dict] = dict()
+        self.orders:Dict[int, dict] = dict()
+        self.deals:List[TradeDeal] = list()
+        self.next_ticket = 1
+        # Requests may come from parallel workers (CloseEngine, strategy workers)
+        self.lock = threading.RLock()
+        self._load()
+
+        if start_time:
+            self.clock = int(pd.Timestamp(start_time).tz_localize(None).value // 10**9)
+        elif self.base:
+            self.clock = min(int(rates["time"][0]) for rates in self.base.values()) + warmup_days * 86400
+        else:
+            self.clock = 0
+
+    def _load(self):
+        for file_path in glob(os.path.join(self.data_dir, "*_*.csv")):
+            name = os.path.basename(file_path)[:-4]
+            symbol, _, timeframe = name.rpartition("_")
+            if not timeframe.isdigit():
+                continue
+
+            data = pd.read_csv(file_path)
+            if not np.issubdtype(data["time"].dtype, np.number):
+                # Datetime strings are server time labelled as GMT, same as util.get_traded_time
+                data["time"] = pd.to_datetime(data["time"], utc=True).astype("int64") // 10**9
+
+            rates = np.zeros(len(data), dtype=rates_dtype)
+            for column in rates_dtype.names:
+                if column in data.columns:
+                    rates[column] = data[column].to_numpy()
+            self._add_series(symbol=symbol, timeframe=int(timeframe), rates=np.sort(rates, order="time"))
+
+        # Series of the candle store layout (<symbol>/<timeframe>/<column>.npy), see CandleStore
+        for time_path in glob(os.path.join(self.data_dir, "*", "*", "time.npy")):
+            series_dir = os.path.dirname(time_path)
+            symbol, timeframe = os.path.basename(os.path.dirname(series_dir)), os.path.basename(series_dir)
+            if not timeframe.isdigit() or (symbol, int(timeframe)) in self.files:
+                continue
+
+            times = np.load(time_path)
+            rates = np.zeros(len(times), dtype=rates_dtype)
+            for column in rates_dtype.names:
+                column_path = os.path.join(series_dir, f"{column}.npy")
+                if os.path.exists(column_path):
+                    rates[column] = np.load(column_path, mmap_mode="r")[:len(times)]
+            self._add_series(symbol=symbol, timeframe=int(timeframe), rates=rates)
+
+        specs_path = os.path.join(self.data_dir, "symbols.csv")
+        if os.path.exists(specs_path):
+            for _, row in pd.read_csv(specs_path).iterrows():
+                self.specs[row["symbol"]] = (int(row["digits"]), float(row["contract_size"]))
+
+    def _add_series(self, symbol:str, timeframe:int, rates:np.ndarray):
+        self.files[(symbol, timeframe)] = rates
+        if symbol not in self.base_minutes or timeframe < self.base_minutes[symbol]:
+            self.base_minutes[symbol] = timeframe
+            self.base[symbol] = rates
+
+    """
+    Market data
+    """
+    def _spec(self, symbol:str) -> Tuple[int, float]:
+        if symbol not in self.specs:
+            price = float(self.base[symbol]["close"][-1])
+            digits = 5 if price < 20 else 3 if price < 500 else 2
+            self.specs[symbol] = (digits, 100000.0 if digits in [3, 5] else 1.0)
+        return self.specs[symbol]
+
+    def _aggregate(self, symbol:str, minutes:int) -> Dict[str, np.ndarray]:
+        """
+        Bars of the timeframe built from the base bars, with the running values of the forming bar for each base bar
+        """
+        key = (symbol, minutes)
+        if key not in self.aggregated:
+            base = self.base[symbol]
+            bar_time = base["time"] - base["time"] % (minutes * 60)
+            starts = np.flatnonzero(np.concatenate(([True], bar_time[1:] != bar_time[:-1])))
+            group = np.cumsum(np.concatenate(([False], bar_time[1:] != bar_time[:-1])))
+            frame = pd.DataFrame({"group": group, "high": base["high"], "low": base["low"],
+                                  "tick_volume": base["tick_volume"].astype(np.int64), "real_volume": base["real_volume"].astype(np.int64)})
+            grouped = frame.groupby("group")
+            self.aggregated[key] = {"time": bar_time[starts], "open": base["open"][starts], "group": group,
+                                    "high": grouped["high"].cummax().to_numpy(), "low": grouped["low"].cummin().to_numpy(),
+                                    "tick_volume": grouped["tick_volume"].cumsum().to_numpy(),
+                                    "real_volume": grouped["real_volume"].cumsum().to_numpy(),
+                                    "ends": np.concatenate((starts[1:] - 1, [len(base) - 1]))}
+        return self.aggregated[key]
+
+    def _visible_rates(self, symbol:str, timeframe:int) -> np.ndarray:
+        """
+        All the bars of the timeframe up to the clock, the last one is the forming bar
+        """
+        minutes = self.timeframe_minutes.get(timeframe)
+        if symbol not in self.base or minutes is None or minutes < self.base_minutes[symbol]:
+            return None
+
+        base = self.base[symbol]
+        last = np.searchsorted(base["time"], self.clock, side="right") - 1
+        if last < 0:
+            return np.zeros(0, dtype=rates_dtype)
+
+        if (symbol, minutes) in self.files and minutes != self.base_minutes[symbol]:
+            # Own file of the timeframe, the forming bar is taken as it's stored
+            rates = self.files[(symbol, minutes)]
+            return rates[:np.searchsorted(rates["time"], self.clock, side="right")]
+
+        if minutes == self.base_minutes[symbol]:
+            return base[:last + 1]
+
+        bars = self._aggregate(symbol=symbol, minutes=minutes)
+        forming = bars["group"][last]
+        ends = bars["ends"][:forming + 1].copy()
+        ends[-1] = last
+        rates = np.zeros(forming + 1, dtype=rates_dtype)
+        rates["time"] = bars["time"][:forming + 1]
+        rates["open"] = bars["open"][:forming + 1]
+        rates["high"] = bars["high"][ends]
+        rates["low"] = bars["low"][ends]
+        rates["close"] = base["close"][ends]
+        rates["tick_volume"] = bars["tick_volume"][ends]
+        rates["spread"] = base["spread"][ends]
+        rates["real_volume"] = bars["real_volume"][ends]
+        return rates
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        rates = self._visible_rates(symbol=symbol, timeframe=timeframe)
+        if rates is None:
+            return None
+        end = len(rates) - start_pos
+        return rates[max(0, end - count):max(0, end)].copy()
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        rates = self._visible_rates(symbol=symbol, timeframe=timeframe)
+        if rates is None:
+            return None
+        start, end = int(date_from.timestamp()), int(date_to.timestamp())
+        return rates[(rates["time"] >= start) & (rates["time"] <= end)].copy()
+
+    def _bid_ask(self, symbol:str, index:int=None) -> Tuple[float, float]:
+        base = self.base[symbol]
+        index = np.searchsorted(base["time"], self.clock, side="right") - 1 if index is None else index
+        digits, _ = self._spec(symbol)
+        bid = round(float(base["close"][index]), digits)
+        ask = round(bid + int(base["spread"][index]) * 10 ** -digits, digits)
+        return bid, ask
+
+    def symbol_info_tick(self, symbol):
+        if symbol not in self.base:
+            return None
+        index = np.searchsorted(self.base[symbol]["time"], self.clock, side="right") - 1
+        if index < 0:
+            return None
+        bid, ask = self._bid_ask(symbol=symbol, index=index)
+        return Tick(time=self.clock, bid=bid, ask=ask, last=0.0, volume=0, time_msc=self.clock * 1000, flags=6, volume_real=0.0)
+
+    def symbol_info(self, symbol):
+        tick = self.symbol_info_tick(symbol)
+        if tick is None:
+            return None
+        digits, contract_size = self._spec(symbol)
+        return SymbolInfo(name=symbol, digits=digits, point=10 ** -digits, spread=int(round((tick.ask - tick.bid) * 10 ** digits)),
+                          trade_contract_size=contract_size, volume_min=0.01, volume_max=100.0, volume_step=0.01,
+                          bid=tick.bid, ask=tick.ask, price_change=0.0, session_open=0, session_close=0)
+
+    def symbol_select(self, symbol, enable=True):
+        return symbol in self.base
+
+    """
+    Account and trading
+    """
+    def _usd_rate(self, symbol:str) -> float:
+        """
+        Value in USD of one unit of the quote currency of the symbol
+        """
+        quote = symbol[3:6] if len(symbol) >= 6 and symbol[:6].isalpha() else "USD"
+        suffix = symbol[6:] if len(symbol) >= 6 else ""
+        if quote == "USD":
+            return 1.0
+        for pair, inverse in [(f"USD{quote}{suffix}", True), (f"{quote}USD{suffix}", False)]:
+            if pair in self.base:
+                bid, ask = self._bid_ask(symbol=pair)
+                mid = (bid + ask) / 2
+                return 1 / mid if inverse else mid
+        return 1.0
+
+    def _position_profit(self, position:dict, price:float) -> float:
+        _, contract_size = self._spec(position["symbol"])
+        direction = 1 if position["type"] == self.POSITION_TYPE_BUY else -1
+        points = (price - position["price_open"]) * direction
+        return round(points * position["volume"] * contract_size * self._usd_rate(position["symbol"]), 2)
+
+    def _exit_price(self, position:dict) -> float:
+        bid, ask = self._bid_ask(symbol=position["symbol"])
+        return bid if position["type"] == self.POSITION_TYPE_BUY else ask
+
+    def _ticket(self) -> int:
+        ticket = self.next_ticket
+        self.next_ticket += 1
+        return ticket
+
+    def _add_deal(self, order:int, deal_type:int, entry:int, position:dict, price:float, profit:float, comment:str):
+        commission = -round(self.commission_per_lot * position["volume"], 2)
+        self.balance += profit + commission
+        self.deals.append(TradeDeal(ticket=self._ticket(), order=order, time=self.clock, time_msc=self.clock * 1000, type=deal_type,
+                                    entry=entry, magic=position["magic"], position_id=position["ticket"], reason=3,
+                                    volume=position["volume"], price=price, commission=commission, swap=0.0, profit=profit,
+                                    fee=0.0, symbol=position["symbol"], comment=comment, external_id=""))
+
+    def _open_position(self, order:int, symbol:str, position_type:int, volume:float, price:float, sl:float, tp:float, magic:int, comment:str) -> dict:
+        position = {"ticket": order, "time": self.clock, "type": position_type, "magic": magic, "volume": volume,
+                    "price_open": price, "sl": sl, "tp": tp, "symbol": symbol, "comment": comment}
+        self.positions[order] = position
+        self._add_deal(order=order, deal_type=position_type, entry=self.DEAL_ENTRY_IN, position=position, price=price, profit=0.0, comment=comment)
+        return position
+
+    def _close_position(self, position:dict, price:float, comment:str) -> int:
+        order = self._ticket()
+        profit = self._position_profit(position=position, price=price)
+        deal_type = self.DEAL_TYPE_SELL if position["type"] == self.POSITION_TYPE_BUY else self.DEAL_TYPE_BUY
+        self._add_deal(order=order, deal_type=deal_type, entry=self.DEAL_ENTRY_OUT, position=position, price=price, profit=profit, comment=comment)
+        del self.positions[position["ticket"]]
+        return order
+
+    def _result(self, retcode:int, request:dict, comment:str, deal:int=0, order:int=0, price:float=0.0) -> OrderSendResult:
+        symbol = request.get("symbol")
+        bid, ask = self._bid_ask(symbol=symbol) if symbol in self.base else (0.0, 0.0)
+        return OrderSendResult(retcode=retcode, deal=deal, order=order, volume=request.get("volume", 0.0), price=price, bid=bid, ask=ask,
+                               comment=comment, request_id=0, retcode_external=0, request=request)
+
+    def order_send(self, request):
+        try:
+            with self.lock:
+                return self._order_send(request)
+        finally:
+            self.notify_state_change()
+
+    def _order_send(self, request):
+        action = request.get("action")
+        symbol = request.get("symbol")
+
+        if action == self.TRADE_ACTION_REMOVE:
+            if self.orders.pop(request.get("order"), None) is None:
+                return self._result(self.TRADE_RETCODE_INVALID, request, "Invalid request")
+            return self._result(self.TRADE_RETCODE_DONE, request, "Request executed", order=request.get("order"))
+
+        if action == self.TRADE_ACTION_SLTP:
+            position = self.positions.get(request.get("position"))
+            if position is None:
+                return self._result(self.TRADE_RETCODE_INVALID, request, "Invalid request")
+            sl, tp = request.get("sl", position["sl"]), request.get("tp", position["tp"])
+            if sl == position["sl"] and tp == position["tp"]:
+                return self._result(self.TRADE_RETCODE_NO_CHANGES, request, "No changes")
+            position["sl"], position["tp"] = sl, tp
+            return self._result(self.TRADE_RETCODE_DONE, request, "Request executed")
+
+        if symbol not in self.base or self.symbol_info_tick(symbol) is None:
+            return self._result(self.TRADE_RETCODE_PRICE_OFF, request, "Off quotes")
+
+        volume = request.get("volume", 0.0)
+        if volume is None or volume < 0.01:
+            return self._result(self.TRADE_RETCODE_INVALID_VOLUME, request, "Invalid volume")
+
+        bid, ask = self._bid_ask(symbol=symbol)
+        order_type = request.get("type")
+        comment = request.get("comment", "")
+
+        if action == self.TRADE_ACTION_DEAL:
+            if "position" in request:
+                position = self.positions.get(request["position"])
+                if position is None:
+                    return self._result(self.TRADE_RETCODE_INVALID, request, "Position doesn't exist")
+                price = self._exit_price(position=position)
+                order = self._close_position(position=position, price=price, comment=comment)
+                return self._result(self.TRADE_RETCODE_DONE, request, "Request executed", deal=self.deals[-1].ticket, order=order, price=price)
+
+            price = ask if order_type == self.ORDER_TYPE_BUY else bid
+            order = self._ticket()
+            self._open_position(order=order, symbol=symbol, position_type=order_type, volume=volume, price=price,
+                                sl=request.get("sl", 0.0), tp=request.get("tp", 0.0), magic=request.get("magic", 0), comment=comment)
+            return self._result(self.TRADE_RETCODE_DONE, request, "Request executed", deal=self.deals[-1].ticket, order=order, price=price)
+
+        if action == self.TRADE_ACTION_PENDING:
+            order = self._ticket()
+            self.orders[order] = {"ticket": order, "time_setup": self.clock, "type": order_type, "magic": request.get("magic", 0),
+                                  "volume": volume, "price_open": request.get("price", 0.0), "sl": request.get("sl", 0.0),
+                                  "tp": request.get("tp", 0.0), "symbol": symbol, "comment": comment}
+            # Limit orders placed beyond the market are filled straight away at the market price
+            self._fill_orders(symbol=symbol, low=bid, high=ask, market=True)
+            return self._result(self.TRADE_RETCODE_DONE, request, "Request executed", order=order, price=request.get("price", 0.0))
+
+        return self._result(self.TRADE_RETCODE_INVALID, request, "Invalid request")
+
+    def _fill_orders(self, symbol:str, low:float, high:float, market:bool=False):
+        """
+        Fills the pending orders of the symbol which are reached within the price range
+        """
+        bid, ask = self._bid_ask(symbol=symbol)
+        for order in [order for order in self.orders.values() if order["symbol"] == symbol]:
+            price = order["price_open"]
+            if order["type"] == self.ORDER_TYPE_BUY_LIMIT and low <= price:
+                fill_price, position_type = (ask if market else price), self.POSITION_TYPE_BUY
+            elif order["type"] == self.ORDER_TYPE_SELL_LIMIT and high >= price:
+                fill_price, position_type = (bid if market else price), self.POSITION_TYPE_SELL
+            elif order["type"] == self.ORDER_TYPE_BUY_STOP and high >= price:
+                fill_price, position_type = (ask if market else price), self.POSITION_TYPE_BUY
+            elif order["type"] == self.ORDER_TYPE_SELL_STOP and low <= price:
+                fill_price, position_type = (bid if market else price), self.POSITION_TYPE_SELL
+            else:
+                continue
+
+            del self.orders[order["ticket"]]
+            self._open_position(order=order["ticket"], symbol=symbol, position_type=position_type, volume=order["volume"],
+                                price=fill_price, sl=order["sl"], tp=order["tp"], magic=order["magic"], comment=order["comment"])
+
+    def _check_stops(self, symbol:str, low:float, high:float):
+        """
+        Closes the positions of the symbol whose stop or target is within the price range, the stop is checked first
+        """
+        for position in [position for position in self.positions.values() if position["symbol"] == symbol]:
+            sl, tp = position["sl"], position["tp"]
+            if position["type"] == self.POSITION_TYPE_BUY:
+                if sl and low <= sl:
+                    self._close_position(position=position, price=sl, comment=f"[sl {sl}]")
+                elif tp and high >= tp:
+                    self._close_position(position=position, price=tp, comment=f"[tp {tp}]")
+            else:
+                if sl and high >= sl:
+                    self._close_position(position=position, price=sl, comment=f"[sl {sl}]")
+                elif tp and low <= tp:
+                    self._close_position(position=position, price=tp, comment=f"[tp {tp}]")
+
+    def advance(self, seconds:float):
+        """
+        Moves the clock forward and processes the orders, stops and targets over the base bars in between.
+
+        Raises:
+            SimulationFinished: When the clock goes beyond the last stored candle
+        """
+        previous_clock = self.clock
+        self.clock += int(seconds)
+
+        for symbol, base in self.base.items():
+            begin = np.searchsorted(base["time"], previous_clock, side="right")
+            end = np.searchsorted(base["time"], self.clock, side="right")
+            if not (self.orders or self.positions):
+                continue
+            for index in range(begin, end):
+                low, high = float(base["low"][index]), float(base["high"][index])
+                self._fill_orders(symbol=symbol, low=low, high=high)
+                self._check_stops(symbol=symbol, low=low, high=high)
+
+        if self.base and all(self.clock > int(base["time"][-1]) for base in self.base.values()):
+            raise SimulationFinished(f"No candles after {datetime.fromtimestamp(self.clock, tz=timezone.utc)}")
+
+    def positions_get(self, **kwargs):
+        symbol, ticket = kwargs.get("symbol"), kwargs.get("ticket")
+        positions = []
+        for position in list(self.positions.values()):
+            if (symbol and position["symbol"] != symbol) or (ticket and position["ticket"] != ticket):
+                continue
+            price = self._exit_price(position=position)
+            positions.append(TradePosition(ticket=position["ticket"], time=position["time"], time_msc=position["time"] * 1000,
+                                           time_update=position["time"], time_update_msc=position["time"] * 1000, type=position["type"],
+                                           magic=position["magic"], identifier=position["ticket"], reason=3, volume=position["volume"],
+                                           price_open=position["price_open"], sl=position["sl"], tp=position["tp"], price_current=price,
+                                           swap=0.0, profit=self._position_profit(position=position, price=price), symbol=position["symbol"],
+                                           comment=position["comment"], external_id=""))
+        return tuple(positions)
+
+    def orders_get(self, **kwargs):
+        symbol = kwargs.get("symbol")
+        orders = []
+        for order in list(self.orders.values()):
+            if symbol and order["symbol"] != symbol:
+                continue
+            orders.append(TradeOrder(ticket=order["ticket"], time_setup=order["time_setup"], time_setup_msc=order["time_setup"] * 1000,
+                                     time_done=0, time_done_msc=0, time_expiration=0, type=order["type"], type_time=self.ORDER_TIME_GTC,
+                                     type_filling=self.ORDER_FILLING_RETURN, state=1, magic=order["magic"], position_id=0,
+                                     position_by_id=0, reason=3, volume_initial=order["volume"], volume_current=order["volume"],
+                                     price_open=order["price_open"], sl=order["sl"], tp=order["tp"], price_current=order["price_open"],
+                                     price_stoplimit=0.0, symbol=order["symbol"], comment=order["comment"], external_id=""))
+        return tuple(orders)
+
+    def history_deals_get(self, date_from, date_to, **kwargs):
+        start, end = int(date_from.timestamp()), int(date_to.timestamp())
+        return tuple(deal for deal in self.deals if start <= deal.time <= end)
+
+    def account_info(self):
+        profit = round(sum(position.profit for position in self.positions_get()), 2)
+        equity = round(self.balance + profit, 2)
+        return AccountInfo(login=1, trade_mode=0, leverage=100, limit_orders=200, margin_so_mode=0, trade_allowed=True,
+                           trade_expert=True, margin_mode=2, currency_digits=2, fifo_close=False, balance=round(self.balance, 2),
+                           credit=0.0, profit=profit, equity=equity, margin=0.0, margin_free=equity, margin_level=0.0,
+                           margin_so_call=50.0, margin_so_so=30.0, margin_initial=0.0, margin_maintenance=0.0, assets=0.0,
+                           liabilities=0.0, commission_blocked=0.0, name="Simulator", server="Simulator", currency="USD",
+                           company=self.company)
+
+    """
+    Clock
+    """
+    def initialize(self, *args, **kwargs) -> bool:
+        return True
+
+    def now(self, tz) -> datetime:
+        # The clock is server time, which is ahead of GMT by the server timezone
+        return datetime.fromtimestamp(self.clock - config.server_timezone * 3600, tz)
+
+    def sleep(self, seconds:float):
+        try:
+            self.advance(seconds=seconds)
+        finally:
+            self.notify_state_change()
+
+
+if __name__ == "__main__":
+    simulator = Simulator(data_dir=config.simulator_data_dir)
+    print(simulator.now(tz=None), list(simulator.base.keys()))
+    for symbol in simulator.base:
+        print(symbol, simulator.symbol_info_tick(symbol))
+        print(simulator.copy_rates_from_pos(symbol, simulator.TIMEFRAME_H1, 0, 3))
@@ -0,0 +1,140 @@
+from modules.meta.broker import mt5
+from modules.meta.AccountState import shared_state
+from modules.meta.SymbolRegistry import shared_symbols
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+from modules import config
+
+class StopModifier:
+    def __init__(self, min_ticks:int=config.sltp_min_ticks):
+        """
+        Sends the stop and target modifications of the open positions as a diff.
+
+        The new levels are given for the whole position table at once. They are compared with the live levels of the
+        position, and only the levels which moved by at least `min_ticks` ticks of the symbol are sent. The levels the
+        broker acknowledged are kept by ticket, and dropped once the live levels differ from them (e.g a stop removed or
+        edited outside of the modifier), so a stale level never hides a change. Unchanged levels never reach the broker, which
+        avoids the "No changes" and too-close rejections during fast markets.
+
+        Args:
+            min_ticks (int): Minimum move, in ticks of the symbol, for a level to be sent
+        """
+        self.min_ticks = min_ticks
+        self.acknowledged:Dict[int, Tuple[float, float]] = dict()
+        self.sent_requests = 0
+        self.skipped_levels = 0
+
+    def get_positions_table(self, positions=None) -> pd.DataFrame:
+        """
+        Open positions as a table, with the tick size and digits of each symbol
+
+        Args:
+            positions (optional): Positions as returned by mt5.positions_get, read from the account state when not given
+        """
+        if positions is None:
+            positions = shared_state.positions
+
+        columns = ["ticket", "symbol", "type", "volume", "price_open", "sl", "tp", "profit", "comment", "magic"]
+        table = pd.DataFrame([[getattr(position, column) for column in columns] for position in positions], columns=columns)
+
+        steps = [self.get_symbol_step(symbol=symbol) for symbol in table["symbol"]]
+        table["tick_size"] = [step for step, _ in steps]
+        table["digits"] = [digits for _, digits in steps]
+        return table
+
+    def get_symbol_step(self, symbol:str) -> Tuple[float, int]:
+        contract = shared_symbols.get(symbol=symbol)
+        return contract.tick_size, contract.digits
+
+    def get_changes(self, table:pd.DataFrame, sl:np.ndarray, tp:np.ndarray) -> pd.DataFrame:
+        """
+        Positions whose new stop or target moved by at least the minimum step from the live level
+
+        Args:
+            table (pd.DataFrame): Positions table (get_positions_table)
+            sl (np.ndarray): New stop of each position, in the table order
+            tp (np.ndarray): New target of each position, in the table order
+
+        Returns:
+            pd.DataFrame: The changed positions with the new levels in new_sl and new_tp
+        """
+        if table.empty:
+            return table.assign(new_sl=[], new_tp=[])
+
+        # The live levels are the reference, an acknowledged level which is no longer on the position is stale
+        for ticket, stop, target in zip(table["ticket"], table["sl"], table["tp"]):
+            if self.acknowledged.get(ticket, (stop, target)) != (stop, target):
+                del self.acknowledged[ticket]
+        current_sl = table["sl"].to_numpy(dtype=np.float64)
+        current_tp = table["tp"].to_numpy(dtype=np.float64)
+        min_step = table["tick_size"].to_numpy() * self.min_ticks
+
+        # Rounded to the digits of the symbol, as the broker stores them
+        factor = np.power(10.0, table["digits"].to_numpy())
+        new_sl = np.round(np.asarray(sl, dtype=np.float64) * factor) / factor
+        new_tp = np.round(np.asarray(tp, dtype=np.float64) * factor) / factor
+
+        # A level which is set or removed is always a change
+        sl_changed = (np.abs(new_sl - current_sl) >= min_step) | ((new_sl == 0) != (current_sl == 0))
+        tp_changed = (np.abs(new_tp - current_tp) >= min_step) | ((new_tp == 0) != (current_tp == 0))
+        changed = sl_changed | tp_changed
+
+        self.skipped_levels += int((~changed).sum())
+        # The level which did not move is sent as it's on the position
+        return table[changed].assign(new_sl=np.where(sl_changed, new_sl, current_sl)[changed],
+                                     new_tp=np.where(tp_changed, new_tp, current_tp)[changed])
+
+    def modify(self, table:pd.DataFrame, sl:np.ndarray, tp:np.ndarray, reference:str="Trailing STOP") -> pd.DataFrame:
+        """
+        Sends the changed stops and targets of the positions.
+
+        Args:
+            table (pd.DataFrame): Positions table (get_positions_table)
+            sl (np.ndarray): New stop of each position, in the table order
+            tp (np.ndarray): New target of each position, in the table order
+            reference (str): Name of the modification in the failure messages
+
+        Returns:
+            pd.DataFrame: The positions which were sent, with the retcode and comment of the broker
+        """
+        # Forget the closed positions
+        open_tickets = set(table["ticket"])
+        for ticket in [ticket for ticket in self.acknowledged if ticket not in open_tickets]:
+            del self.acknowledged[ticket]
+
+        changes = self.get_changes(table=table, sl=sl, tp=tp)
+        retcodes, comments = [], []
+        for row in changes.itertuples():
+            modify_request = {
+                "action": mt5.TRADE_ACTION_SLTP,
+                "symbol": row.symbol,
+                "volume": row.volume,
+                "type": row.type,
+                "position": row.ticket,
+                "sl": row.new_sl,
+                "tp": row.new_tp,
+                "comment": row.comment,
+                "magic": row.magic,
+                "type_time": mt5.ORDER_TIME_GTC,
+                "type_filling": mt5.ORDER_FILLING_FOK,
+                "ENUM_ORDER_STATE": mt5.ORDER_FILLING_RETURN,
+            }
+
+            result = mt5.order_send(modify_request)
+            self.sent_requests += 1
+            if result is None:
+                retcodes.append(None)
+                comments.append(None)
+                print(f"{reference} for " + row.symbol + " failed!!...Error: no result from the terminal")
+                continue
+
+            retcodes.append(result.retcode)
+            comments.append(result.comment)
+
+            if result.retcode == mt5.TRADE_RETCODE_DONE or result.comment == "No changes":
+                self.acknowledged[row.ticket] = (row.new_sl, row.new_tp)
+            else:
+                print(f"{reference} for " + row.symbol + " failed!!...Error: "+str(result.comment))
+
+        return changes.assign(retcode=retcodes, result=comments)
@@ -4,7 +4,7 @@ from modules.meta import util
 from modules.meta.Indicators import Indicators
 from typing import Dict, Tuple
 import pandas as pd
-import MetaTrader5 as mt5
+from modules.meta.broker import mt5
 import time
 
 class Strategies:
@@ -72,7 +72,7 @@ class Strategies:
         else:
             mt5.symbol_select(symbol, True)
             print(f"Waiting for the chart to update: {symbol}")
-            time.sleep(10)
+            mt5.sleep(10)
             return self.get_three_candle_strike(symbol=symbol, timeframe=timeframe, start_candle=start_candle, ignore_body=ignore_body)
     
     def fib_retracement_ref_previous_day(self, symbol:str, fib_level:str="78"):
@@ -385,7 +385,7 @@ class Strategies:
         else:
             mt5.symbol_select(symbol, True)
             print(f"Waiting for the chart to update: {symbol}")
-            time.sleep(10)
+            mt5.sleep(10)
             return self.get_three_candle_escape(symbol=symbol, timeframe=timeframe)
 
 
@@ -527,7 +527,7 @@ class Strategies:
         else:
             mt5.symbol_select(symbol, True)
             print(f"Waiting for the chart to update: {symbol}")
-            time.sleep(10)
+            mt5.sleep(10)
             return self.today_domination(symbol=symbol)
 
     def day_close_sma(self, symbol:str) -> Directions:
@@ -0,0 +1,218 @@
+from modules.common.Directions import Directions
+from modules.meta.Strategies import Strategies
+from modules.meta import util
+from modules import config
+from collections import namedtuple
+from typing import Callable, Dict, List, Tuple
+
+# Data prepared once per cycle for the strategies: trading and ATR timeframes, and the number of today's candles on the
+# trading, M5 and H1 timeframes
+StrategyData = namedtuple("StrategyData", ["timeframe", "atr_timeframe", "todays", "todays_m5", "todays_h1"])
+
+class StrategyDefinition:
+    def __init__(self, name:str, requires:Callable[[StrategyData], List[Tuple[int, int]]],
+                 evaluate:Callable[[Strategies, str, StrategyData], Tuple[Directions, str]],
+                 closed_bar_only:bool=False, bar_timeframe:Callable[[StrategyData], int]=None, market_direction:str=None):
+        """
+        Declaration of a strategy.
+
+        Args:
+            name (str): Strategy name as given on the command line (e.g PREV_DAY_CLOSE_DIR)
+            requires (Callable): (timeframe, depth) of the candle series the strategy reads, depth including the forming bar
+            evaluate (Callable): Direction (None without a signal) and entry comment of a symbol
+            closed_bar_only (bool): The signal only depends on the closed bars of `bar_timeframe`, so it doesn't change until the next bar
+            bar_timeframe (Callable): Timeframe whose closed bars the signal depends on, the trading timeframe by default
+            market_direction (str): BREAK/REVERSE the strategy trades with, instead of the configured market direction
+        """
+        self.name = name
+        self.requires = requires
+        self.evaluate = evaluate
+        self.closed_bar_only = closed_bar_only
+        self.bar_timeframe = bar_timeframe if bar_timeframe is not None else (lambda data: data.timeframe)
+        self.market_direction = market_direction
+
+
+definitions:Dict[str, StrategyDefinition] = dict()
+
+def register(name:str, requires:Callable, evaluate:Callable, closed_bar_only:bool=False, bar_timeframe:Callable=None, market_direction:str=None):
+    definitions[name] = StrategyDefinition(name=name, requires=requires, evaluate=evaluate, closed_bar_only=closed_bar_only,
+                                           bar_timeframe=bar_timeframe, market_direction=market_direction)
+
+# Most of the strategies check the H1 chart before taking the decision (is_chart_upto_date)
+def chart_check(data:StrategyData) -> Tuple[int, int]:
+    return 60, data.todays_h1
+
+def daily(data:StrategyData) -> int:
+    return 1440
+
+def single_symbol(strategies:Strategies, symbol:str, data:StrategyData) -> Tuple[Directions, str]:
+    print(f"{'Selected Symb'.ljust(20)}: {util.cl(symbol)}")
+    return strategies.previous_candle_close(symbol=symbol, timeframe=data.timeframe), "SINGLE_SYMBOL"
+
+register("3CDL_STR", requires=lambda data: [chart_check(data), (data.timeframe, 5)],
+         evaluate=lambda strategies, symbol, data: (strategies.get_three_candle_strike(symbol=symbol, timeframe=data.timeframe), "3CDL_STR"),
+         closed_bar_only=True)
+register("3CDL_REV", requires=lambda data: [(data.timeframe, data.todays + 1)],
+         evaluate=lambda strategies, symbol, data: (strategies.get_three_candle_reverse(symbol=symbol, timeframe=data.timeframe), "3CDL_REV"))
+register("4CDL_PULLBACK", requires=lambda data: [chart_check(data), (data.timeframe, 6)],
+         evaluate=lambda strategies, symbol, data: (strategies.get_four_candle_reversal(symbol=symbol, timeframe=data.timeframe), "4CDL_PULLBACK"))
+register("4CDL_PULLBACK_EXT", requires=lambda data: [chart_check(data), (data.timeframe, 6)],
+         evaluate=lambda strategies, symbol, data: (strategies.get_four_candle_reversal(symbol=symbol, timeframe=data.timeframe, extrame=True), "4CDL_PULLBACK_EXT"))
+register("DAILY_HL", requires=lambda data: [(data.timeframe, data.todays + 2)],
+         evaluate=lambda strategies, symbol, data: (strategies.daily_high_low_breakouts(symbol=symbol, timeframe=data.timeframe, min_gap=2), "DAILY_HL"))
+register("DAILY_HL_DOUBLE_HIT", requires=lambda data: [(data.timeframe, data.todays + 2)],
+         evaluate=lambda strategies, symbol, data: (strategies.daily_high_low_breakout_double_high_hit(symbol=symbol, timeframe=data.timeframe, min_gap=4), "DAILY_HL_DOUBLE_HIT"))
+register("WEEKLY_HL", requires=lambda data: [(data.timeframe, 8 * 6 + 1)],
+         evaluate=lambda strategies, symbol, data: (strategies.weekly_high_low_breakouts(symbol=symbol, timeframe=data.timeframe, min_gap=4), "WEEKLY_HL"))
+register("D_TOP_BOTTOM", requires=lambda data: [(data.timeframe, 7)],
+         evaluate=lambda strategies, symbol, data: (strategies.get_dtop_dbottom(symbol=symbol, timeframe=data.timeframe), "D_TOP_BOTTOM"))
+register("HEIKIN_ASHI", requires=lambda data: [(data.timeframe, data.todays)],
+         evaluate=lambda strategies, symbol, data: (strategies.get_heikin_ashi_reversal(symbol=symbol, timeframe=data.timeframe), "HEIKIN_ASHI"))
+register("HEIKIN_ASHI_PRE", requires=lambda data: [(data.timeframe, data.todays)],
+         evaluate=lambda strategies, symbol, data: (strategies.get_heikin_ashi_pre_entry(symbol=symbol, timeframe=data.timeframe), "HEIKIN_ASHI_PRE"))
+register("HEIKIN_ASHI_3CDL_REV", requires=lambda data: [(data.timeframe, data.todays + 1)],
+         evaluate=lambda strategies, symbol, data: (strategies.get_heikin_ashi_3_cdl_reversal(symbol=symbol, timeframe=data.timeframe, start=1), "HEIKIN_ASHI_3CDL_REV"),
+         closed_bar_only=True)
+register("U_REVERSAL", requires=lambda data: [chart_check(data), (data.timeframe, data.todays + 2)],
+         evaluate=lambda strategies, symbol, data: strategies.get_u_reversal(symbol=symbol, timeframe=data.timeframe))
+register("SINGLES", requires=lambda data: [(data.timeframe, 2)],
+         evaluate=lambda strategies, symbol, data: (strategies.strike_by_solid_candle(symbol=symbol, timeframe=data.timeframe), "SINGLES"))
+register("PREV_DAY_CLOSE_DIR", requires=lambda data: [chart_check(data), (1440, 2)],
+         evaluate=lambda strategies, symbol, data: (strategies.previous_day_close(symbol=symbol), "PREV_DAY_CLOSE_DIR"),
+         closed_bar_only=True, bar_timeframe=daily)
+register("3CDL_ESCAPE", requires=lambda data: [chart_check(data)],
+         evaluate=lambda strategies, symbol, data: (strategies.get_three_candle_escape(symbol=symbol), "3CDL_ESCAPE"),
+         market_direction=Directions.REVERSE.name)
+register("TODAY_DOMINATION", requires=lambda data: [chart_check(data), (1440, 1)],
+         evaluate=lambda strategies, symbol, data: (strategies.today_domination(symbol=symbol), "TODAY_DOMINATION"))
+register("PREV_DAY_CLOSE_DIR_MKT_DOMINATION", requires=lambda data: [],
+         evaluate=lambda strategies, symbol, data: (strategies.indicators.get_dominant_market_actual_direction(), "PREV_DAY_CLOSE_DIR_MKT_DOMINATION"))
+register("DAY_CLOSE_SMA", requires=lambda data: [chart_check(data), (1440, 20)],
+         evaluate=lambda strategies, symbol, data: (strategies.day_close_sma(symbol=symbol), "DAY_CLOSE_SMA"))
+register("PREV_DAY_CLOSE_DIR_PREV_HIGH_LOW", requires=lambda data: [chart_check(data), (1440, 2), (5, data.todays_m5 + 1)],
+         evaluate=lambda strategies, symbol, data: (strategies.previous_day_close_prev_high_low(symbol=symbol), "PREV_DAY_CLOSE_DIR_PREV_HIGH_LOW"))
+register("ATR_BASED_DIRECTION", requires=lambda data: [chart_check(data), (1440, 2), (5, data.todays_m5 + 1), (data.atr_timeframe, 14 + 3)],
+         evaluate=lambda strategies, symbol, data: (strategies.atr_referenced_previous_close_direction(symbol=symbol, entry_atr_timeframe=data.atr_timeframe), "ATR_BASED_DIRECTION"))
+register("PREV_DAY_CLOSE_DIR_ADVANCED", requires=lambda data: [chart_check(data), (1440, 3)],
+         evaluate=lambda strategies, symbol, data: (strategies.previous_day_close_advanced(symbol=symbol), "PREV_DAY_CLOSE_DIR_ADVANCED"),
+         closed_bar_only=True, bar_timeframe=daily)
+register("PREV_DAY_CLOSE_DIR_HEIKIN_ASHI", requires=lambda data: [chart_check(data), (1440, 10)],
+         evaluate=lambda strategies, symbol, data: (strategies.previous_day_close_heikin_ashi(symbol=symbol), "PREV_DAY_CLOSE_DIR_HEIKIN_ASHI"),
+         closed_bar_only=True, bar_timeframe=daily)
+register("SAME_DIRECTION_PREV_HEIKIN", requires=lambda data: [chart_check(data), (1440, 10)],
+         evaluate=lambda strategies, symbol, data: (strategies.same_prev_day_direction_with_heikin(symbol=symbol), "SAME_DIRECTION_PREV_HEIKIN"),
+         closed_bar_only=True, bar_timeframe=daily)
+register("4H_CLOSE_DIR", requires=lambda data: [(240, 2)],
+         evaluate=lambda strategies, symbol, data: (strategies.four_hour_close(symbol=symbol), "4H_CLOSE_DIR"),
+         closed_bar_only=True, bar_timeframe=lambda data: 240)
+register("PEAK_REVERSAL", requires=lambda data: [(data.timeframe, data.todays + 1)],
+         evaluate=lambda strategies, symbol, data: (strategies.get_peak_level_revesals(symbol=symbol, timeframe=data.timeframe), "PEAK_REVERSAL"))
+register("SINGLE_SYMBOL", requires=lambda data: [chart_check(data), (data.timeframe, 2)], evaluate=single_symbol,
+         closed_bar_only=True)
+
+
+class StrategyRegistry:
+    def __init__(self, strategies:Strategies, names:List[str]):
+        """
+        Strategies selected for the session, evaluated side by side on the same prepared data.
+
+        The candle series every strategy reads are declared with the strategy, so the loop prefetches exactly the union
+        of them once per cycle. A strategy which only depends on closed bars keeps its signal of a symbol until the next
+        bar of its timeframe, the following runs within the same bar (e.g a re-entry after a stop) don't evaluate it again.
+
+        Args:
+            strategies (Strategies): Strategy implementations
+            names (List[str]): Selected strategy names, in the order of priority (the first one with a signal is taken)
+        """
+        unknown = [name for name in names if name not in definitions]
+        if unknown:
+            raise Exception(f"Strategy << {', '.join(unknown)} >> is not defined!")
+
+        self.strategies = strategies
+        self.selected:List[StrategyDefinition] = [definitions[name] for name in names]
+        # (strategy, symbol) -> (bar, direction, comment) of the closed-bar strategies
+        self.closed_bar_signals:Dict[Tuple[str, str], Tuple[int, Directions, str]] = dict()
+        self.evaluations = 0
+        self.reused = 0
+
+    def prepare(self, timeframe:int, atr_timeframe:int) -> StrategyData:
+        wrapper = self.strategies.wrapper
+        return StrategyData(timeframe=timeframe, atr_timeframe=atr_timeframe, todays=wrapper.get_todays_candle_count(timeframe=timeframe),
+                            todays_m5=wrapper.get_todays_candle_count(timeframe=5), todays_h1=wrapper.get_todays_candle_count(timeframe=60))
+
+    def get_requirements(self, data:StrategyData) -> Dict[int, int]:
+        """
+        Maximum number of candles (including the forming bar) the selected strategies read per timeframe
+        """
+        requirements:Dict[int, int] = dict()
+        for definition in self.selected:
+            for timeframe, depth in definition.requires(data):
+                requirements[timeframe] = max(depth, requirements.get(timeframe, 0))
+        return requirements
+
+    def has_intrabar_strategies(self) -> bool:
+        """
+        Whether any selected strategy reads the forming bar (not closed-bar only), so it has to run between the bar closes
+        """
+        return any(not definition.closed_bar_only for definition in self.selected)
+
+    def get_market_direction(self) -> str:
+        """
+        Market direction required by the selected strategies, None when they trade with the configured one
+        """
+        for definition in self.selected:
+            if definition.market_direction:
+                return definition.market_direction
+        return None
+
+    def get_bar(self, timeframe:int) -> int:
+        """
+        Index of the running bar of the timeframe, on the server time
+        """
+        server_epoch = util.get_current_time().timestamp() + config.server_timezone * 3600
+        return int(server_epoch // (timeframe * 60))
+
+    def evaluate(self, definition:StrategyDefinition, symbol:str, data:StrategyData) -> Tuple[Directions, str]:
+        if not definition.closed_bar_only:
+            self.evaluations += 1
+            return definition.evaluate(self.strategies, symbol, data)
+
+        key = (definition.name, symbol)
+        bar = self.get_bar(timeframe=definition.bar_timeframe(data))
+        signal = self.closed_bar_signals.get(key)
+        if signal is not None and signal[0] == bar:
+            self.reused += 1
+            return signal[1], signal[2]
+
+        self.evaluations += 1
+        direction, comment = definition.evaluate(self.strategies, symbol, data)
+        # A missing signal could come from a chart which is not updated yet, only the signals are kept
+        if direction:
+            self.closed_bar_signals[key] = (bar, direction, comment)
+        return direction, comment
+
+    def get_signal(self, symbol:str, data:StrategyData, on_error:Callable[[str], None]=None) -> Tuple[Directions, str]:
+        """
+        Signal of the first selected strategy which has one for the symbol
+
+        Args:
+            symbol (str): Symbol to evaluate
+            data (StrategyData): Data of the cycle (prepare)
+            on_error (Callable): Called with the name of a strategy which failed, the next strategy is evaluated
+
+        Returns:
+            Tuple[Directions, str]: Trade direction (None without a signal) and comment of the entry
+        """
+        for definition in self.selected:
+            try:
+                direction, comment = self.evaluate(definition=definition, symbol=symbol, data=data)
+            except Exception:
+                if on_error is None:
+                    raise
+                on_error(definition.name)
+                continue
+
+            if direction:
+                return direction, comment
+
+        return None, self.selected[0].name
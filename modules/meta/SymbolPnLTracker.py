@@ -0,0 +1,105 @@
+import json
+import threading
+import pandas as pd
+from datetime import date
+from typing import Dict, List
+from modules.meta import util
+from modules.common.LogWriter import log_writer
+from modules import config
+
+class SymbolPnLTracker:
+    def __init__(self, state_path:str, ewma_alpha:float=config.symbol_pnl_ewma_alpha):
+        """
+        Running PnL averages of the symbols over the day, used by the adaptive re-entry (TradeTracker.symbol_historic_pnl).
+
+        Each symbol keeps the count and the sum of its PnL records (and an exponential average when ewma_alpha is
+        given), updated as the symbol PnL rows are recorded, so the mean of every symbol is read in O(symbols) instead of
+        grouping the whole symbol trade log again. The state is saved as a small JSON file of the day (one entry per
+        symbol), which is loaded at the start whatever the size of the log.
+
+        Args:
+            state_path (str): Path of the state file, with the {date} placeholder of the day
+            ewma_alpha (float, optional): Smoothing factor of the exponential average, None to use the plain mean
+        """
+        self.state_path = state_path
+        self.ewma_alpha = ewma_alpha
+        self.lock = threading.Lock()
+        self.day:date = None
+        self.stats:Dict[str, List[float]] = dict() # symbol -> [count, sum, ewma]
+        self.version = 0
+
+    def roll(self):
+        # The averages are daily, same as the symbol trade log
+        today = util.get_current_time().date()
+        if today != self.day:
+            self.day = today
+            self.stats = dict()
+            self.version += 1
+
+    def update(self, symbols:List[str], pnls:List[float], save:bool=True):
+        """
+        Adds the PnL records of the symbols (one record per symbol and cycle)
+        """
+        with self.lock:
+            self.roll()
+            for symbol, pnl in zip(symbols, pnls):
+                pnl = float(pnl)
+                stats = self.stats.get(symbol)
+                if stats is None:
+                    self.stats[symbol] = [1, pnl, pnl]
+                else:
+                    stats[0] += 1
+                    stats[1] += pnl
+                    # Without the smoothing factor, the exponential average is the mean
+                    stats[2] = stats[1] / stats[0] if self.ewma_alpha is None else self.ewma_alpha * pnl + (1 - self.ewma_alpha) * stats[2]
+            self.version += 1
+
+            if save:
+                self.save()
+
+    def save(self):
+        state = {"date": str(self.day), "ewma_alpha": self.ewma_alpha, "symbols": self.stats}
+        log_writer.write_snapshot(file_path=self.state_path, content=json.dumps(state))
+
+    def load(self, log_path:str=None):
+        """
+        Loads the state of the day, or rebuilds it from the symbol trade log of the day when there is no state yet
+        (e.g the log was written by an older session)
+
+        Args:
+            log_path (str, optional): Path of the symbol trade log, with the {date} placeholder of the day
+        """
+        with self.lock:
+            self.roll()
+            content = log_writer.read_snapshot(file_path=self.state_path)
+            if content:
+                state = json.loads(content)
+                if state["date"] == str(self.day) and state.get("ewma_alpha") == self.ewma_alpha:
+                    self.stats = {symbol: list(stats) for symbol, stats in state["symbols"].items()}
+                    self.version += 1
+                    return self
+
+        if log_path is not None:
+            df = log_writer.read_csv(file_path=log_path)
+            if df is not None and not df.empty:
+                self.update(symbols=df["Symbol"].tolist(), pnls=df["PnL"].tolist())
+        return self
+
+    def get_averages(self) -> pd.DataFrame:
+        """
+        Mean PnL (and the exponential average) of each symbol, ordered by symbol
+        """
+        with self.lock:
+            self.roll()
+            rows = [[symbol, round(total / count, 2), round(ewma, 2)] for symbol, (count, total, ewma) in sorted(self.stats.items())]
+        return pd.DataFrame(rows, columns=["Symbol", "PnL", "EWMA"])
+
+    def get_at_risk(self, threshold:float) -> List[str]:
+        """
+        Symbols which average PnL (the exponential average when enabled) is below -threshold
+        """
+        with self.lock:
+            self.roll()
+            if self.ewma_alpha is None:
+                return [symbol for symbol, (count, total, _) in sorted(self.stats.items()) if round(total / count, 2) < -threshold]
+            return [symbol for symbol, (_, _, ewma) in sorted(self.stats.items()) if round(ewma, 2) < -threshold]
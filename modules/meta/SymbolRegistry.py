@@ -0,0 +1,84 @@
+from modules.meta.broker import mt5
+import threading
+import numpy as np
+from collections import namedtuple
+from typing import Dict, List
+import modules.meta.Currencies as curr
+
+SymbolContract = namedtuple("SymbolContract", ["symbol", "digits", "point", "tick_size", "contract_size", "volume_min", "volume_max",
+                                               "volume_step", "volume_digits", "lot_multiplier", "is_currency"])
+
+class SymbolRegistry:
+    # Lots of the symbol in units of the dollar value (see Prices.get_dollar_value), on top of the contract size of the
+    # currency pairs. This change made of fundedEngineer account!
+    lot_multipliers:Dict[str, float] = {"ASX_raw": 10, "FTSE_raw": 10, "FTSE100": 10,
+                                        "SP_raw": 40, "SPX500": 40,
+                                        "HK50_raw": 100,
+                                        "NIKKEI_raw": 1000,
+                                        "XAUUSD": 4/100} # Some reason the amount is comes as 4 times. So divide by 4
+
+    def __init__(self):
+        """
+        Contract details of the traded symbols (digits, point, tick size, contract size, volume step and limits), read
+        from symbol_info once per session.
+
+        The lot sizing and the PnL of the positions read the multiplier and the rounding of a symbol as attributes of
+        its contract, instead of going through the symbol lists on every call. The array versions take a list of symbols
+        and return the values in the same order, for the vectorized calculations.
+        """
+        self.lock = threading.Lock()
+        self.contracts:Dict[str, SymbolContract] = dict()
+
+    def load(self, symbol:str) -> SymbolContract:
+        """
+        Contract of the symbol from symbol_info, with the usual values of a currency pair when the symbol is not available
+        (the contract is not kept in that case, so it's read again on the next lookup)
+        """
+        is_currency = symbol in curr.currencies
+        info = mt5.symbol_info(symbol)
+        if info is None:
+            digits, contract_size, volume_min, volume_max, volume_step = 5, 10**5, 0.01, 100.0, 0.01
+        else:
+            digits, contract_size = info.digits, info.trade_contract_size
+            volume_min, volume_max, volume_step = info.volume_min, info.volume_max, info.volume_step
+
+        point = 10**-digits if info is None else info.point
+        tick_size = getattr(info, "trade_tick_size", 0) or point
+        volume_digits = max(0, int(round(-np.log10(volume_step)))) if volume_step > 0 else 2
+
+        lot_multiplier = contract_size if is_currency else 1
+        lot_multiplier = lot_multiplier * self.lot_multipliers.get(symbol, 1)
+
+        contract = SymbolContract(symbol=symbol, digits=digits, point=point, tick_size=tick_size, contract_size=contract_size,
+                                  volume_min=volume_min, volume_max=volume_max, volume_step=volume_step, volume_digits=volume_digits,
+                                  lot_multiplier=lot_multiplier, is_currency=is_currency)
+        if info is not None:
+            with self.lock:
+                self.contracts[symbol] = contract
+        return contract
+
+    def get(self, symbol:str) -> SymbolContract:
+        contract = self.contracts.get(symbol)
+        return contract if contract is not None else self.load(symbol=symbol)
+
+    def get_lot_multipliers(self, symbols:List[str]) -> np.ndarray:
+        return np.array([self.get(symbol=symbol).lot_multiplier for symbol in symbols], dtype=np.float64)
+
+    def get_volume_digits(self, symbols:List[str]) -> np.ndarray:
+        return np.array([self.get(symbol=symbol).volume_digits for symbol in symbols], dtype=np.int64)
+
+    def get_points(self, symbol:str, price_distance:float) -> int:
+        """
+        Number of points (smallest price change) in the price distance, e.g a spread of 0.00015 on EURUSD is 15 points
+        """
+        contract = self.get(symbol=symbol)
+        return int(round(round(price_distance, contract.digits) / contract.point))
+
+
+# Single registry shared by the modules of the process
+shared_symbols = SymbolRegistry()
+
+
+if __name__ == "__main__":
+    for symbol in curr.get_symbols(symbol_selection="NON-PRIMARY"):
+        print(shared_symbols.get(symbol=symbol))
@@ -0,0 +1,110 @@
+from modules.meta.broker import mt5
+import time
+import numpy as np
+from typing import Dict, List, Tuple
+from modules import config
+
+class TickSnapshot:
+    def __init__(self, max_age:float=config.tick_max_age):
+        """
+        Bid/Ask table of the subscribed symbols, loaded with a single symbol_info_tick call per symbol.
+
+        All the price lookups of a cycle read from the same table, which gives a consistent view of the prices and
+        avoids calling the terminal for every ask and bid. A row is reloaded on lookup once it's older than `max_age`.
+
+        Args:
+            max_age (float): Maximum age of a row in seconds before it is reloaded from the terminal
+        """
+        self.max_age = max_age
+        self.symbol_index:Dict[str, int] = dict()
+        self.bid = np.zeros(0, dtype=np.float64)
+        self.ask = np.zeros(0, dtype=np.float64)
+        self.tick_time = np.zeros(0, dtype=np.int64) # Server time of the tick in milliseconds
+        self.loaded_at = np.zeros(0, dtype=np.float64) # Local monotonic time of the load
+        self.version = 0 # Incremented on every load, tells the readers of the table that the prices changed
+
+    def register(self, symbols:List[str]):
+        """
+        Adds the symbols to the table, the rows are marked as stale until they are loaded
+        """
+        new_symbols = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self.symbol_index]
+        if not new_symbols:
+            return
+
+        for symbol in new_symbols:
+            self.symbol_index[symbol] = len(self.symbol_index)
+
+        size = len(new_symbols)
+        self.bid = np.append(self.bid, np.full(size, np.nan))
+        self.ask = np.append(self.ask, np.full(size, np.nan))
+        self.tick_time = np.append(self.tick_time, np.zeros(size, dtype=np.int64))
+        self.loaded_at = np.append(self.loaded_at, np.full(size, -np.inf))
+
+    def _load(self, symbol:str, index:int) -> bool:
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is None:
+            return False
+
+        self.bid[index] = tick.bid
+        self.ask[index] = tick.ask
+        self.tick_time[index] = tick.time_msc
+        self.loaded_at[index] = time.monotonic()
+        self.version += 1
+        return True
+
+    def refresh(self, symbols:List[str]=None) -> int:
+        """
+        Loads the latest tick of every subscribed symbol (and the given symbols).
+
+        Args:
+            symbols (List[str], optional): Additional symbols to subscribe before the load.
+
+        Returns:
+            int: Number of symbols loaded
+        """
+        if symbols:
+            self.register(symbols=symbols)
+
+        loaded = 0
+        for symbol, index in self.symbol_index.items():
+            if self._load(symbol=symbol, index=index):
+                loaded += 1
+
+        return loaded
+
+    def _fresh_index(self, symbol:str) -> int:
+        if symbol not in self.symbol_index:
+            self.register(symbols=[symbol])
+
+        index = self.symbol_index[symbol]
+        if (time.monotonic() - self.loaded_at[index]) > self.max_age:
+            if not self._load(symbol=symbol, index=index):
+                raise Exception(f"Tick not available for {symbol}")
+
+        return index
+
+    def get_bid_ask(self, symbol:str) -> Tuple[float, float]:
+        """
+        Returns:
+            Tuple[float, float]: bid and ask price of the symbol
+        """
+        index = self._fresh_index(symbol=symbol)
+        return float(self.bid[index]), float(self.ask[index])
+
+    def get_bid_ask_arrays(self, symbols:List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Bid and ask prices for a list of symbols, in the same order as the symbols.
+        """
+        indexes = np.array([self._fresh_index(symbol=symbol) for symbol in symbols], dtype=np.int64)
+        return self.bid[indexes], self.ask[indexes]
+
+
+# Single table shared by the Prices and Wrapper objects of the process
+shared_ticks = TickSnapshot()
+
+
+if __name__ == "__main__":
+    import modules.meta.Currencies as curr
+    ticks = TickSnapshot()
+    print(ticks.refresh(symbols=curr.get_symbols(symbol_selection="PRIMARY")))
+    print(ticks.get_bid_ask(symbol="USDJPY"))
@@ -1,10 +1,13 @@
 from modules.meta.Account import Account
 from modules.meta import util
-from modules.common import files_util
+from modules.common.LogWriter import log_writer
+from modules.common.RollingWindow import RollingWindow
+from modules.meta.SymbolPnLTracker import SymbolPnLTracker
+from modules.meta.DailySummary import get_daily_summary
 import time
 import pandas as pd
+from datetime import datetime, timedelta
 from tabulate import tabulate
-from glob import glob
 
 class TradeTracker:
     def __init__(self):
@@ -12,28 +15,67 @@ class TradeTracker:
         self.account_id = self.account.get_account_id()
         self.account_name = self.account.get_account_name()
 
+        # End of day summary of the account, the log files of the previous sessions are added once
+        self.summary = get_daily_summary()
+        self.summary.sync(account_id=self.account_id, today=util.get_current_time().strftime('%Y-%m-%d'),
+                          trade_logs=f"PnLData/trade_logs/{self.account_id}_*.csv", pnl_trades=f"PnLData/pnl_trades/{self.account_id}.csv")
+
+        # RR of the last 5 minutes, fed by record_pnl_logs (see get_rr_change)
+        self.rr_window = RollingWindow(window=timedelta(minutes=5))
+        self.rr_window_date = None
+        self.load_rr_window()
+
+        # Running PnL averages of the symbols, fed by record_symbol_pnl_logs (see symbol_historic_pnl)
+        self.symbol_pnl = SymbolPnLTracker(state_path=f"PnLData/symbol_pnl_state/{self.account_id}_{{date}}.json")
+        self.symbol_pnl.load(log_path=f"PnLData/symbol_trade_logs/{self.account_id}_{{date}}.csv")
+        self.symbol_pnl_recorded = None # Version of the averages in the moving average log
+
+    def get_log_time(self) -> datetime:
+        """
+        Server time to the second, as written in the timestamps of the logs
+        """
+        return util.get_current_time().replace(microsecond=0, tzinfo=None)
+
+    def load_rr_window(self):
+        """
+        Fills the RR window (and the RR range of the day summary) from today's trade log, once at the start (e.g after
+        a restart of the session)
+        """
+        self.rr_window.clear()
+        self.rr_window_date = self.get_log_time().date()
+        df = log_writer.read_csv(file_path=f"PnLData/trade_logs/{self.account_id}_{{date}}.csv")
+        if df is not None and not df.empty:
+            current_date = self.rr_window_date.strftime('%Y-%m-%d')
+            for timestamp, rr in zip(pd.to_datetime(df["Timestamp"]), df["RR"]):
+                self.rr_window.push(time=timestamp.to_pydatetime(), value=rr)
+                self.summary.track_rr(account_id=self.account_id, date=current_date, rr=rr)
+
+    def roll_rr_window(self, current_time:datetime):
+        # The window only has the RR of the day, same as the daily trade log
+        if current_time.date() != self.rr_window_date:
+            self.rr_window.clear()
+            self.rr_window_date = current_time.date()
+
     def symbol_historic_pnl(self, each_position_risk_appertide)->list:
         """
         Calculate the historic profit and loss (PnL) for each symbol and identify symbols with a mean PnL below a specified risk appetite.
+        The mean PnL of each symbol is kept by a running aggregator (fed by record_symbol_pnl_logs), so the symbol
+        trade log is not read again, and the averages are only added to the moving average log when they changed.
         Args:
             each_position_risk_appertide (float): The risk appetite threshold for each position. Symbols with a mean PnL below the negative of this value will be flagged.
         Returns:
-            list: A list of symbols that have a mean PnL below the specified risk appetite threshold.
-        Raises:
-            FileNotFoundError: If the CSV file containing the PnL data does not exist.
-            pd.errors.EmptyDataError: If the CSV file is empty.
-            KeyError: If the required columns ("Symbol", "PnL") are not present in the CSV file.
+            list: A list of symbols that have a mean PnL (the exponential average when symbol_pnl_ewma_alpha is set) below the specified risk appetite threshold.
         """
-
-        current_date = util.get_current_time().strftime('%Y-%m-%d')
-        file_path = f"PnLData/symbol_trade_logs/{self.account_id}_{current_date}.csv"
-        if files_util.check_file_exists(file_path=file_path):
-            df = pd.read_csv(file_path)
-            df = df.groupby("Symbol")["PnL"].mean().round(2).reset_index(name="PnL")
-            df["risk_position"] = df["PnL"] < (- each_position_risk_appertide)
-            self.record_symbol_moving_average(pnl_df=df)
+        df = self.symbol_pnl.get_averages()
+        if not df.empty:
+            # The flags come from the same average as the returned symbols (the exponential average when enabled)
+            selected_symbols = self.symbol_pnl.get_at_risk(threshold=each_position_risk_appertide)
+            df = df[["Symbol", "PnL"] if self.symbol_pnl.ewma_alpha is None else ["Symbol", "PnL", "EWMA"]].copy()
+            df["risk_position"] = df["Symbol"].isin(selected_symbols)
+            if self.symbol_pnl_recorded != self.symbol_pnl.version:
+                self.record_symbol_moving_average(pnl_df=df)
+                self.symbol_pnl_recorded = self.symbol_pnl.version
             print(tabulate(df, headers='keys', tablefmt='pretty', showindex=False))
-            selected_symbols =  df[df["risk_position"]]["Symbol"].unique()
             return selected_symbols
 
         return []
@@ -46,29 +88,22 @@ class TradeTracker:
             max_account_risk (float): The maximum allowable position size.
         Returns:
             float: The calculated position size.
-        The function reads the account's trade data from a CSV file and adjusts the position size based on the 
+        The function reads the latest closes of the account from the daily summary and adjusts the position size based on the 
         performance of the last three trades. If there are fewer than three records, it returns a default position 
         size of 1.0. If the last three trades were losses, it decreases the position size by 0.1, but not below 1. 
         Otherwise, it increases the position size by 0.1, up to the maximum allowable position size.
         """
-        file_path = f"PnLData/pnl_trades/{self.account_id}.csv"
+        closes = self.summary.get_closes(account_id=self.account_id, limit=4)
 
         # If exists, means at least one trade has been made
-        if files_util.check_file_exists(file_path=file_path):
-            df = pd.read_csv(file_path)
-            last_acc_risk_perc = df.iloc[-1]["AccountRiskPerc"]
-            prev_day_pnl = df.iloc[-1]["Pnl"]
+        if closes:
+            last_acc_risk_perc = closes[0]["account_risk_perc"]
+            prev_day_pnl = closes[0]["pnl"]
 
-            # Check if the last 5 trades were losses
-            # if len(df) > 5:
-            #     # Reset the trade percentage
-            #     if all(df["Pnl"].tail(5) < 0):
-            #         return round(account_risk/2, 2)
-            
             # Check if the last 3 trades were losses
-            if len(df) > 3:
+            if len(closes) > 3:
                 # Reset the trade percentage
-                if all(df["Pnl"].tail(3) < 0):
+                if all(close["pnl"] < 0 for close in closes[:3]):
                     return round(max(0.5, account_risk/2), 2)
 
             if prev_day_pnl > 0:
@@ -85,16 +120,15 @@ class TradeTracker:
         Determine the market direction based on the account's recent trade performance.
         Returns:
             str: The market direction, which can be "BREAK" or "REVERSE".
-        The function reads the account's trade data from a CSV file and determines the market direction based on the
+        The function reads the latest close of the account from the daily summary and determines the market direction based on the
         performance of the last trade. If the last trade was profitable, it returns the previous market direction.  
         """
-        file_path = f"PnLData/pnl_trades/{self.account_id}.csv"
+        closes = self.summary.get_closes(account_id=self.account_id, limit=1)
 
         # If exists, means at least one trade has been made
-        if files_util.check_file_exists(file_path=file_path):
-            df = pd.read_csv(file_path)
-            previous_strategy = df.iloc[-1]["Strategy"]
-            prev_day_pnl = df.iloc[-1]["Pnl"]
+        if closes:
+            previous_strategy = closes[0]["direction"]
+            prev_day_pnl = closes[0]["pnl"]
 
             if prev_day_pnl > 0:
                 return previous_strategy
@@ -105,12 +139,11 @@ class TradeTracker:
     
 
     def is_win_yesterday(self):
-        file_path = f"PnLData/pnl_trades/{self.account_id}.csv"
+        closes = self.summary.get_closes(account_id=self.account_id, limit=1)
 
         # If exists, means at least one trade has been made
-        if files_util.check_file_exists(file_path=file_path):
-            df = pd.read_csv(file_path)
-            prev_day_pnl = df.iloc[-1]["Pnl"]
+        if closes:
+            prev_day_pnl = closes[0]["pnl"]
 
             if prev_day_pnl > 0:
                 return True
@@ -122,34 +155,21 @@ class TradeTracker:
 
     def get_dynamic_rr(self, num_records:int=5, default:float=2.0) -> float:
         """
-        Calculate the dynamic risk-reward ratio (RR) based on the most traded files.
+        Calculate the dynamic risk-reward ratio (RR) based on the most traded days.
 
-        This function reads the most recent CSV files from a specified directory, extracts the
-        risk-reward ratio (RR) values, and calculates the average of the maximum RR values from
-        each file. The RR values are converted to their absolute values before calculating the maximum.
+        This function reads the maximum absolute risk-reward ratio (RR) of the most recent days (before today) from the
+        daily summary, and calculates the average of those maximums (at least 1 for each day).
 
         Args:
-        num_records (int): The number of most recent files to consider. Default is 3.
+        num_records (int): The number of most recent days to consider. Default is 5.
 
         Returns:
-        float: The average of the maximum RR values from the most recent files, rounded to 2 decimal places.
+        float: The average of the maximum RR values from the most recent days minus 1, rounded to 2 decimal places.
         """
-        current_time = util.get_current_time()
-        current_date = current_time.strftime('%Y-%m-%d')
-        all_files = glob(f"PnLData/trade_logs/{self.account_id}_*.csv")
-        all_files = [file for file in all_files if current_date not in file]
-        if len(all_files) >= num_records:
-            all_files = sorted(all_files, reverse=True)[:num_records]
-            df_dict = {"date": [], "max_rr": []}
-            for file_name in all_files:
-                date = file_name.split("/")[-1].split("_")[-1].split(".")[0]
-                single_file = pd.read_csv(file_name)
-                single_file["RR"] = single_file["RR"].abs()
-                df_dict["date"].append(date)
-                max_rr = max(1, single_file["RR"].max())
-                df_dict["max_rr"].append(max_rr)
-
-            df = pd.DataFrame(df_dict)
+        current_date = util.get_current_time().strftime('%Y-%m-%d')
+        max_rrs = self.summary.get_max_abs_rrs(account_id=self.account_id, before=current_date, limit=num_records)
+        if len(max_rrs) >= num_records:
+            df = pd.DataFrame({"max_rr": [max(1, max_rr) for max_rr in max_rrs]})
             return max(default, round(df["max_rr"].mean() - 1, 2))
         
         return default
@@ -158,28 +178,20 @@ class TradeTracker:
     def get_rr_change(self) -> tuple:
         """
         Calculate the change in risk-reward (RR) over the last 5 minutes.
-        This method reads a CSV file containing trade logs for the current date,
-        filters the data to include only the last 5 minutes, and calculates the 
-        change in RR within that period.
+        The RR of the trade logs is kept in a rolling window (fed by record_pnl_logs, loaded from today's file at the
+        start), which tracks the maximum and the minimum of the last 5 minutes without reading the file again.
         Returns:
             tuple: A tuple containing:
                 - rr_change (float): The difference between the maximum and minimum RR values in the last 5 minutes.
                 - max_rr (float): The maximum RR value in the last 5 minutes.
                 - min_rr (float): The minimum RR value in the last 5 minutes.
         """
-        current_time = util.get_current_time()
-        current_date = current_time.strftime('%Y-%m-%d')
-        file_path = f"PnLData/trade_logs/{self.account_id}_{current_date}.csv"
-        if files_util.check_file_exists(file_path=file_path):
-            df = pd.read_csv(file_path)
-            df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-            df.set_index('Timestamp', inplace=True)
-            # Filter data for the last 5 minutes
-            current_time = pd.to_datetime(current_time.strftime('%Y-%m-%d %H:%M:%S'))
-            filtered_df = df.loc[current_time - pd.Timedelta(minutes=5):current_time]
-            if not filtered_df.empty:
-                rr_change = round(filtered_df['RR'].max() - filtered_df['RR'].min(), 2)
-                return rr_change, round(filtered_df['RR'].max(), 2), round(filtered_df['RR'].min(), 2)
+        current_time = self.get_log_time()
+        self.roll_rr_window(current_time=current_time)
+        max_rr, min_rr = self.rr_window.get_max_min(now=current_time)
+        if max_rr is not None:
+            rr_change = round(max_rr - min_rr, 2)
+            return rr_change, round(max_rr, 2), round(min_rr, 2)
         
         return 0, 0, 0
 
@@ -187,49 +199,39 @@ class TradeTracker:
     def record_pnl_logs(self, pnl, rr, rr_change):
         """
         Records profit and loss (PnL) logs along with risk-reward (RR) ratio to a CSV file.
-        This method creates a new CSV file for each day if it does not already exist, 
-        and appends the PnL and RR data with a timestamp to the file.
+        The line is queued on the log writer, which appends it to the file of the day (created with the header on the
+        first line of the day) in the background, the RR is pushed to the rolling window of get_rr_change.
         Args:
             pnl (float): The profit and loss value to be recorded.
             rr (float): The risk-reward ratio to be recorded.
         Returns:
             None
         """
-        current_date = util.get_current_time().strftime('%Y-%m-%d')
-        file_path = f"PnLData/trade_logs/{self.account_id}_{current_date}.csv"
-
-        if not files_util.check_file_exists(file_path=file_path):
-            with open(file_path, mode="w") as file:
-                file.write("Timestamp,AccountID,Pnl,RR,RRChange\n")
+        current_time = self.get_log_time()
+        self.roll_rr_window(current_time=current_time)
+        self.rr_window.push(time=current_time, value=round(rr, 2))
+        self.summary.track_rr(account_id=self.account_id, date=current_time.strftime('%Y-%m-%d'), rr=round(rr, 2))
 
-        with open(file_path, mode="a") as file:
-            file.write(f"{util.get_current_time().strftime('%Y-%m-%d %H:%M:%S')},{self.account_id},{round(pnl, 2)},{round(rr, 2)},{round(rr_change, 2)}\n")
+        log_writer.write(file_path=f"PnLData/trade_logs/{self.account_id}_{{date}}.csv", header="Timestamp,AccountID,Pnl,RR,RRChange",
+                         lines=[f"{current_time.strftime('%Y-%m-%d %H:%M:%S')},{self.account_id},{round(pnl, 2)},{round(rr, 2)},{round(rr_change, 2)}"])
     
     def record_symbol_moving_average(self, pnl_df:pd.DataFrame):
         """
         Records the moving average of symbols' profit and loss (PnL) to a CSV file.
         This function takes a DataFrame containing symbols and their respective PnL,
-        adds a timestamp, and appends the data to a CSV file named with the account ID
-        and the current date. If the file does not exist, it creates it and writes the
-        header.
+        adds a timestamp, and queues the rows for the CSV file named with the account ID
+        and the current date. The log writer creates the file with the header on the first
+        rows of the day.
         Args:
             pnl_df (pd.DataFrame): A DataFrame containing the columns "Symbol" and "PnL".
         Returns:
             None
         """
-        current_date = util.get_current_time().strftime('%Y-%m-%d')
-        file_path = f"PnLData/symbol_moving_avg/{self.account_id}_{current_date}.csv"
-
         # Only pick selected columns
         pnl_df = pnl_df[["Symbol", "PnL"]].copy()
-
-        if not files_util.check_file_exists(file_path=file_path):
-            with open(file_path, mode="w") as file:
-                file.write("Timestamp,Symbol,PnL\n")
-
         pnl_df["Timestamp"] = util.get_current_time().strftime('%Y-%m-%d %H:%M:%S')
         pnl_df = pnl_df[["Timestamp", "Symbol", "PnL"]]
-        pnl_df.to_csv(file_path, mode="a", header=False, index=False)
+        log_writer.write_df(file_path=f"PnLData/symbol_moving_avg/{self.account_id}_{{date}}.csv", df=pnl_df)
 
     def record_symbol_pnl_logs(self, pnl_df:pd.DataFrame):
         """
@@ -238,33 +240,27 @@ class TradeTracker:
         Args:
             pnl_df (pandas.DataFrame): A DataFrame containing the PnL data with columns "Symbol" and "PnL".
         
-        The function appends the PnL data to a CSV file named with the account ID and current date.
-        If the file does not exist, it creates the file and writes the header.
+        The rows are queued on the log writer for the CSV file named with the account ID and current date,
+        the file is created with the header on the first rows of the day. The PnL of each symbol is added to
+        the running averages of symbol_historic_pnl.
         The CSV file is stored in the "PnLData/symbol_trade_logs/" directory.
         """
-
-        current_date = util.get_current_time().strftime('%Y-%m-%d')
-        file_path = f"PnLData/symbol_trade_logs/{self.account_id}_{current_date}.csv"
-
-        if not files_util.check_file_exists(file_path=file_path):
-            with open(file_path, mode="w") as file:
-                file.write("Timestamp,Symbol,PnL,Mark\n")
-
         pnl_df["Timestamp"] = util.get_current_time().strftime('%Y-%m-%d %H:%M:%S')
         pnl_df.rename(columns={"symbol": "Symbol", "net_pnl":"PnL"}, inplace=True)
         pnl_df = pnl_df[["Timestamp", "Symbol", "PnL", "Mark"]]
-        pnl_df.to_csv(file_path, mode="a", header=False, index=False)
+        log_writer.write_df(file_path=f"PnLData/symbol_trade_logs/{self.account_id}_{{date}}.csv", df=pnl_df)
+        self.symbol_pnl.update(symbols=pnl_df["Symbol"].tolist(), pnls=pnl_df["PnL"].tolist())
 
     def daily_pnl_track(self, pnl, rr, strategy, market_direction, account_risk_percentage, each_position_risk_percentage, equity):
         current_date = util.get_current_time().strftime('%Y-%m-%d')
-        file_path = f"PnLData/pnl_trades/{self.account_id}.csv"
-
-        if not files_util.check_file_exists(file_path=file_path):
-            with open(file_path, mode="w") as file:
-                file.write("Date,AccountID,AccountName,System,Strategy,AccountRiskPerc,PositionRiskPerc,Pnl,RR,Equity\n")
-
-        with open(file_path, mode="a") as file:
-            file.write(f"{current_date},{self.account_id},{self.account_name},{strategy},{market_direction},{account_risk_percentage},{each_position_risk_percentage},{round(pnl, 2)},{round(rr, 2)},{round(equity)}\n")
+        # Written through to_csv, so a field with commas (e.g comma separated strategies) is quoted
+        pnl_df = pd.DataFrame([[current_date, self.account_id, self.account_name, strategy, market_direction, account_risk_percentage,
+                                each_position_risk_percentage, round(pnl, 2), round(rr, 2), round(equity)]],
+                              columns=["Date", "AccountID", "AccountName", "System", "Strategy", "AccountRiskPerc", "PositionRiskPerc", "Pnl", "RR", "Equity"])
+        log_writer.write_df(file_path=f"PnLData/pnl_trades/{self.account_id}.csv", df=pnl_df)
+        self.summary.close_day(account_id=self.account_id, date=current_date, pnl=round(pnl, 2), rr=round(rr, 2), equity=round(equity),
+                               account_risk_perc=account_risk_percentage, position_risk_perc=each_position_risk_percentage,
+                               system=strategy, direction=market_direction)
 
 if __name__ == "__main__":
     ref = TradeTracker()
@@ -0,0 +1,178 @@
+"""
+Broker backend selection.
+
+Every module talks to the broker through the `mt5` object of this module instead of importing MetaTrader5 directly:
+
+    from modules.meta.broker import mt5
+
+By default it's the MetaTrader5 terminal. Setting `broker_backend="SIMULATOR"` in modules/config.py (or the
+BROKER_BACKEND environment variable) replaces it with the local file driven simulator (modules/meta/Simulator.py),
+so the whole trading loop can be run and profiled without a terminal. The backend also owns the clock (now/sleep),
+which lets the simulator run faster than real time.
+"""
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from modules import config
+
+class BrokerBackend(ABC):
+    """
+    Calls used by the project, the MetaTrader5 module signatures and return types are the reference.
+    Constants (TIMEFRAME_*, ORDER_TYPE_*, TRADE_ACTION_*, TRADE_RETCODE_* etc.) are exposed as attributes.
+
+    The backends call `notify_state_change()` after each order_send and sleep, as the positions, orders and deals of
+    the account may have changed, the listeners (e.g the AccountState snapshot) are registered with `add_state_listener`.
+    """
+    def __init__(self):
+        self.state_listeners = list()
+
+    def add_state_listener(self, listener):
+        """
+        Registers a callable without arguments, called after each order_send and sleep of the backend
+        """
+        if listener not in self.state_listeners:
+            self.state_listeners.append(listener)
+
+    def notify_state_change(self):
+        for listener in self.state_listeners:
+            listener()
+
+    @abstractmethod
+    def initialize(self, *args, **kwargs) -> bool:
+        ...
+
+    @abstractmethod
+    def copy_rates_from_pos(self, symbol:str, timeframe:int, start_pos:int, count:int):
+        ...
+
+    @abstractmethod
+    def copy_rates_range(self, symbol:str, timeframe:int, date_from:datetime, date_to:datetime):
+        ...
+
+    @abstractmethod
+    def symbol_info_tick(self, symbol:str):
+        ...
+
+    @abstractmethod
+    def symbol_info(self, symbol:str):
+        ...
+
+    @abstractmethod
+    def symbol_select(self, symbol:str, enable:bool=True) -> bool:
+        ...
+
+    @abstractmethod
+    def positions_get(self, **kwargs):
+        ...
+
+    @abstractmethod
+    def orders_get(self, **kwargs):
+        ...
+
+    @abstractmethod
+    def history_deals_get(self, date_from:datetime, date_to:datetime, **kwargs):
+        ...
+
+    @abstractmethod
+    def order_send(self, request:dict):
+        ...
+
+    @abstractmethod
+    def account_info(self):
+        ...
+
+    @abstractmethod
+    def now(self, tz) -> datetime:
+        """
+        Current time in the given timezone
+        """
+
+    @abstractmethod
+    def sleep(self, seconds:float):
+        """
+        Wait for the given number of seconds
+        """
+
+
+class MetaTraderBackend(BrokerBackend):
+    """
+    MetaTrader5 terminal, every call and constant is forwarded to the MetaTrader5 package
+    """
+    def __init__(self):
+        import MetaTrader5
+        self.terminal = MetaTrader5
+        super().__init__()
+
+    def __getattr__(self, name):
+        return getattr(self.terminal, name)
+
+    def initialize(self, *args, **kwargs) -> bool:
+        return self.terminal.initialize(*args, **kwargs)
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        return self.terminal.copy_rates_from_pos(symbol, timeframe, start_pos, count)
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        return self.terminal.copy_rates_range(symbol, timeframe, date_from, date_to)
+
+    def symbol_info_tick(self, symbol):
+        return self.terminal.symbol_info_tick(symbol)
+
+    def symbol_info(self, symbol):
+        return self.terminal.symbol_info(symbol)
+
+    def symbol_select(self, symbol, enable=True):
+        return self.terminal.symbol_select(symbol, enable)
+
+    def positions_get(self, **kwargs):
+        return self.terminal.positions_get(**kwargs)
+
+    def orders_get(self, **kwargs):
+        return self.terminal.orders_get(**kwargs)
+
+    def history_deals_get(self, date_from, date_to, **kwargs):
+        return self.terminal.history_deals_get(date_from, date_to, **kwargs)
+
+    def order_send(self, request):
+        try:
+            return self.terminal.order_send(request)
+        finally:
+            self.notify_state_change()
+
+    def account_info(self):
+        return self.terminal.account_info()
+
+    def now(self, tz) -> datetime:
+        return datetime.now(tz)
+
+    def sleep(self, seconds:float):
+        try:
+            time.sleep(seconds)
+        finally:
+            self.notify_state_change()
+
+
+def get_backend() -> BrokerBackend:
+    """
+    Creates the backend selected by config.broker_backend, the BROKER_BACKEND environment variable takes the precedence.
+    """
+    backend_name = os.getenv("BROKER_BACKEND", config.broker_backend).upper()
+
+    if backend_name == "MT5":
+        backend = MetaTraderBackend()
+    elif backend_name == "SIMULATOR":
+        from modules.meta.Simulator import Simulator
+        backend = Simulator(data_dir=os.getenv("SIMULATOR_DATA_DIR", config.simulator_data_dir),
+                            start_time=os.getenv("SIMULATOR_START", config.simulator_start),
+                            balance=float(os.getenv("SIMULATOR_BALANCE", config.simulator_balance)),
+                            company=os.getenv("SIMULATOR_COMPANY", config.simulator_company))
+    else:
+        raise Exception(f"Broker backend << {backend_name} >> is not defined!")
+
+    backend.initialize()
+    return backend
+
+
+# Single backend shared by the process
+mt5 = get_backend()
@@ -1,11 +1,11 @@
 from datetime import datetime, timedelta,  time
 import pytz
 
-import MetaTrader5 as mt5
-mt5.initialize()
+from modules.meta.broker import mt5
 import modules.meta.Currencies as curr
 import modules.config as config
 from typing import Tuple
+import numpy as np
 import pandas as pd
 from termcolor import colored
 from colorama import init
@@ -123,6 +123,18 @@ def get_traded_time(epoch)-> datetime:
     normal_time = datetime.fromtimestamp(epoch, pytz.timezone('Etc/GMT'))
     return normal_time
 
+def get_traded_times(epochs:pd.Series) -> pd.Series:
+    """
+    Vectorized version of get_traded_time, converts a series of epoch timestamps in a single operation.
+
+    Args:
+        epochs (pd.Series): Epoch timestamps in seconds (e.g the "time" column of the candles)
+
+    Returns:
+        pd.Series: Timezone-aware datetimes in the 'Etc/GMT' timezone, with the same index as the input
+    """
+    return pd.to_datetime(epochs, unit="s", utc=True).dt.tz_convert('Etc/GMT')
+
 def get_account_name():
     info = mt5.account_info()
     balance = round(info.balance/1000)
@@ -132,7 +144,7 @@ def get_server_ip():
     return config.local_ip
 
 def get_us_time()-> datetime:
-    current_time =  datetime.now(pytz.timezone("US/Eastern"))
+    current_time =  mt5.now(pytz.timezone("US/Eastern"))
     return current_time
 
 def get_us_hour_min() -> Tuple[int, int]:
@@ -142,7 +154,7 @@ def get_us_hour_min() -> Tuple[int, int]:
     return hour, minute
 
 def get_current_time() -> datetime:
-    current_time =  datetime.now(pytz.timezone(f'Etc/GMT-{config.server_timezone}'))
+    current_time =  mt5.now(pytz.timezone(f'Etc/GMT-{config.server_timezone}'))
     return current_time
 
 def get_week_day() -> int:
@@ -153,9 +165,25 @@ def get_week_day() -> int:
     return week_day
 
 def get_current_gmt_time() -> datetime:
-    current_time =  datetime.now(pytz.timezone('Etc/GMT'))
+    current_time =  mt5.now(pytz.timezone('Etc/GMT'))
     return current_time
 
+def get_bar_open_epoch(timeframe:int) -> int:
+    """
+    Epoch (server time, same reference as the candle "time" column) at which the currently
+    forming bar of the given timeframe has opened. The server clock is derived from the GMT
+    time plus the configured server timezone offset, bars are aligned on the timeframe from midnight.
+
+    Args:
+        timeframe (int): Timeframe in minutes (e.g 5, 15, 60, 240, 1440)
+
+    Returns:
+        int: Open time of the current bar as epoch seconds
+    """
+    server_epoch = int(get_current_gmt_time().timestamp()) + config.server_timezone * 3600
+    bar_seconds = timeframe * 60
+    return server_epoch - (server_epoch % bar_seconds)
+
 def get_time_difference(epoch):
     traded_time = get_traded_time(epoch)
     traded_hour = traded_time.hour
@@ -183,16 +211,30 @@ def get_current_day_hour_min() -> Tuple[int, int, int]:
     minute = int(local_time.strftime('%M'))
     return day_of_week, hour, minute
 
-def curr_round(symbol, price):
+def get_round_factor(symbol) -> int:
+    """
+    Decimals of the prices of the symbol, 5 for the currencies, 3 for the JPY pairs and 2 otherwise (XAUUSD, indexes, crypto)
+    """
     round_factor = 5 if symbol in curr.currencies else 2
     round_factor = 2 if symbol == "XAUUSD" else round_factor
     round_factor = 3 if symbol in curr.jpy_currencies else round_factor
-    return round(price, round_factor)
+    return round_factor
+
+def curr_round(symbol, price):
+    return round(price, get_round_factor(symbol=symbol))
+
+def is_solid_candle(open, high, low, close, ratio:float=0.6):
+    """
+    True when the body of the candle is at least the ratio of its length (the ratio rounded to one decimal). The
+    prices can be single values or arrays of candles (one result per candle), a candle without length is not solid
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.round(np.abs(close - open) / (high - low), 1) >= ratio
 
 def get_today_profit():
     tm_zone = pytz.timezone('Etc/GMT-2')
-    start_time = datetime.combine(datetime.now(tm_zone).date(), time()).replace(tzinfo=tm_zone)
-    end_time = datetime.now(tm_zone) + timedelta(hours=4)
+    start_time = datetime.combine(mt5.now(tm_zone).date(), time()).replace(tzinfo=tm_zone)
+    end_time = mt5.now(tm_zone) + timedelta(hours=4)
     data = mt5.history_deals_get(start_time, end_time)
     output = round(sum([i.profit + i.commission for i in data]))
     return output
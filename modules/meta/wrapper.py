@@ -1,21 +1,162 @@
-import MetaTrader5 as mt5
+from modules.meta.broker import mt5
 from modules.meta import util
 import pandas as pd
 import pytz
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, time
 from modules import config
 from typing import Tuple
 from typing import Type
 import numpy as np
-from collections import deque
+from collections import deque, OrderedDict
 from typing import Dict
-mt5.initialize()
 import modules.meta.Currencies as curr
+from modules.meta.TickSnapshot import TickSnapshot, shared_ticks
+from modules.meta.AccountState import AccountState, shared_state
+from modules.meta.SymbolRegistry import shared_symbols
+from modules.meta.HeikinAshi import HeikinAshi
 from collections import namedtuple
 
 class Wrapper:
-    def __init__(self):
+    def __init__(self, candle_cache_size:int=config.candle_cache_size):
         self.average_spreads:Dict[str, list] = dict()
+        self.ticks:TickSnapshot = shared_ticks
+        self.state:AccountState = shared_state
+        self.heikin_ashi = HeikinAshi()
+        # Closed bars don't change until a new bar opens, so they are served from memory
+        self.candle_cache:OrderedDict = OrderedDict()
+        self.candle_cache_size = candle_cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # The strategies may read the candles from parallel workers (Main.strategy_workers)
+        self.cache_lock = threading.Lock()
+        # Candles loaded once per cycle, keyed by (symbol, timeframe)
+        self.prefetched_rates:Dict[Tuple[str, int], np.ndarray] = dict()
+        self.prefetched_bar_time:Dict[int, int] = dict()
+        # Today's candles of closed bars, keyed by (symbol, timeframe, start_candle)
+        self.todays_candles_memo:Dict[Tuple[str, int, int], Tuple[int, pd.DataFrame]] = dict()
+
+    def prefetch_candles(self, symbols:list, requirements:Dict[int, int], pool:ThreadPoolExecutor=None) -> int:
+        """
+        Loads the candles of every symbol for each required timeframe with a single terminal call per series.
+
+        Once loaded, any candle request (get_candle_i, get_last_n_candles, get_todays_candles etc.) which falls within the
+        loaded depth is served as a read only slice of the series, so the cost of a cycle depends on the number of distinct
+        series rather than the number of indicator calls. The snapshot is ignored for a timeframe once a new bar opens on it.
+
+        Args:
+            symbols (list): Symbols to load.
+            requirements (Dict[int, int]): Maximum number of candles (including the forming bar) needed per timeframe.
+            pool (ThreadPoolExecutor, optional): Workers to load the series in parallel, one after another when not given.
+
+        Returns:
+            int: Number of series loaded.
+        """
+        self.clear_prefetch()
+
+        series = []
+        for timeframe, depth in requirements.items():
+            if depth < 1:
+                continue
+
+            self.prefetched_bar_time[timeframe] = util.get_bar_open_epoch(timeframe=timeframe)
+            series.extend([(symbol, timeframe, depth) for symbol in symbols])
+
+        def load(symbol:str, timeframe:int, depth:int):
+            return mt5.copy_rates_from_pos(symbol, util.match_timeframe(timeframe), 0, depth)
+
+        if pool is None:
+            loaded = [load(*item) for item in series]
+        else:
+            loaded = list(pool.map(lambda item: load(*item), series))
+
+        for (symbol, timeframe, _), rates in zip(series, loaded):
+            if rates is not None and len(rates) > 0:
+                rates.flags.writeable = False
+                self.prefetched_rates[(symbol, timeframe)] = rates
+
+        return len(self.prefetched_rates)
+
+    def clear_prefetch(self):
+        """
+        Drops the candles loaded by prefetch_candles, further requests go back to the terminal (or candle cache)
+        """
+        self.prefetched_rates.clear()
+        self.prefetched_bar_time.clear()
+
+    def _prefetched_slice(self, symbol:str, timeframe:int, start_candle:int, n_candles:int):
+        series = self.prefetched_rates.get((symbol, timeframe))
+        if series is None or (start_candle + n_candles) > len(series):
+            return None
+
+        # New bar has been opened after the prefetch, so the positions are shifted
+        if self.prefetched_bar_time.get(timeframe) != util.get_bar_open_epoch(timeframe=timeframe):
+            return None
+
+        end = len(series) - start_candle
+        return series[end - n_candles:end]
+
+    def _copy_rates(self, symbol:str, timeframe:int, start_candle:int, n_candles:int):
+        """
+        Cached version of mt5.copy_rates_from_pos.
+
+        Candles loaded by prefetch_candles are served first. The cache is keyed by (symbol, timeframe, bar open time of the forming bar, start_candle, n_candles).
+        Requests which include the forming bar (start_candle=0) are always fetched from the terminal. Closed bars
+        (start_candle >= 1) are fetched once per bar, on a miss the forming bar is fetched along with them to make sure the
+        terminal has already opened the bar which the key is based on, otherwise the result is returned without caching it.
+
+        Least recently used entries are evicted once the cache reaches `candle_cache_size`.
+
+        Args:
+            symbol (str): The symbol for which to retrieve the candles.
+            timeframe (int): The timeframe in minutes.
+            start_candle (int): Position of the most recent candle, 0 is the forming bar.
+            n_candles (int): Number of candles to retrieve.
+
+        Returns:
+            np.ndarray: Read only structured array of the candles (oldest first), None if the terminal returns no data.
+        """
+        prefetched = self._prefetched_slice(symbol=symbol, timeframe=timeframe, start_candle=start_candle, n_candles=n_candles)
+        if prefetched is not None:
+            return prefetched
+
+        if start_candle < 1:
+            return mt5.copy_rates_from_pos(symbol, util.match_timeframe(timeframe), start_candle, n_candles)
+
+        bar_open_time = util.get_bar_open_epoch(timeframe=timeframe)
+        cache_key = (symbol, timeframe, bar_open_time, start_candle, n_candles)
+
+        with self.cache_lock:
+            if cache_key in self.candle_cache:
+                self.cache_hits += 1
+                self.candle_cache.move_to_end(cache_key)
+                return self.candle_cache[cache_key]
+            self.cache_misses += 1
+
+        rates = mt5.copy_rates_from_pos(symbol, util.match_timeframe(timeframe), 0, start_candle + n_candles)
+
+        if rates is None or len(rates) == 0:
+            return rates
+
+        forming_bar_time = rates[-1]["time"]
+        rates = rates[:-start_candle]
+        rates.flags.writeable = False
+
+        # The terminal is yet to open the new bar (or server clock drifted), so don't keep it
+        if forming_bar_time == bar_open_time:
+            with self.cache_lock:
+                self.candle_cache[cache_key] = rates
+                if len(self.candle_cache) > self.candle_cache_size:
+                    self.candle_cache.popitem(last=False)
+
+        return rates
+
+    def get_candle_cache_stats(self) -> Dict[str, int]:
+        """
+        Returns the candle cache counters, hits/misses are only counted on closed bar requests
+        """
+        return {"hits": self.cache_hits, "misses": self.cache_misses, "size": len(self.candle_cache)}
 
     def _avg_spread(self, symbol:str, spread:float):
         """
@@ -41,9 +182,9 @@ class Wrapper:
 
         This function calculates the current spread for a specified symbol and updates the
         rolling average spread. It then checks if the spread is within a reasonable range
-        based on predefined thresholds for different types of currency pairs. The function
-        considers JPY pairs and other currencies separately, applying specific rounding and
-        threshold rules.
+        based on predefined thresholds for different types of currency pairs. The spread is
+        counted in points of the symbol (by its digits, see SymbolRegistry), so the JPY pairs
+        and the other currencies share the same threshold rule.
 
         Args:
             symbol (str): The financial symbol (e.g., currency pair) to check the spread for.
@@ -54,15 +195,9 @@ class Wrapper:
         """
         spread = float(self.get_spread(symbol=symbol))
         self._avg_spread(symbol=symbol, spread=spread)
-        if symbol in curr.master_jpy_pairs:
-            spread = round(np.mean(self.average_spreads[symbol]), 3)
-            pips = int(str(f"{spread:.3f}").split(".")[-1])
-            if pips <= pips_threshold:
-                return True
-            
-        elif symbol in curr.master_currencies:
-            spread = round(np.mean(self.average_spreads[symbol]), 5)
-            pips = int(str(f"{spread:.5f}").split(".")[-1])
+        if symbol in curr.master_currencies:
+            # Points of the average spread, by the digits of the symbol (e.g 0.015 is 15 on the JPY pairs)
+            pips = shared_symbols.get_points(symbol=symbol, price_distance=np.mean(self.average_spreads[symbol]))
             if pips <= pips_threshold:
                 return True
         else:
@@ -139,7 +274,7 @@ class Wrapper:
         1  1618317180  1.17683  1.17690  1.17674  1.17676         168       0          0
         ...
         """
-        return pd.DataFrame(mt5.copy_rates_from_pos(symbol, util.match_timeframe(timeframe), start_candle, n_candles))
+        return pd.DataFrame(self._copy_rates(symbol=symbol, timeframe=timeframe, start_candle=start_candle, n_candles=n_candles), copy=True)
 
     
     def get_candles_by_time(self, symbol:str, timeframe:int,candle_start_hour:int=0, candle_end_hour:int=9):
@@ -186,8 +321,7 @@ class Wrapper:
 
 
     def get_spread(self, symbol:str) -> float:
-        ask_price = mt5.symbol_info_tick(symbol).ask
-        bid_price = mt5.symbol_info_tick(symbol).bid
+        bid_price, ask_price = self.ticks.get_bid_ask(symbol=symbol)
         spread = ask_price - bid_price
         return spread
 
@@ -219,6 +353,20 @@ class Wrapper:
         return most_recent_date
     
     
+    def get_todays_candle_count(self, timeframe:int) -> int:
+        """
+        Number of candles in 24 hours for the timeframes supported by get_todays_candles, 0 if not supported
+        """
+        if timeframe == 5:
+            return 3*4*24
+        elif timeframe == 15:
+            return 4*24
+        elif timeframe == 30:
+            return 2*24
+        elif timeframe == 60:
+            return 24
+        return 0
+
     def get_todays_candles(self, symbol:str, timeframe:int, start_candle:int) -> pd.DataFrame:
         """
         Retrieve today's candles for a given symbol and timeframe, up to the most recent candle.
@@ -231,31 +379,57 @@ class Wrapper:
         Returns:
             pd.DataFrame: DataFrame containing today's candles for the specified symbol and timeframe.
         """
-        if timeframe == 5:
-            n_candles = 3*4*24
-        elif timeframe == 15:
-            n_candles = 4*24
-        elif timeframe == 30:
-            n_candles = 2*24
-        elif timeframe == 60:
-            n_candles = 24
-        else:
+        n_candles = self.get_todays_candle_count(timeframe=timeframe)
+        if n_candles == 0:
             raise Exception("Timeframe based candles are not defined!")
-        
-        last_24_hour_candles = self.get_last_n_candles(symbol=symbol, timeframe=timeframe, start_candle=start_candle, n_candles=n_candles)
 
-        if not last_24_hour_candles.empty:
-            last_24_hour_candles["time"] = last_24_hour_candles["time"].apply(lambda x: util.get_traded_time(epoch=x))
-            last_24_hour_candles["date"] = last_24_hour_candles["time"].apply(lambda x: x.date())
+        # Closed bar based results only change when a new bar opens
+        bar_open_time = util.get_bar_open_epoch(timeframe=timeframe)
+        memo_key = (symbol, timeframe, start_candle)
+        if start_candle > 0 and memo_key in self.todays_candles_memo:
+            memo_bar_time, memo_candles = self.todays_candles_memo[memo_key]
+            if memo_bar_time == bar_open_time:
+                return memo_candles.copy()
 
-            most_recent_date = self.most_recent_date(symbol, timeframe)
+        # Single fetch from the forming bar, which also gives the most recent date
+        rates = self._copy_rates(symbol=symbol, timeframe=timeframe, start_candle=0, n_candles=n_candles + start_candle)
+        todays_candles = self.build_todays_candles(rates=rates, start_candle=start_candle)
+
+        if start_candle > 0 and rates is not None and len(rates) > 0 and rates[-1]["time"] == bar_open_time:
+            self.todays_candles_memo[memo_key] = (bar_open_time, todays_candles.copy())
+
+        return todays_candles
+
+    def build_todays_candles(self, rates:np.ndarray, start_candle:int) -> pd.DataFrame:
+        """
+        Builds today's candles out of the candles fetched from the forming bar.
+
+        The most recent date is taken from the last two candles (forming bar and the previous one), then the
+        `start_candle` most recent candles are dropped and the rest is filtered to the most recent date.
+
+        Args:
+            rates (np.ndarray): Candles from position 0 (oldest first), as returned by copy_rates_from_pos
+            start_candle (int): The index of the most recent candle to include.
+
+        Returns:
+            pd.DataFrame: Today's candles with "index", "time" (Etc/GMT datetime) and "date" columns, empty if there are no candles
+        """
+        if rates is None or len(rates) <= start_candle:
+            return pd.DataFrame()
 
-            todays_candles:pd.DataFrame = last_24_hour_candles[last_24_hour_candles["date"] == most_recent_date].copy()
-            todays_candles = todays_candles.reset_index(drop=True).reset_index()
+        candles = pd.DataFrame(rates, copy=True)
+        candles["time"] = util.get_traded_times(candles["time"])
+        candles["date"] = candles["time"].dt.date
 
-            return todays_candles
+        most_recent_date = candles["date"].iloc[-2:].max()
 
-        return pd.DataFrame()
+        if start_candle > 0:
+            candles = candles.iloc[:-start_candle]
+
+        todays_candles:pd.DataFrame = candles[candles["date"] == most_recent_date].copy()
+        todays_candles = todays_candles.reset_index(drop=True).reset_index()
+
+        return todays_candles
     
     def get_latest_bar_hour(self, symbol:str, timeframe:int):
         todays_bars = self.get_todays_candles(symbol=symbol, timeframe=timeframe, start_candle=0)
@@ -344,7 +518,7 @@ class Wrapper:
         >>> print(candle_data['close'])
         1.12345
         """
-        return mt5.copy_rates_from_pos(symbol, util.match_timeframe(timeframe), 1, 1)[-1]
+        return self._copy_rates(symbol=symbol, timeframe=timeframe, start_candle=1, n_candles=1)[-1]
     
 
     def get_candle_i(self, symbol, timeframe, i=0):
@@ -380,7 +554,7 @@ class Wrapper:
         >>> print(candle_data['close'])
         1.12345
         """
-        return mt5.copy_rates_from_pos(symbol, util.match_timeframe(timeframe), i, 1)[-1]
+        return self._copy_rates(symbol=symbol, timeframe=timeframe, start_candle=i, n_candles=1)[-1]
     
     
     def get_current_candle(self, symbol, timeframe):
@@ -389,7 +563,7 @@ class Wrapper:
         Object which contains time, open, close, high, low
         Can be accessed as dictioanry e.g obj["close"]
         """
-        return mt5.copy_rates_from_pos(symbol, util.match_timeframe(timeframe), 0, 1)[-1]
+        return self._copy_rates(symbol=symbol, timeframe=timeframe, start_candle=0, n_candles=1)[-1]
     
 
     def get_all_active_positions(self, raw:bool=False):
@@ -405,14 +579,9 @@ class Wrapper:
         Returns:
             list or pandas.DataFrame: A list of positions if `raw` is True, otherwise a pandas DataFrame containing the positions.
         """
-        positions = mt5.positions_get()
         if raw:
-            return list(positions)
-        else:
-            if len(positions) > 0:
-                return pd.DataFrame(list(positions),columns=positions[0]._asdict().keys())
-
-            return pd.DataFrame()
+            return list(self.state.positions)
+        return self.state.get_positions_df()
     
     
     def get_active_directional_pnl(self) -> Type[namedtuple]:
@@ -498,7 +667,7 @@ class Wrapper:
         live_symbols = []
         if today:
             today_date = util.get_current_time().strftime("%Y-%m-%d")
-            for i in mt5.positions_get():
+            for i in self.state.positions:
                 symbol = i.symbol
                 traded_date = util.get_traded_time(i.time).strftime("%Y-%m-%d")
                 if today_date == traded_date:
@@ -506,14 +675,14 @@ class Wrapper:
             
             return live_symbols
 
-        return list(set([i.symbol for i in mt5.positions_get()]))
+        return self.state.get_symbols()
     
 
     def get_existing_pending_orders(self, turtle=False) -> Tuple[list, list]:
         """
         List all the symbols which are in trade
         """
-        active_orders = mt5.orders_get()
+        active_orders = self.state.orders
 
         canceling_orders = []
         considered_active_orders = [] # So
@@ -550,58 +719,16 @@ class Wrapper:
 
     def get_todays_trades(self, us_market_seperator=False) -> pd.DataFrame:
         """
-        This include entry and exit position of a trade
+        This include entry and exit position of a trade, read from the account state of the cycle
         """
-
-        server_date = util.get_current_time()
-
-        # Generate off market hours high and lows
-        start_time = datetime(int(server_date.year), int(server_date.month), int(server_date.day), 
-                                hour=0, minute=0, tzinfo=pytz.timezone('Etc/GMT'))
-        
-        tm_zone = pytz.timezone('Etc/GMT')
-        end_time = datetime.now(tm_zone) + timedelta(hours=config.server_timezone)
-
-        position_deals = mt5.history_deals_get(start_time,  end_time)
-
-        if len(position_deals) > 0:
-            df = pd.DataFrame(position_deals, columns=position_deals[0]._asdict().keys())
-            # Eliminate the initial account balance
-            df = df[df["comment"] != "Initial account balance"]
-            return df
-        
-        # return empty dataframe
-        return pd.DataFrame()
+        return self.state.get_todays_deals()
     
     
     def get_pnls(self) -> pd.DataFrame:
         """
-        This include entry and exit position of a trade
+        Profit, commission and total by day of the last days (DealTracker.history_days), latest day first
         """
-
-        server_date = util.get_current_time()
-
-        # Generate off market hours high and lows
-        start_time = datetime(int(server_date.year), int(server_date.month), int(server_date.day), 
-                                hour=0, minute=0, tzinfo=pytz.timezone('Etc/GMT')) - timedelta(days=4)
-        
-        tm_zone = pytz.timezone('Etc/GMT')
-        end_time = datetime.now(tm_zone) + timedelta(hours=config.server_timezone)
-
-        position_deals = mt5.history_deals_get(start_time,  end_time)
-
-        if len(position_deals) > 0:
-            df = pd.DataFrame(position_deals, columns=position_deals[0]._asdict().keys())
-            df["time"] = df["time"].apply(lambda x: util.get_traded_time(x))
-            df["date"] = pd.to_datetime(df["time"]).dt.date
-            df = df.groupby(["date"]).agg({"profit":["sum"], "commission":["sum"]}).reset_index()
-            df.columns = ["date", "profit", "commission"]
-            df["total"] = df["profit"] + df["commission"]
-            df = df.sort_values("date", ascending=False)
-            return df
-        
-        # return empty dataframe
-        return pd.DataFrame()
+        return self.state.get_deals().get_daily_pnls()
     
 
     def get_traded_symbols(self):
@@ -630,13 +757,7 @@ class Wrapper:
         Trades which has exit with negative profit. Even it could be from previous days,
         Since our daily loss limit has to consider losses of today
         """
-        lost_positions = 0
-        today_trades = self.get_todays_trades()
-        if not today_trades.empty:
-            exit_positions = today_trades[today_trades["entry"]==1]
-            if not exit_positions.empty:
-                nagative_positions = exit_positions[exit_positions["profit"] < 0]
-                lost_positions = nagative_positions.shape[0]
+        lost_positions = self.state.get_deals().get_day_totals()["losses"]
 
         if (num_active_positions + lost_positions) < max_trades:
             return True
@@ -649,7 +770,7 @@ class Wrapper:
         Get number of active positions with risk (Not covered by break even stops)
         """
         positions_with_risk = 0
-        existing_positions = mt5.positions_get()
+        existing_positions = self.state.positions
         for position in existing_positions:
             stop_price = position.sl
             entry_price = position.price_open
@@ -670,16 +791,13 @@ class Wrapper:
         Dynamically change the max trades per day based on the risk free positions
         The risk free positions considered once after the stop moved to breake even or already exit positions with positive profit
         """
-        # Already traded positions
-        already_traded_today = 0
-        trades = self.get_todays_trades()
-        if not trades.empty:
-            # Number of positions based on the trades, Not on the symbols
-            already_traded_today = trades[trades["entry"]==0].shape[0]
+        # Already traded positions, based on the trades, Not on the symbols
+        todays_totals = self.state.get_deals().get_day_totals()
+        already_traded_today = todays_totals["entries"]
 
         # active positions
         positions_with_risk = 0
-        existing_positions = mt5.positions_get()
+        existing_positions = self.state.positions
         for position in existing_positions:
             symbol = position.symbol
             stop_price = position.sl
@@ -694,9 +812,7 @@ class Wrapper:
                     positions_with_risk += 1
         
         # Stopped Positions with negative
-        exit_positions = trades[trades["entry"]==1]
-        nagative_positions = exit_positions[exit_positions["profit"] < 0]
-        lost_positions = nagative_positions.shape[0]
+        lost_positions = todays_totals["losses"]
 
         total_positions_used = positions_with_risk + lost_positions
 
@@ -717,13 +833,7 @@ class Wrapper:
                 profits and losses from today's trades plus the sum of 
                 all commissions. If there are no trades today, returns 0.0.
         """
-        today_trades = self.get_todays_trades()
-        if not today_trades.empty:
-            total_pnl = sum(today_trades["profit"])
-            commision = sum(today_trades["commission"])
-            return total_pnl + commision
-
-        return 0.0
+        return float(self.state.get_deals().get_day_totals()["total"])
         
 
     def get_heikin_ashi(self, symbol:int, timeframe:int, start_candle:int=0, n_candles:int=10, is_today:bool=True):
@@ -767,26 +877,21 @@ class Wrapper:
         else:
             df = self.get_last_n_candles(symbol=symbol, timeframe=timeframe, start_candle=start_candle, n_candles=n_candles)
 
-        heikin_ashi_df = pd.DataFrame(index=df.index, columns=["time", "open", "high", "low", "close"])
-
-        # Copy the time column
-        heikin_ashi_df['time'] = df['time']
+        # The forming bar is not kept by the engine, since it's going to change
+        closed_bars = len(df) - 1 if start_candle == 0 else len(df)
+        return self.heikin_ashi.compute(candles=df, symbol=symbol, timeframe=timeframe, closed_bars=closed_bars)
 
-        # Calculate Heikin-Ashi values
-        heikin_ashi_df['close'] = round((df['open'] + df['high'] + df['low'] + df['close']) / 4, 5)
-        heikin_ashi_df['open'] = np.nan
-        heikin_ashi_df['high'] = np.nan
-        heikin_ashi_df['low'] = np.nan
+    def get_heikin_ashi_batch(self, symbols:list, timeframe:int, start_candle:int=0, n_candles:int=10, is_today:bool=True) -> Dict[str, pd.DataFrame]:
+        """
+        Heikin-Ashi candles for a list of symbols, see get_heikin_ashi.
 
-        for i in range(len(df)):
-            if i == 0:
-                heikin_ashi_df.at[i, 'open'] = round(df.at[i, 'open'], 5)
-            else:
-                heikin_ashi_df.at[i, 'open'] = round((heikin_ashi_df.at[i-1, 'open'] + heikin_ashi_df.at[i-1, 'close']) / 2, 5)
-            heikin_ashi_df.at[i, 'high'] = round(max(df.at[i, 'high'], heikin_ashi_df.at[i, 'open'], heikin_ashi_df.at[i, 'close']), 5)
-            heikin_ashi_df.at[i, 'low'] = round(min(df.at[i, 'low'], heikin_ashi_df.at[i, 'open'], heikin_ashi_df.at[i, 'close']), 5)
+        Only the bars which are new since the previous call are calculated for each symbol. When the candles are prefetched
+        (prefetch_candles) the whole batch is served without any further call to the terminal.
 
-        return heikin_ashi_df
+        Returns:
+            Dict[str, pd.DataFrame]: Heikin-Ashi candles by symbol
+        """
+        return {symbol: self.get_heikin_ashi(symbol=symbol, timeframe=timeframe, start_candle=start_candle, n_candles=n_candles, is_today=is_today) for symbol in symbols}
 
 
 
@@ -1,8 +1,10 @@
 from modules.meta.wrapper import Wrapper
 from modules.meta import util
+from modules.meta.CandleStore import CandleStore
 from tqdm import tqdm
 import modules.meta.Currencies as curr
 wrapper = Wrapper()
+store = CandleStore()
 for symbol in  tqdm(curr.master_currencies + curr.us_indexes):
     for timeframe in [5]:
         if timeframe >= 1440:
@@ -10,7 +12,10 @@ for symbol in  tqdm(curr.master_currencies + curr.us_indexes):
         else:
             n_candles = 700*4*10
 
-        actual_chart = wrapper.get_last_n_candles(symbol=symbol, timeframe=timeframe, n_candles=n_candles)
-        actual_chart["time"] = actual_chart["time"].apply(lambda x: util.get_traded_time(epoch=x))
+        # Only the bars since the last run are downloaded
+        store.update(wrapper=wrapper, symbol=symbol, timeframe=timeframe, max_candles=n_candles)
+
+        actual_chart = store.read_dataframe(symbol=symbol, timeframe=timeframe).tail(n_candles).reset_index(drop=True)
+        actual_chart["time"] = util.get_traded_times(epochs=actual_chart["time"])
         actual_chart["symbol"] = symbol
-        actual_chart.to_csv(f"notebooks/data/candles/{symbol}_{timeframe}.csv", index=False)
\ No newline at end of file
+        actual_chart.to_csv(f"notebooks/data/candles/{symbol}_{timeframe}.csv", index=False)
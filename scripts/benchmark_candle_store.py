@@ -0,0 +1,61 @@
+"""
+Load time of M5 candles from the CSV dumps (per-row get_traded_time, as download_candle_data.py used to write and
+read them) against the memory-mapped CandleStore, on synthetic candles so the terminal is not involved.
+
+Usage: python scripts/benchmark_candle_store.py [years]
+"""
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from modules.meta import util
+from modules.meta.CandleStore import CandleStore
+
+def synthetic_candles(n_candles:int, timeframe:int=5, start_epoch:int=1609459200) -> pd.DataFrame:
+    rng = np.random.default_rng(seed=7)
+    close = 1.08 + np.cumsum(rng.normal(0, 0.0002, n_candles))
+    open = np.concatenate(([1.08], close[:-1]))
+    return pd.DataFrame({"time": start_epoch + np.arange(n_candles) * timeframe * 60, "open": open,
+                         "high": np.maximum(open, close) + 0.0001, "low": np.minimum(open, close) - 0.0001,
+                         "close": close, "tick_volume": 100, "spread": 5, "real_volume": 0})
+
+if __name__ == "__main__":
+    years = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    n_candles = int(years * 260 * 288)
+    candles = synthetic_candles(n_candles=n_candles)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_path = os.path.join(temp_dir, "EURUSD_5.csv")
+        csv_candles = candles.copy()
+        csv_candles["time"] = util.get_traded_times(epochs=csv_candles["time"])
+        csv_candles.to_csv(csv_path, index=False)
+
+        store = CandleStore(root_dir=temp_dir)
+        start = time.perf_counter()
+        store.append(symbol="EURUSD", timeframe=5, candles=candles.iloc[:-288])
+        store.append(symbol="EURUSD", timeframe=5, candles=candles.tail(288))
+        write_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        from_csv = pd.read_csv(csv_path)
+        from_csv["time"] = from_csv["time"].apply(lambda x: pd.Timestamp(x))
+        csv_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        from_store = store.read(symbol="EURUSD", timeframe=5)
+        mmap_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.read_dataframe(symbol="EURUSD", timeframe=5)
+        dataframe_time = time.perf_counter() - start
+
+        assert np.array_equal(np.asarray(from_store["close"]), candles["close"].to_numpy())
+        assert np.array_equal(np.asarray(from_store["time"]), candles["time"].to_numpy())
+
+    print(f"{'Candles'.ljust(20)}: {n_candles} (M5, {years} years)")
+    print(f"{'Store write'.ljust(20)}: {round(write_time * 1000, 3)} ms")
+    print(f"{'CSV load'.ljust(20)}: {round(csv_time * 1000, 3)} ms")
+    print(f"{'Store mmap'.ljust(20)}: {round(mmap_time * 1000, 3)} ms")
+    print(f"{'Store DataFrame'.ljust(20)}: {round(dataframe_time * 1000, 3)} ms")
@@ -0,0 +1,179 @@
+"""
+Benchmark of the Main.main trading cycle against the simulated broker (modules/meta/Simulator.py).
+
+Runs a number of cycles for each symbol list and reports the wall time per cycle and per stage (p50/p90/p99) with the
+number of broker calls per stage. The results are appended to data/benchmarks/main_cycle.csv with the git commit,
+and compared with the previous run of the same configuration so the regressions show up after a change.
+
+The cycles run in a temporary working directory, so the PnL and trade logs they write don't mix with the live ones.
+The simulator data directory (SIMULATOR_DATA_DIR or config.simulator_data_dir) needs the candles of the benchmarked
+symbols (and the conversion pairs), e.g a CandleStore directory filled by notebooks/scripts/download_candle_data.py.
+
+Usage: python scripts/benchmark_main_cycle.py [--cycles 50] [--selections FOREX:PRIMARY,FOREX:NON-PRIMARY,STOCK:PRIMARY]
+"""
+import os
+os.environ.setdefault("BROKER_BACKEND", "SIMULATOR")
+
+import shutil
+import argparse
+import subprocess
+import tempfile
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List
+from tabulate import tabulate
+from modules.meta.broker import mt5
+from modules.common.Profiler import Profiler
+from modules.common import files_util
+from modules.common.LogWriter import log_writer
+import modules.meta.Currencies as curr
+from main import Main
+
+results_path = os.path.abspath("data/benchmarks/main_cycle.csv")
+# Directories the trading cycle writes to (TradeTracker, DelayedEntry, files_util)
+working_directories = ["data", "PnLData/pnl_trades", "PnLData/price_tracker", "PnLData/price_tracker_history", "PnLData/trade_logs",
+                       "PnLData/symbol_moving_avg", "PnLData/symbol_trade_logs"]
+
+class BenchmarkFinished(Exception):
+    pass
+
+def main_arguments(security:str, symbol_selection:str, strategy:str, timeframe:int, strategy_workers:int=1) -> dict:
+    # Same as FRX_DAILY_PREV_CDL_DIRECTION.bat
+    return dict(security=security, trading_timeframe=timeframe, account_risk=1.0, max_account_risk=1.3, each_position_risk=0.1,
+                target_ratio=5.0, trades_per_day=100, num_prev_cdl_for_stop=2, enable_trail_stop=False, enable_breakeven=False,
+                enable_neutralizer=False, max_loss_exit=True, max_target_exit=True, start_hour=1, start_minute=2,
+                enable_dynamic_direction=False, market_direction="BREAK", strategy=strategy, multiple_positions="by_active_single_direction",
+                record_pnl=True, close_by_time=False, close_by_solid_cdl=False, primary_symbols=symbol_selection,
+                primary_stop_selection="FACTOR", secondary_stop_selection="ATR15M", enable_sec_stop_selection=False,
+                max_trades_on_same_direction=100, account_target_ratio=2.0, entry_with_st_tgt=False, stop_expected_move=0.05,
+                account_trail_enabler=False, adaptive_reentry=False, adaptive_tolerance=0.75, atr_check_timeframe=60,
+                enable_delayed_entry=False, enable_double_entry=False, strategy_workers=strategy_workers)
+
+def run_cycles(profiler:Profiler, cycles:int, **kwargs) -> List[Dict[str, Dict[str, float]]]:
+    """
+    Runs Main.main until the given number of cycles are recorded, the scheduler sleep after the last cycle stops the run
+    """
+    profiler.reset()
+    start_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix="benchmark_")
+    for directory in working_directories:
+        files_util.create_directory_if_not_exists(os.path.join(work_dir, directory))
+    os.chdir(work_dir)
+
+    win = Main(**kwargs)
+    win.profiler = profiler
+
+    backend_sleep = mt5.sleep
+    def sleep(seconds:float):
+        backend_sleep(seconds)
+        if len(profiler.cycles) >= cycles:
+            raise BenchmarkFinished()
+
+    mt5.sleep = sleep
+    try:
+        win.main()
+    except BenchmarkFinished:
+        pass
+    finally:
+        mt5.sleep = backend_sleep
+        # Queued CSV logs are written before the working directory is removed
+        log_writer.flush()
+        os.chdir(start_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return list(profiler.cycles)
+
+def summarize(cycles:List[Dict[str, Dict[str, float]]]) -> pd.DataFrame:
+    stages = []
+    for cycle in cycles:
+        for stage in cycle:
+            if stage is not None and stage not in stages:
+                stages.append(stage)
+
+    rows = []
+    for stage in stages:
+        times = np.array([cycle.get(stage, {"time": 0.0})["time"] for cycle in cycles]) * 1000
+        calls = np.array([cycle.get(stage, {"calls": 0})["calls"] for cycle in cycles])
+        rows.append({"stage": stage, "p50_ms": round(np.percentile(times, 50), 3), "p90_ms": round(np.percentile(times, 90), 3),
+                     "p99_ms": round(np.percentile(times, 99), 3), "mean_calls": round(calls.mean(), 1)})
+    return pd.DataFrame(rows)
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return "unknown"
+
+def compare_with_previous(summary:pd.DataFrame, configuration:str, tolerance:float=0.2) -> pd.DataFrame:
+    """
+    Adds the p50 and calls of the previous run of the configuration, flags the stages which are slower than the tolerance
+    or have more broker calls
+    """
+    summary = summary.copy()
+    summary["prev_p50_ms"] = np.nan
+    summary["prev_calls"] = np.nan
+    summary["regression"] = ""
+    if not files_util.check_file_exists(results_path):
+        return summary
+
+    history = pd.read_csv(results_path)
+    history = history[history["configuration"] == configuration]
+    if history.empty:
+        return summary
+
+    previous = history[history["run_at"] == history["run_at"].max()].set_index("stage")
+    for index, row in summary.iterrows():
+        if row["stage"] in previous.index:
+            prev_p50, prev_calls = previous.loc[row["stage"], "p50_ms"], previous.loc[row["stage"], "mean_calls"]
+            summary.loc[index, "prev_p50_ms"] = prev_p50
+            summary.loc[index, "prev_calls"] = prev_calls
+            if row["p50_ms"] > prev_p50 * (1 + tolerance) and row["p50_ms"] - prev_p50 > 1:
+                summary.loc[index, "regression"] = "SLOWER"
+            if row["mean_calls"] > prev_calls:
+                summary.loc[index, "regression"] = (summary.loc[index, "regression"] + " MORE CALLS").strip()
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Main cycle benchmark')
+    parser.add_argument('--cycles', type=int, default=50, help='Number of cycles per symbol list')
+    parser.add_argument('--selections', type=str, default="FOREX:PRIMARY,FOREX:NON-PRIMARY,STOCK:PRIMARY", help='Comma separated SECURITY:SELECTION')
+    parser.add_argument('--strategy', type=str, default="PREV_DAY_CLOSE_DIR", help='Strategy of the cycle')
+    parser.add_argument('--timeframe', type=int, default=15, help='Trading timeframe')
+    parser.add_argument('--strategy_workers', type=int, default=1, help='Number of symbols evaluated in parallel')
+    parser.add_argument('--no_store', action='store_true', help='Do not append the results')
+    args = parser.parse_args()
+
+    profiler = Profiler(enabled=True)
+    profiler.instrument(mt5)
+    run_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    commit = git_commit()
+    stored = []
+
+    for selection in args.selections.split(","):
+        security, symbol_selection = selection.split(":")
+        symbols = curr.get_symbols(security=security, symbol_selection=symbol_selection)
+        configuration = f"{args.strategy}|{args.timeframe}|{security}|{symbol_selection}|{args.strategy_workers}"
+
+        cycles = run_cycles(profiler=profiler, cycles=args.cycles,
+                            **main_arguments(security=security, symbol_selection=symbol_selection, strategy=args.strategy, timeframe=args.timeframe,
+                                             strategy_workers=args.strategy_workers))
+        summary = summarize(cycles=cycles)
+        report = compare_with_previous(summary=summary, configuration=configuration)
+
+        print(f"\n{'Configuration'.ljust(20)}: {configuration}")
+        print(f"{'Symbols'.ljust(20)}: {len(symbols)}")
+        print(f"{'Cycles'.ljust(20)}: {len(cycles)}")
+        print(tabulate(report, headers="keys", tablefmt="simple", showindex=False))
+
+        summary.insert(0, "configuration", configuration)
+        summary.insert(0, "n_symbols", len(symbols))
+        summary.insert(0, "commit", commit)
+        summary.insert(0, "run_at", run_at)
+        stored.append(summary)
+
+    if not args.no_store and stored:
+        files_util.create_directory_if_not_exists(os.path.dirname(results_path))
+        results = pd.concat(stored, ignore_index=True)
+        results.to_csv(results_path, mode="a", header=not files_util.check_file_exists(results_path), index=False)
+        print(f"\nStored: {results_path}")
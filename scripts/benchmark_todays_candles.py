@@ -0,0 +1,60 @@
+"""
+Micro-benchmark of Wrapper.get_todays_candles on a 288 bar M5 day.
+
+Compares the previous per-row conversion (get_traded_time/date applies plus a second fetch for the most
+recent date) against the vectorized single fetch builder, on synthetic candles so the terminal is not involved.
+
+Usage: python scripts/benchmark_todays_candles.py [repeat]
+"""
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+from modules.meta import util
+from modules.meta.wrapper import Wrapper
+
+rates_dtype = [("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+               ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8")]
+
+def synthetic_rates(n_candles:int, timeframe:int=5, start_epoch:int=1718064000) -> np.ndarray:
+    rng = np.random.default_rng(seed=7)
+    close = 1.08 + np.cumsum(rng.normal(0, 0.0002, n_candles))
+    open = np.concatenate(([1.08], close[:-1]))
+    rates = np.zeros(n_candles, dtype=rates_dtype)
+    rates["time"] = start_epoch + np.arange(n_candles) * timeframe * 60
+    rates["open"] = open
+    rates["close"] = close
+    rates["high"] = np.maximum(open, close) + 0.0001
+    rates["low"] = np.minimum(open, close) - 0.0001
+    return rates
+
+def legacy_todays_candles(rates:np.ndarray, start_candle:int) -> pd.DataFrame:
+    last_24_hour_candles = pd.DataFrame(rates[:len(rates) - start_candle])
+    last_24_hour_candles["time"] = last_24_hour_candles["time"].apply(lambda x: util.get_traded_time(epoch=x))
+    last_24_hour_candles["date"] = last_24_hour_candles["time"].apply(lambda x: x.date())
+
+    find_most_recent_candle = pd.DataFrame(rates[-2:])
+    find_most_recent_candle["time"] = find_most_recent_candle["time"].apply(lambda x: util.get_traded_time(epoch=x))
+    most_recent_date = find_most_recent_candle["time"].max().date()
+
+    todays_candles = last_24_hour_candles[last_24_hour_candles["date"] == most_recent_date].copy()
+    return todays_candles.reset_index(drop=True).reset_index()
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    wrapper = Wrapper()
+    n_candles = wrapper.get_todays_candle_count(timeframe=5)
+    start_candle = 1
+    rates = synthetic_rates(n_candles=n_candles + start_candle)
+
+    legacy = legacy_todays_candles(rates=rates, start_candle=start_candle)
+    vectorized = wrapper.build_todays_candles(rates=rates, start_candle=start_candle)
+    pd.testing.assert_frame_equal(legacy, vectorized, check_dtype=False)
+
+    legacy_time = timeit.timeit(lambda: legacy_todays_candles(rates=rates, start_candle=start_candle), number=repeat) / repeat
+    vectorized_time = timeit.timeit(lambda: wrapper.build_todays_candles(rates=rates, start_candle=start_candle), number=repeat) / repeat
+
+    print(f"{'Candles'.ljust(20)}: {n_candles} (M5)")
+    print(f"{'Legacy'.ljust(20)}: {round(legacy_time * 1000, 3)} ms")
+    print(f"{'Vectorized'.ljust(20)}: {round(vectorized_time * 1000, 3)} ms")
+    print(f"{'Speedup'.ljust(20)}: {round(legacy_time / vectorized_time, 1)}x")
@@ -0,0 +1,142 @@
+"""
+Parity of RiskManager.calculate_trades_based_pnl (vectorized) with the row by row reference
+(calculate_trades_based_pnl_by_row below), on today's trades of the account.
+
+With the simulated broker (BROKER_BACKEND=SIMULATOR) a few cycles of the benchmark configuration are run first, then
+part of the positions are closed and re-entered, so the first, reentry and early closed trades are all covered. On the
+terminal it only reads the trades of the account.
+
+Usage: python scripts/check_trades_pnl_parity.py [--cycles 30] [--security FOREX] [--selection NON-PRIMARY]
+"""
+import os
+import time
+import argparse
+import numpy as np
+from modules.meta.broker import mt5
+from modules.meta.RiskManager import RiskManager
+from modules.meta.CloseEngine import CloseEngine
+
+def calculate_trades_based_pnl_by_row(risk_manager:RiskManager):
+    """
+    Row by row version of RiskManager.calculate_trades_based_pnl (before it was vectorized), the reference of the parity check.
+
+    Calculate the total profit and loss (PnL) for today's trades and return the PnL for each symbol.
+    This method retrieves today's trades, calculates the directional PnL for each trade, and computes the net PnL 
+    by considering the commission. It returns the total PnL for all trades and a DataFrame containing the net PnL 
+    for each symbol.
+        tuple: A tuple containing:
+            - total_pnl (float): The total PnL for today's trades, rounded to 2 decimal places.
+            - DataFrame: A DataFrame with columns "symbol" and "net_pnl" representing the net PnL for each symbol.
+    """
+    def directional_pnl(entry, current, direction):
+        """
+        Calculate the profit and loss (PnL) based on the entry price, current price, and trade direction.
+
+        Args:
+            entry (float): The entry price of the trade.
+            current (float): The current price of the trade.
+            direction (int): The direction of the trade. 
+                     0 for long (buy) position, 1 for short (sell) position.
+
+        Returns:
+            float: The calculated PnL. Positive value indicates profit, negative value indicates loss.
+        """
+        if direction == 0:
+            return current - entry
+        elif direction == 1:
+            return entry - current
+
+    todays_trades = risk_manager.wrapper.get_todays_trades()
+    todays_trades = todays_trades.sort_values(by="time", ascending=True)
+    todays_trades = todays_trades[["time", "symbol", "entry", "type", "price", "commission", "volume", "profit", "ticket"]].copy()
+
+    individual_symbol_df = todays_trades[todays_trades["entry"] == 0].copy()
+    individual_symbol_df['entry_type'] = individual_symbol_df.groupby(['symbol']).cumcount().apply(lambda x: 'first' if x == 0 else 'reentry')
+
+    # Mark entries as 'first' or 'reentry'
+    individual_symbol_df["Mark"] = individual_symbol_df.duplicated(subset="symbol", keep="first").map({False: "first", True: "reentry"})
+
+    # Get the last trade for the day, Calculate PnL based on the latest entry
+    latest_closed_trades = todays_trades[todays_trades["entry"] == 0].copy()
+    latest_closed_trades = latest_closed_trades.drop_duplicates(subset=["symbol"], keep="last")
+
+    # Generate pnL for the early closed adaptive positions ** This is not the final PnL, This will be added to the final PnL
+    early_close_trades = todays_trades[todays_trades["entry"] == 1].copy()
+    adaptive_closed_trades = early_close_trades.drop_duplicates(subset=["symbol"], keep="last")
+    adapted_positions = early_close_trades[~early_close_trades.index.isin(adaptive_closed_trades.index)]
+    adapted_closed_positions_pnl = adapted_positions["profit"].sum() + adapted_positions["commission"].sum()
+
+    # Calculate the PnL for each positions with ticket as unique value
+    individual_symbol_df["current_price"] = individual_symbol_df["symbol"].apply(lambda x: risk_manager.prices.get_exchange_price(symbol=x))
+    individual_symbol_df["change"] =  individual_symbol_df.apply(lambda x: directional_pnl(entry=x["price"], current=x["current_price"], direction=x["type"]) , axis=1)
+    individual_symbol_df["pnl"] = individual_symbol_df.apply(lambda x: risk_manager.get_pnl_of_position(symbol=x["symbol"], lots=x["volume"], points_in_stop=x["change"]), axis=1)
+    individual_symbol_df["net_pnl"] = individual_symbol_df["pnl"] + individual_symbol_df["commission"]
+    individual_symbol_df["net_pnl"] = individual_symbol_df["net_pnl"].round(2)
+
+
+    # the total pnl is based on the last exiting positions
+    latest_closed_trades["current_price"] = latest_closed_trades["symbol"].apply(lambda x: risk_manager.prices.get_exchange_price(symbol=x))
+    latest_closed_trades["change"] =  latest_closed_trades.apply(lambda x: directional_pnl(entry=x["price"], current=x["current_price"], direction=x["type"]) , axis=1)
+    latest_closed_trades["pnl"] = latest_closed_trades.apply(lambda x: risk_manager.get_pnl_of_position(symbol=x["symbol"], lots=x["volume"], points_in_stop=x["change"]), axis=1)
+    latest_closed_trades["net_pnl"] = latest_closed_trades["pnl"] + latest_closed_trades["commission"]
+    latest_closed_trades["net_pnl"] = latest_closed_trades["net_pnl"].round(2)
+    total_pnl = round(latest_closed_trades["net_pnl"].sum() + adapted_closed_positions_pnl, 2)
+    return total_pnl, individual_symbol_df[["symbol", "net_pnl", "Mark"]]
+
+def simulate_trades(cycles:int, security:str, symbol_selection:str):
+    """
+    Runs the benchmark cycles, closes every other position and enters again on some of the closed symbols
+    """
+    from modules.common.Profiler import Profiler
+    from benchmark_main_cycle import run_cycles, main_arguments
+
+    run_cycles(profiler=Profiler(enabled=True), cycles=cycles, **main_arguments(security=security, symbol_selection=symbol_selection,
+                                                                                strategy="PREV_DAY_CLOSE_DIR", timeframe=15))
+    closing = list(mt5.positions_get())[::2]
+    CloseEngine().close_positions(positions=closing)
+
+    for position in closing[::2]:
+        tick = mt5.symbol_info_tick(position.symbol)
+        mt5.order_send({"action": mt5.TRADE_ACTION_DEAL, "symbol": position.symbol, "volume": position.volume, "type": position.type,
+                        "price": tick.ask if position.type == 0 else tick.bid, "magic": 234000, "comment": "parity",
+                        "type_time": mt5.ORDER_TIME_GTC, "type_filling": mt5.ORDER_FILLING_IOC})
+
+    # Prices move on before the PnL is calculated
+    mt5.sleep(900)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Parity of the trades based PnL')
+    parser.add_argument('--cycles', type=int, default=30, help='Number of simulated cycles before the check')
+    parser.add_argument('--security', type=str, default="FOREX", help='Security of the simulated cycles')
+    parser.add_argument('--selection', type=str, default="NON-PRIMARY", help='Symbol selection of the simulated cycles')
+    args = parser.parse_args()
+
+    if os.getenv("BROKER_BACKEND", "").upper() == "SIMULATOR":
+        simulate_trades(cycles=args.cycles, security=args.security, symbol_selection=args.selection)
+
+    risk_manager = RiskManager(market_direction="BREAK", double_entry=False, stop_expected_move=0.05, account_target_ratio=2.0)
+    if risk_manager.wrapper.get_todays_trades().empty:
+        print("No trades today, nothing to compare")
+        exit()
+
+    start = time.perf_counter()
+    reference_total, reference_symbols = calculate_trades_based_pnl_by_row(risk_manager=risk_manager)
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    total, symbols = risk_manager.calculate_trades_based_pnl()
+    vectorized_time = time.perf_counter() - start
+
+    same_total = np.isclose(total, reference_total, atol=0.01)
+    same_symbols = (reference_symbols.reset_index(drop=True)[["symbol", "Mark"]].equals(symbols.reset_index(drop=True)[["symbol", "Mark"]])
+                    and np.allclose(reference_symbols["net_pnl"].to_numpy(dtype=float), symbols["net_pnl"].to_numpy(dtype=float), atol=0.01))
+
+    print(f"{'Trades'.ljust(20)}: {len(symbols)}")
+    print(f"{'Total PnL'.ljust(20)}: {total} (by row {reference_total})")
+    print(f"{'By row'.ljust(20)}: {round(reference_time * 1000, 2)} ms")
+    print(f"{'Vectorized'.ljust(20)}: {round(vectorized_time * 1000, 2)} ms")
+    print(f"{'Parity'.ljust(20)}: {'OK' if same_total and same_symbols else 'MISMATCH'}")
+
+    if not (same_total and same_symbols):
+        print(reference_symbols.merge(symbols, left_index=True, right_index=True, suffixes=("_by_row", "")))
+        exit(1)
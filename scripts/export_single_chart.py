@@ -7,7 +7,7 @@ timeframe = int(sys.argv[2])
 
 wrapper = Wrapper()
 actual_chart = wrapper.get_last_n_candles(symbol=symbol, timeframe=timeframe, n_candles=100)
-actual_chart["time"] = actual_chart["time"].apply(lambda x: util.get_traded_time(epoch=x))
+actual_chart["time"] = util.get_traded_times(epochs=actual_chart["time"])
 
 heikinashi = wrapper.get_heikin_ashi(symbol=symbol, timeframe=timeframe, n_candles=100)
 
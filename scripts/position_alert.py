@@ -1,6 +1,4 @@
-import MetaTrader5 as mt
-mt.initialize()
-import time
+from modules.meta.broker import mt5 as mt
 from modules.common.slack_msg import Slack
 from modules.meta.wrapper import Wrapper
 
@@ -27,4 +25,4 @@ while True:
                 alert.send_msg(msg= "Exit: " + trade)
 
 
-    time.sleep(30)
\ No newline at end of file
+    mt.sleep(30)
\ No newline at end of file
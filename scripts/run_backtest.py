@@ -0,0 +1,55 @@
+"""
+Backtest of a strategy over the candle store (see modules/meta/Backtest.py), prints the daily result in R units.
+
+Usage: python scripts/run_backtest.py --strategy PREV_DAY_CLOSE_DIR --timeframe 15 --primary_stop_selection ATR15M --target_ratio 2
+"""
+import time
+import argparse
+import pandas as pd
+from tabulate import tabulate
+import modules.meta.Currencies as curr
+from modules.meta.Backtest import Backtest
+from modules.meta.CandleStore import CandleStore
+from modules import config
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Backtest Configuration')
+    parser.add_argument('--strategy', type=str, help=f'One of {Backtest.supported_strategies}')
+    parser.add_argument('--timeframe', type=int, default=15, help='Timeframe of the stored candles to trade')
+    parser.add_argument('--market_direction', type=str, default="BREAK", help='BREAK or REVERSE')
+    parser.add_argument('--target_ratio', type=float, default=2.0, help='Target ratio, assume stop is 1')
+    parser.add_argument('--primary_stop_selection', type=str, default="ATR15M", help='Stop by Candle or any other properties')
+    parser.add_argument('--num_prev_cdl_for_stop', type=int, default=2, help='Number of previous candle for stops')
+    parser.add_argument('--stop_expected_move', type=float, default=0.05, help='% of expected move of an symbol based on the price')
+    parser.add_argument('--start_hour', type=int, default=10, help='Start Hour Of Trading')
+    parser.add_argument('--start_minute', type=int, default=0, help='Start Minute Of Trading')
+    parser.add_argument('--max_trades_per_day_per_symbol', type=int, default=2, help='Max number of trades per symbol per day')
+    parser.add_argument('--symbols', type=str, default=None, help='Comma separated symbols, defaults to the master currencies')
+    parser.add_argument('--start', type=str, default=None, help='Server time to start from, e.g 2024-01-01')
+    parser.add_argument('--end', type=str, default=None, help='Server time to end at')
+    parser.add_argument('--store', type=str, default=config.candle_store_dir, help='Directory of the candle store')
+    args = parser.parse_args()
+
+    symbols = args.symbols.split(",") if args.symbols else curr.master_currencies
+    start_epoch = int(pd.Timestamp(args.start).value // 10**9) if args.start else None
+    end_epoch = int(pd.Timestamp(args.end).value // 10**9) if args.end else None
+
+    backtest = Backtest(store=CandleStore(root_dir=args.store), target_ratio=args.target_ratio, stop_selection=args.primary_stop_selection,
+                        market_direction=args.market_direction, num_cdl_for_stop=args.num_prev_cdl_for_stop,
+                        stop_expected_move=args.stop_expected_move, start_hour=args.start_hour, start_minute=args.start_minute,
+                        max_trades_per_day_per_symbol=args.max_trades_per_day_per_symbol)
+
+    start = time.perf_counter()
+    trades = backtest.run(strategy=args.strategy, symbols=symbols, timeframe=args.timeframe, start_epoch=start_epoch, end_epoch=end_epoch)
+    daily = Backtest.daily_rr(trades=trades)
+    elapsed = time.perf_counter() - start
+
+    print(tabulate(daily, headers="keys", tablefmt="simple", showindex=False))
+    print(f"\n{'Strategy'.ljust(20)}: {args.strategy} ({args.market_direction})")
+    print(f"{'Symbols'.ljust(20)}: {len(symbols)}")
+    print(f"{'Trades'.ljust(20)}: {len(trades)}")
+    if not trades.empty:
+        print(f"{'Win Rate'.ljust(20)}: {round((trades['rr'] > 0).mean() * 100, 1)} %")
+        print(f"{'Total RR'.ljust(20)}: {round(trades['rr'].sum(), 2)}")
+        print(f"{'Max Drawdown RR'.ljust(20)}: {round((daily['cumulative_rr'].cummax() - daily['cumulative_rr']).max(), 2)}")
+    print(f"{'Elapsed'.ljust(20)}: {round(elapsed, 2)} s")